@@ -19,7 +19,7 @@ def supports_tool_binding(llm: Any) -> bool:
 def invoke_bound_schema(
     llm: Any,
     *,
-    prompt: str,
+    prompt: Any,
     schema: Type[TModel],
     tool_choice: str = "any",
 ) -> Optional[TModel]:
@@ -6,12 +6,13 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import Any, Optional
+from typing import Any, Callable, Optional, Tuple
 
 from pydantic import BaseModel, Field
 
 from dwc.agents.langchain_tool_calling import invoke_bound_schema
 from dwc.agents.spec_generator import LLMProtocol
+from dwc.llm import LLMRouter, iter_text_chunks, route_llm
 
 LOGGER = logging.getLogger(__name__)
 
@@ -31,25 +32,84 @@ class IntentSummaryPayload(BaseModel):
     intent_summary: str = ""
 
 
+class PlanWithIntentPayload(BaseModel):
+    steps: list[str] = Field(default_factory=list)
+    intent_summary: str = ""
+
+
 class PlannerAgent:
-    def __init__(self, llm: Optional[LLMProtocol] = None) -> None:
+    def __init__(
+        self, llm: Optional[LLMProtocol] = None, router: Optional[LLMRouter] = None
+    ) -> None:
         self.llm = llm
+        self.router = router
 
     def propose_plan(
-        self, requirements_text: str, refinement_notes: Optional[str] = None
+        self,
+        requirements_text: str,
+        refinement_notes: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None,
     ) -> str:
-        if self.llm is not None:
+        """
+        Draft a numbered plan.
+
+        With `on_token`, streaming adapters emit the draft as it is generated;
+        the returned plan is authoritative if the stream fails mid-way.
+        """
+
+        llm = route_llm(
+            self.router,
+            self.llm,
+            "plan",
+            input_text=f"{requirements_text}\n{refinement_notes or ''}",
+        )
+        if llm is not None:
             try:
-                return self._propose_with_llm(requirements_text, refinement_notes)
+                if on_token is not None and hasattr(llm, "stream"):
+                    return self._stream_with_llm(
+                        llm, requirements_text, refinement_notes, on_token
+                    )
+                return self._propose_with_llm(llm, requirements_text, refinement_notes)
             except Exception as exc:
                 LOGGER.warning("PlannerAgent fallback to heuristic plan: %s", exc)
         return self._heuristic_plan(requirements_text, refinement_notes)
 
+    def propose_plan_with_intent(
+        self, requirements_text: str, refinement_notes: Optional[str] = None
+    ) -> Tuple[str, Optional[str]]:
+        """
+        Return (plan, intent) from one structured LLM round trip.
+
+        Intent is None when the fused call is unavailable; callers then run
+        `capture_intent` themselves (and may overlap it with other work).
+        """
+
+        llm = route_llm(
+            self.router,
+            self.llm,
+            "plan_with_intent",
+            input_text=f"{requirements_text}\n{refinement_notes or ''}",
+        )
+        if llm is not None:
+            try:
+                fused = self._propose_fused_with_llm(llm, requirements_text, refinement_notes)
+                if fused is not None:
+                    return fused
+            except Exception as exc:
+                LOGGER.warning("PlannerAgent fused plan+intent call failed: %s", exc)
+        return self.propose_plan(requirements_text, refinement_notes), None
+
     def capture_intent(self, requirements_text: str, approved_plan: str) -> str:
-        if self.llm is not None:
+        llm = route_llm(
+            self.router,
+            self.llm,
+            "intent_summary",
+            input_text=f"{requirements_text}\n{approved_plan}",
+        )
+        if llm is not None:
             try:
                 bound = invoke_bound_schema(
-                    self.llm,
+                    llm,
                     prompt=(
                         "Summarize the user intent in under 120 words.\n\n"
                         f"Requirements:\n{requirements_text}\n\n"
@@ -67,7 +127,7 @@ class PlannerAgent:
                     f"Requirements:\n{requirements_text}\n\n"
                     f"Approved plan:\n{approved_plan}\n"
                 )
-                response = self.llm.invoke(prompt)
+                response = llm.invoke(prompt)
                 text = getattr(response, "content", None)
                 if text is None:
                     text = str(response)
@@ -81,25 +141,16 @@ class PlannerAgent:
         return self._heuristic_intent(requirements_text, approved_plan)
 
     def _propose_with_llm(
-        self, requirements_text: str, refinement_notes: Optional[str]
+        self, llm: Any, requirements_text: str, refinement_notes: Optional[str]
     ) -> str:
-        prompt = f"""
-Create a concise plan for implementing this workflow compiler request.
-Return plain text with numbered steps only.
-
-Requirements:
-{requirements_text}
-
-Refinement notes:
-{refinement_notes or "None"}
-"""
-        bound = invoke_bound_schema(self.llm, prompt=prompt, schema=ProposedPlanPayload)
+        prompt = self._plan_prompt(requirements_text, refinement_notes)
+        bound = invoke_bound_schema(llm, prompt=prompt, schema=ProposedPlanPayload)
         if bound is not None:
             steps = [str(step).strip() for step in bound.steps if str(step).strip()]
             if steps:
                 return "\n".join(f"{idx}. {step}" for idx, step in enumerate(steps, start=1))
 
-        response = self.llm.invoke(prompt)
+        response = llm.invoke(prompt)
         text = getattr(response, "content", None)
         if text is None:
             text = str(response)
@@ -110,6 +161,60 @@ Refinement notes:
             raise ValueError("Empty plan from LLM")
         return plan
 
+    def _stream_with_llm(
+        self,
+        llm: Any,
+        requirements_text: str,
+        refinement_notes: Optional[str],
+        on_token: Callable[[str], None],
+    ) -> str:
+        prompt = self._plan_prompt(requirements_text, refinement_notes)
+        parts = []
+        for piece in iter_text_chunks(llm, prompt):
+            parts.append(piece)
+            on_token(piece)
+        plan = "".join(parts).strip()
+        if not plan:
+            raise ValueError("Empty plan from LLM")
+        return plan
+
+    @staticmethod
+    def _plan_prompt(requirements_text: str, refinement_notes: Optional[str]) -> str:
+        return f"""
+Create a concise plan for implementing this workflow compiler request.
+Return plain text with numbered steps only.
+
+Requirements:
+{requirements_text}
+
+Refinement notes:
+{refinement_notes or "None"}
+"""
+
+    def _propose_fused_with_llm(
+        self, llm: Any, requirements_text: str, refinement_notes: Optional[str]
+    ) -> Optional[Tuple[str, str]]:
+        prompt = f"""
+Create a concise plan for implementing this workflow compiler request,
+then summarize the user intent in under 120 words.
+Return plan steps as short imperative sentences without numbering.
+
+Requirements:
+{requirements_text}
+
+Refinement notes:
+{refinement_notes or "None"}
+"""
+        bound = invoke_bound_schema(llm, prompt=prompt, schema=PlanWithIntentPayload)
+        if bound is None:
+            return None
+        steps = [str(step).strip() for step in bound.steps if str(step).strip()]
+        summary = str(bound.intent_summary).strip()
+        if not steps or not summary:
+            return None
+        plan = "\n".join(f"{idx}. {step}" for idx, step in enumerate(steps, start=1))
+        return plan, summary
+
     @staticmethod
     def _heuristic_plan(
         requirements_text: str, refinement_notes: Optional[str]
@@ -13,6 +13,7 @@ from pydantic import BaseModel, Field
 
 from dwc.agents.langchain_tool_calling import invoke_bound_schema
 from dwc.agents.spec_generator import LLMProtocol
+from dwc.llm import LLMRouter, route_llm
 
 LOGGER = logging.getLogger(__name__)
 
@@ -34,8 +35,11 @@ class SubtaskSplitPayload(BaseModel):
 
 
 class SubtaskAgent:
-    def __init__(self, llm: Optional[LLMProtocol] = None) -> None:
+    def __init__(
+        self, llm: Optional[LLMProtocol] = None, router: Optional[LLMRouter] = None
+    ) -> None:
         self.llm = llm
+        self.router = router
 
     def split(
         self,
@@ -44,10 +48,19 @@ class SubtaskAgent:
         approved_plan: Optional[str] = None,
         max_subtasks: int = 8,
     ) -> List[SubtaskSpec]:
-        if self.llm is not None:
+        llm = route_llm(
+            self.router,
+            self.llm,
+            "subtask_split",
+            input_text=f"{requirements_text}\n{approved_plan or ''}",
+        )
+        if llm is not None:
             try:
                 tasks = self._split_with_llm(
-                    requirements_text, approved_plan=approved_plan, max_subtasks=max_subtasks
+                    llm,
+                    requirements_text,
+                    approved_plan=approved_plan,
+                    max_subtasks=max_subtasks,
                 )
                 if tasks:
                     return tasks
@@ -57,6 +70,7 @@ class SubtaskAgent:
 
     def _split_with_llm(
         self,
+        llm: Any,
         requirements_text: str,
         *,
         approved_plan: Optional[str],
@@ -77,13 +91,13 @@ Requirements:
 Approved plan:
 {approved_plan or "None"}
 """
-        bound = invoke_bound_schema(self.llm, prompt=prompt, schema=SubtaskSplitPayload)
+        bound = invoke_bound_schema(llm, prompt=prompt, schema=SubtaskSplitPayload)
         if bound is not None and bound.subtasks:
             subtasks = self._normalize_rows(bound.subtasks, max_subtasks=max_subtasks)
             if subtasks:
                 return subtasks
 
-        response = self.llm.invoke(prompt)
+        response = llm.invoke(prompt)
         text = getattr(response, "content", None)
         if text is None:
             text = str(response)
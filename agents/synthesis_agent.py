@@ -8,13 +8,17 @@ import logging
 from typing import Optional
 
 from dwc.agents.spec_generator import LLMProtocol
+from dwc.llm import LLMRouter, route_llm
 
 LOGGER = logging.getLogger(__name__)
 
 
 class SynthesisAgent:
-    def __init__(self, llm: Optional[LLMProtocol] = None) -> None:
+    def __init__(
+        self, llm: Optional[LLMProtocol] = None, router: Optional[LLMRouter] = None
+    ) -> None:
         self.llm = llm
+        self.router = router
 
     def synthesis_prompt(
         self,
@@ -23,16 +27,17 @@ class SynthesisAgent:
         approved_plan: Optional[str],
         intent_summary: Optional[str],
     ) -> str:
-        if self.llm is not None:
+        prompt = (
+            "Create a concise synthesis prompt for combining subtask outputs "
+            "into one final plain-text user answer.\n\n"
+            f"Requirements:\n{requirements_text}\n\n"
+            f"Approved plan:\n{approved_plan or 'None'}\n\n"
+            f"Intent summary:\n{intent_summary or 'None'}\n"
+        )
+        llm = route_llm(self.router, self.llm, "synthesis_prompt", input_text=prompt)
+        if llm is not None:
             try:
-                prompt = (
-                    "Create a concise synthesis prompt for combining subtask outputs "
-                    "into one final plain-text user answer.\n\n"
-                    f"Requirements:\n{requirements_text}\n\n"
-                    f"Approved plan:\n{approved_plan or 'None'}\n\n"
-                    f"Intent summary:\n{intent_summary or 'None'}\n"
-                )
-                response = self.llm.invoke(prompt)
+                response = llm.invoke(prompt)
                 text = getattr(response, "content", None)
                 if text is None:
                     text = str(response)
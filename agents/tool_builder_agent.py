@@ -16,6 +16,7 @@ from dwc.agents.langchain_tool_calling import invoke_bound_schema
 from dwc.agents.spec_generator import LLMProtocol
 from dwc.agents.subtask_agent import SubtaskSpec
 from dwc.agents.tool_catalog import BuiltinToolCatalog
+from dwc.llm import build_cached_prompt, iter_text_chunks
 
 LOGGER = logging.getLogger(__name__)
 
@@ -32,6 +33,38 @@ class GeneratedToolCodePayload(BaseModel):
     code: str = ""
 
 
+class CodeFenceStreamParser:
+    """
+    Incrementally locate the first fenced Python block in streamed text.
+
+    `feed` returns the block body as soon as its closing fence arrives, so
+    callers can stop reading the stream and start validation immediately.
+    """
+
+    _OPEN_FENCE = re.compile(r"```[ \t]*(?:python|py)?[ \t]*\n", re.I)
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._body_start: Optional[int] = None
+        self._scan_from = 0
+
+    def feed(self, piece: str) -> Optional[str]:
+        self.text += piece
+        if self._body_start is None:
+            match = self._OPEN_FENCE.search(self.text)
+            if match is None:
+                return None
+            self._body_start = match.end()
+            self._scan_from = self._body_start - 1
+        # Closing fence must start a line; generated code cannot contain one
+        # because triple-quoted strings are disallowed in the prompt.
+        close = self.text.find("\n```", self._scan_from)
+        if close < 0:
+            self._scan_from = max(self._body_start - 1, len(self.text) - 3)
+            return None
+        return self.text[self._body_start : close + 1]
+
+
 class ToolBuilderAgent:
     BANNED_CODE_PATTERNS = (
         "rm -",
@@ -50,9 +83,11 @@ class ToolBuilderAgent:
         self,
         llm: Optional[LLMProtocol] = None,
         catalog: Optional[BuiltinToolCatalog] = None,
+        stream_code: bool = False,
     ) -> None:
         self.llm = llm
         self.catalog = catalog or BuiltinToolCatalog()
+        self.stream_code = stream_code
 
     def build_tool(
         self,
@@ -172,9 +207,16 @@ class ToolBuilderAgent:
         shared_task_description: str,
         feedback: Optional[str],
     ) -> str:
-        prompt = f"""
-Write a Python function with this exact signature:
-def {function_name}(task_input: Dict[str, Any]) -> Dict[str, Any]:
+        streaming = self.stream_code and hasattr(self.llm, "stream")
+        output_rule = (
+            "Return only valid Python code (imports + function) in a single ```python fenced block."
+            if streaming
+            else "Return only valid Python code (imports + function), no markdown."
+        )
+        # Stable prefix first so provider prompt caching can reuse it across
+        # subtasks and retries; per-subtask material follows the cache point.
+        shared_prefix = f"""
+Write Python tool functions for the shared task below.
 
 Requirements:
 - Return dict with keys: tool, status, result.
@@ -186,17 +228,24 @@ Requirements:
 - Do not use triple-quoted strings or docstrings.
 - You may use `safe_cli(command: str, user_message: Optional[str] = None) -> str` for non-destructive CLI calls.
 
-Subtask:
-{subtask_description}
-
 Shared task:
 {shared_task_description}
+"""
+        suffix = f"""
+Write a Python function with this exact signature:
+def {function_name}(task_input: Dict[str, Any]) -> Dict[str, Any]:
+
+Subtask:
+{subtask_description}
 
 Verifier feedback (if any):
 {feedback or "None"}
 
-Return only valid Python code (imports + function), no markdown.
+{output_rule}
 """
+        prompt = build_cached_prompt(self.llm, shared_prefix=shared_prefix, suffix=suffix)
+        if streaming:
+            return self._stream_code(prompt)
         bound = invoke_bound_schema(self.llm, prompt=prompt, schema=GeneratedToolCodePayload)
         if bound is not None:
             candidate = self._extract_python(str(bound.code).strip())
@@ -211,6 +260,18 @@ Return only valid Python code (imports + function), no markdown.
             text = " ".join(str(item) for item in text)
         return self._extract_python(str(text))
 
+    def _stream_code(self, prompt: Any) -> str:
+        parser = CodeFenceStreamParser()
+        chunks = iter_text_chunks(self.llm, prompt)
+        try:
+            for piece in chunks:
+                block = parser.feed(piece)
+                if block is not None:
+                    return self._extract_python(block)
+        finally:
+            chunks.close()
+        return self._extract_python(parser.text)
+
     def _template_code(
         self,
         *,
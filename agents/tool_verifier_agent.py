@@ -6,11 +6,12 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from pydantic import BaseModel
 
 from dwc.agents.tool_builder_agent import ToolCandidate
+from dwc.memory.code_fingerprint import code_fingerprint
 from dwc.runtime.sandbox import SandboxConfig, VenvSandbox
 
 
@@ -25,8 +26,29 @@ class ToolVerifierAgent:
         self.sandbox = sandbox or VenvSandbox(
             SandboxConfig(timeout_seconds=60, preserve_session=False)
         )
+        # Results keyed by (code fingerprint, tool name, description, sample input):
+        # everything the harness depends on, so equivalent candidates skip the sandbox.
+        self._cache: Dict[Tuple[str, str, str, str], ToolVerificationResult] = {}
+        self.cache_hits = 0
 
     def verify(self, candidate: ToolCandidate) -> ToolVerificationResult:
+        key = (
+            code_fingerprint(candidate.code),
+            candidate.name,
+            candidate.description,
+            json.dumps(candidate.sample_input, sort_keys=True, default=str),
+        )
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached.model_copy() if hasattr(cached, "model_copy") else cached.copy()
+        result = self._run_verification(candidate)
+        if result.success or "timeout" not in (result.errors or "").lower():
+            # Timeouts may be transient, so only they are re-run.
+            self._cache[key] = result
+        return result
+
+    def _run_verification(self, candidate: ToolCandidate) -> ToolVerificationResult:
         session = self.sandbox.create_session("tool_verifier")
         try:
             module_path = session.root_dir / "tool_under_test.py"
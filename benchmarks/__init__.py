@@ -0,0 +1 @@
+"""Micro-benchmarks for DWC storage and compiler hot paths."""
@@ -0,0 +1,112 @@
+"""
+Recall@k and latency of LocalVectorStore LSH mode against exact search.
+
+Usage:
+    python -m dwc.benchmarks.ann_bench --records 200000 --queries 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from dwc.memory.vector_store import AnnConfig, LocalVectorStore
+
+# (n_tables, n_bits, probe_radius) grid from fast/low-recall to slow/high-recall.
+DEFAULT_GRID: Tuple[Tuple[int, int, int], ...] = (
+    (4, 14, 0),
+    (8, 12, 0),
+    (8, 12, 1),
+    (16, 12, 1),
+    (16, 10, 2),
+)
+
+
+def _clustered_vectors(count: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    # Embeddings of related requirements cluster; uniform noise would make LSH look worse
+    # than it is on real data.
+    centers = rng.standard_normal((max(1, count // 200), dim)).astype(np.float32)
+    assignment = rng.integers(0, centers.shape[0], size=count)
+    vectors = centers[assignment] + 0.35 * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def _timed_topk(store: LocalVectorStore, queries: np.ndarray, top_k: int):
+    results: List[set] = []
+    samples: List[float] = []
+    matrix = store._matrix
+    for query in queries:
+        started = time.perf_counter()
+        if store._ann is not None:
+            candidates = store._ann.candidates(query)
+            if candidates.shape[0] >= top_k:
+                _, rows = store._top_k(matrix[candidates], query, top_k)
+                rows = candidates[rows]
+            else:
+                _, rows = store._top_k(matrix, query, top_k)
+        else:
+            _, rows = store._top_k(matrix, query, top_k)
+        samples.append((time.perf_counter() - started) * 1000.0)
+        results.append({int(row) for row in rows})
+    return results, statistics.median(samples)
+
+
+def run(records: int, *, dim: int, queries: int, top_k: int) -> List[Dict]:
+    rng = np.random.default_rng(11)
+    vectors = _clustered_vectors(records, dim, rng)
+    picks = rng.integers(0, records, size=queries)
+    query_vecs = vectors[picks] + 0.1 * rng.standard_normal((queries, dim)).astype(np.float32)
+    query_vecs /= np.linalg.norm(query_vecs, axis=1, keepdims=True)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "vector_store.jsonl"
+        exact = LocalVectorStore(str(path), dim=dim)
+        rows = [{"key": f"doc-{idx}", "text": "", "metadata": {}} for idx in range(records)]
+        exact._append_rows(vectors, rows)
+        truth, exact_ms = _timed_topk(exact, query_vecs, top_k)
+        results.append({"mode": "exact", "recall_at_k": 1.0, "query_ms_p50": round(exact_ms, 3)})
+        print(json.dumps(results[-1]), flush=True)
+
+        for n_tables, n_bits, radius in DEFAULT_GRID:
+            config = AnnConfig(n_tables=n_tables, n_bits=n_bits, probe_radius=radius, min_rows=0)
+            started = time.perf_counter()
+            store = LocalVectorStore(str(path), dim=dim, ann=config)
+            store._ensure_index()
+            build_s = time.perf_counter() - started
+            found, ann_ms = _timed_topk(store, query_vecs, top_k)
+            recall = statistics.mean(
+                len(hit & want) / float(top_k) for hit, want in zip(found, truth)
+            )
+            results.append(
+                {
+                    "mode": f"lsh tables={n_tables} bits={n_bits} radius={radius}",
+                    "recall_at_k": round(recall, 4),
+                    "query_ms_p50": round(ann_ms, 3),
+                    "build_s": round(build_s, 3),
+                }
+            )
+            print(json.dumps(results[-1]), flush=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    run(args.records, dim=args.dim, queries=args.queries, top_k=args.top_k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+DependencyResolver on synthetic wide and layered DAGs.
+
+Times the cached bitset analysis (topological order, roots, sinks, parallel
+groups, and random reachability queries) at full size, and the previous
+BFS-per-query resolver on a smaller graph of the same shape, checking both
+return the same answers.
+
+Usage:
+    python -m dwc.benchmarks.dependency_resolver_bench --steps 5000 --legacy-steps 400
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from collections import deque
+from typing import Any, Dict, List, Set
+
+from dwc.compiler.dependency_resolver import DependencyResolver
+from dwc.ir.spec_schema import EdgeSpec, StepSpec, WorkflowSpec
+
+
+def _spec(shape: str, steps: int, seed: int) -> WorkflowSpec:
+    rng = random.Random(seed)
+    ids = [f"step_{idx:05d}" for idx in range(steps)]
+    edges = set()
+    if shape == "wide":
+        # One fan-out root, a wide middle layer with sparse cross links, one join.
+        middle = ids[1:-1]
+        for node in middle:
+            edges.add((ids[0], node))
+            edges.add((node, ids[-1]))
+        for _ in range(len(middle) // 10):
+            left, right = sorted(rng.sample(range(len(middle)), 2))
+            edges.add((middle[left], middle[right]))
+    else:
+        # Layers of ~sqrt(n) steps; each step links to 1-3 steps in later layers.
+        width = max(2, int(steps**0.5))
+        for idx, node in enumerate(ids):
+            layer_end = (idx // width + 1) * width
+            if layer_end >= steps:
+                continue
+            for target in rng.sample(range(layer_end, steps), min(3, steps - layer_end)):
+                if rng.random() < 0.6 or target < layer_end + width:
+                    edges.add((node, ids[target]))
+    return WorkflowSpec(
+        name=f"bench_{shape}",
+        description="synthetic dag",
+        steps=[StepSpec(id=node, type="transform") for node in ids],
+        edges=[EdgeSpec(source=source, target=target) for source, target in sorted(edges)],
+    )
+
+
+class _LegacyResolver:
+    """
+    The previous resolver: adjacency rebuilt and a fresh BFS for every query.
+    """
+
+    def adjacency(self, spec: WorkflowSpec) -> Dict[str, Set[str]]:
+        graph: Dict[str, Set[str]] = {step.id: set() for step in spec.steps}
+        for edge in spec.edges:
+            graph.setdefault(edge.source, set()).add(edge.target)
+            graph.setdefault(edge.target, set())
+        return graph
+
+    def topological_order(self, spec: WorkflowSpec) -> List[str]:
+        graph = self.adjacency(spec)
+        in_degree = {node: 0 for node in graph}
+        for source in graph:
+            for target in graph[source]:
+                in_degree[target] += 1
+        queue = deque(sorted(node for node, degree in in_degree.items() if degree == 0))
+        order: List[str] = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for target in sorted(graph[node]):
+                in_degree[target] -= 1
+                if in_degree[target] == 0:
+                    queue.append(target)
+        return order
+
+    def has_path(self, spec: WorkflowSpec, source: str, target: str) -> bool:
+        graph = self.adjacency(spec)
+        queue = deque([source])
+        visited: Set[str] = set()
+        while queue:
+            current = queue.popleft()
+            if current == target:
+                return True
+            if current in visited:
+                continue
+            visited.add(current)
+            queue.extend(nxt for nxt in graph[current] if nxt not in visited)
+        return False
+
+    def find_parallel_groups(self, spec: WorkflowSpec) -> List[List[str]]:
+        graph = self.adjacency(spec)
+        groups: List[List[str]] = []
+        for _, children_set in sorted(graph.items()):
+            children = sorted(children_set)
+            if len(children) < 2:
+                continue
+            independent: List[str] = []
+            for child in children:
+                if all(
+                    not self.has_path(spec, child, other)
+                    and not self.has_path(spec, other, child)
+                    for other in independent
+                ):
+                    independent.append(child)
+            if len(independent) > 1:
+                groups.append(independent)
+        return groups
+
+
+def _run_resolver(resolver: Any, spec: WorkflowSpec, pairs: List[tuple]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    order = resolver.topological_order(spec)
+    groups = resolver.find_parallel_groups(spec)
+    reachable = [resolver.has_path(spec, source, target) for source, target in pairs]
+    return {
+        "seconds": time.perf_counter() - started,
+        "order": order,
+        "groups": groups,
+        "reachable": reachable,
+    }
+
+
+def run(steps: int, legacy_steps: int, queries: int, seed: int) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for shape in ("wide", "layered"):
+        for size, with_legacy in ((legacy_steps, True), (steps, False)):
+            spec = _spec(shape, size, seed)
+            rng = random.Random(seed + size)
+            ids = [step.id for step in spec.steps]
+            pairs = [tuple(rng.sample(ids, 2)) for _ in range(queries)]
+            current = _run_resolver(DependencyResolver(), spec, pairs)
+            row: Dict[str, Any] = {
+                "shape": shape,
+                "steps": size,
+                "edges": len(spec.edges),
+                "groups": len(current["groups"]),
+                "bitset_ms": round(current["seconds"] * 1000, 2),
+            }
+            if with_legacy:
+                legacy = _run_resolver(_LegacyResolver(), spec, pairs)
+                row["legacy_ms"] = round(legacy["seconds"] * 1000, 2)
+                row["identical"] = all(
+                    current[key] == legacy[key] for key in ("order", "groups", "reachable")
+                )
+            results.append(row)
+            print(json.dumps(row), flush=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=5000)
+    parser.add_argument(
+        "--legacy-steps", type=int, default=400, help="Graph size for the legacy comparison."
+    )
+    parser.add_argument("--queries", type=int, default=1000, help="Random has_path queries.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.steps, args.legacy_steps, args.queries, args.seed)
+
+
+if __name__ == "__main__":
+    main()
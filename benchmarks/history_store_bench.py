@@ -0,0 +1,119 @@
+"""
+Concurrent tool-attempt writers against HistoryStore.
+
+Compares the previous connect-per-write pattern (rollback journal, one
+commit per insert) with persistent WAL connections, with and without the
+write-behind queue.
+
+Usage:
+    python -m dwc.benchmarks.history_store_bench --threads 8 --writes 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from dwc.memory.history_store import HistoryStore
+
+
+def _attempt(thread_idx: int, idx: int) -> Dict[str, object]:
+    return {
+        "workflow_name": "bench",
+        "subtask_id": f"subtask_{thread_idx}",
+        "subtask_description": f"benchmark subtask {thread_idx} attempt {idx}",
+        "tool_name": f"tool_{thread_idx}",
+        "tool_origin": "llm",
+        "attempt_index": idx,
+        "success": idx % 3 != 0,
+        "error_class": None if idx % 3 else "ValueError",
+        "stderr_snippet": None if idx % 3 else "ValueError: bad input",
+        "stdout_snippet": None,
+        "feedback_used": None,
+        "code_hash": f"{thread_idx:04d}{idx:08d}",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _connect_per_write(db_path: Path) -> Callable[[Dict[str, object]], None]:
+    columns = list(_attempt(0, 0).keys())
+    sql = (
+        f"INSERT INTO tool_attempts ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+
+    def write(row: Dict[str, object]) -> None:
+        conn = sqlite3.connect(str(db_path), timeout=30.0)
+        try:
+            with conn:
+                conn.execute(sql, [row[column] for column in columns])
+        finally:
+            conn.close()
+
+    return write
+
+
+def _run_writers(write: Callable[[Dict[str, object]], None], threads: int, writes: int) -> float:
+    def worker(thread_idx: int) -> None:
+        for idx in range(writes):
+            write(_attempt(thread_idx, idx))
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(idx,)) for idx in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def run(threads: int, writes: int) -> List[Dict[str, object]]:
+    results = []
+    total = threads * writes
+    with tempfile.TemporaryDirectory() as tmp:
+        # Baseline: the schema is created by HistoryStore, then the journal is
+        # reset so the old connect-per-write path runs in rollback mode.
+        legacy_db = Path(tmp) / "legacy.db"
+        HistoryStore(str(legacy_db), write_behind=False).close()
+        conn = sqlite3.connect(str(legacy_db))
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        elapsed = _run_writers(_connect_per_write(legacy_db), threads, writes)
+        results.append({"mode": "connect_per_write", "seconds": elapsed})
+
+        for mode, write_behind in (("wal_persistent", False), ("wal_write_behind", True)):
+            store = HistoryStore(str(Path(tmp) / f"{mode}.db"), write_behind=write_behind)
+            started = time.perf_counter()
+            _run_writers(lambda row: store.add_tool_attempt(**row), threads, writes)
+            store.flush()
+            elapsed = time.perf_counter() - started
+            stored = len(store.recent_tool_attempts(limit=total + 1))
+            store.close()
+            if stored != total:
+                raise RuntimeError(f"{mode}: expected {total} rows, found {stored}")
+            results.append({"mode": mode, "seconds": elapsed})
+
+    for row in results:
+        row["writes_per_s"] = round(total / row["seconds"], 1)
+        row["seconds"] = round(row["seconds"], 3)
+        print(json.dumps({"threads": threads, "writes": total, **row}), flush=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=500, help="Writes per thread.")
+    args = parser.parse_args()
+    run(args.threads, args.writes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Optimizer pipeline on synthetic specs carrying embedded tool source.
+
+Times `Optimizer.optimize` (one MutableWorkflow edited in place, converted
+and validated once) against chaining each pass's `apply`, which rebuilds and
+re-validates a WorkflowSpec after every pass as the pipeline used to, and
+checks both produce the same spec. Also times the optimizer with a fresh
+PassCache (cold: every pass misses and is stored) and again with the cache
+warm (every pass hits). `--profile` prints the per-pass profile of the
+in-place run for each size.
+
+Usage:
+    python -m dwc.benchmarks.optimizer_bench --steps 50 200 1000 --tool-kb 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from dwc.compiler.optimization_passes import Optimizer
+from dwc.compiler.pass_cache import PassCache
+from dwc.compiler.pass_profiler import render_pass_profile
+from dwc.ir.spec_schema import WorkflowSpec, model_dump_compat
+
+
+def _spec(steps: int, tool_kb: int, seed: int) -> WorkflowSpec:
+    rng = random.Random(seed)
+    ids = [f"step_{idx:05d}" for idx in range(steps)]
+    step_payloads: List[Dict[str, Any]] = []
+    tool_functions: Dict[str, Dict[str, str]] = {}
+    for idx, step_id in enumerate(ids[:-1]):
+        tool_name = f"tool_{idx:05d}"
+        step_payloads.append(
+            {
+                "id": step_id,
+                "type": "tool",
+                "config": {"tool_name": tool_name, "subtask_description": f"subtask {idx}"},
+            }
+        )
+        body = "".join(
+            f"    value_{line} = task_input.get('k{line}')\n" for line in range(tool_kb * 24)
+        )
+        tool_functions[tool_name] = {
+            "code": f"def {tool_name}(task_input):\n{body}    return {{}}\n",
+            "origin": "llm",
+        }
+    step_payloads.append(
+        {
+            "id": ids[-1],
+            "type": "llm",
+            "config": {"model": "m", "prompt": "synthesize", "max_output_tokens": 1024},
+        }
+    )
+    edges = set()
+    for idx, step_id in enumerate(ids[:-1]):
+        edges.add((step_id, ids[-1]))
+        if idx and rng.random() < 0.3:
+            edges.add((ids[rng.randrange(idx)], step_id))
+    return WorkflowSpec(
+        name="bench_optimizer",
+        description="synthetic workflow",
+        steps=step_payloads,
+        edges=[{"source": source, "target": target} for source, target in sorted(edges)],
+        outputs=[{"id": "answer", "name": "answer", "data_type": "str", "source_step": ids[-1]}],
+        metadata={"tool_functions": tool_functions},
+    )
+
+
+def _per_pass_round_trip(optimizer: Optimizer, spec: WorkflowSpec) -> WorkflowSpec:
+    current = spec
+    for optimization_pass in optimizer.passes:
+        current = optimization_pass.apply(current)
+    return current
+
+
+def _canonical(spec: WorkflowSpec) -> str:
+    payload = model_dump_compat(spec)
+    payload["metadata"].pop("optimization_trace", None)
+    return json.dumps(payload, sort_keys=True)
+
+
+def run(
+    sizes: List[int], tool_kb: int, repeats: int, seed: int, profile: bool = False
+) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for steps in sizes:
+        spec = _spec(steps, tool_kb, seed)
+        timings: Dict[str, float] = {}
+        outputs: Dict[str, str] = {}
+        for mode in ("round_trip", "in_place"):
+            best = float("inf")
+            for _ in range(repeats):
+                optimizer = Optimizer()
+                started = time.perf_counter()
+                if mode == "in_place":
+                    optimized = optimizer.optimize(spec)
+                else:
+                    optimized = _per_pass_round_trip(optimizer, spec)
+                best = min(best, time.perf_counter() - started)
+            timings[mode] = best
+            outputs[mode] = _canonical(optimized)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PassCache(str(Path(tmp) / "pass_cache.db"))
+            for mode in ("cache_cold", "cache_warm"):
+                started = time.perf_counter()
+                optimized = Optimizer(cache=cache).optimize(spec)
+                timings[mode] = time.perf_counter() - started
+                outputs[mode] = _canonical(optimized)
+        row = {
+            "steps": steps,
+            "edges": len(spec.edges),
+            "spec_kb": round(len(spec.to_json(indent=0)) / 1024, 1),
+            "round_trip_ms": round(timings["round_trip"] * 1000, 2),
+            "in_place_ms": round(timings["in_place"] * 1000, 2),
+            "cache_cold_ms": round(timings["cache_cold"] * 1000, 2),
+            "cache_warm_ms": round(timings["cache_warm"] * 1000, 2),
+            "identical": len(set(outputs.values())) == 1,
+        }
+        results.append(row)
+        print(json.dumps(row), flush=True)
+        if profile:
+            profiled = Optimizer(profile=True).optimize(spec)
+            print(render_pass_profile(profiled.metadata["optimization_trace"]), flush=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument(
+        "--tool-kb", type=int, default=4, help="Approximate source size per tool function."
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", action="store_true", help="Print per-pass profiles.")
+    args = parser.parse_args()
+    run(args.steps, args.tool_kb, args.repeats, args.seed, args.profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+SharedToolRegistry.suggest_tool over a large registry.
+
+Compares the inverted token index with the former full scan (score every
+entry with a successful run) and checks both pick the same entry.
+
+Usage:
+    python -m dwc.benchmarks.registry_suggest_bench --entries 50000 --queries 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from dwc.memory.shared_tool_registry import SharedToolRegistry
+
+_DOMAIN_WORDS = (
+    "parse fetch normalize extract validate convert summarize filter merge "
+    "aggregate download upload csv json xml pdf invoice report customer order "
+    "price currency date address email phone table column row schema record "
+    "weather forecast stock ticker sentiment translate classify rank dedupe "
+    "geocode timezone calendar schedule reminder ledger payment refund shipment"
+).split()
+
+
+def _vocabulary(size: int) -> List[str]:
+    return _DOMAIN_WORDS + [f"term{idx:05d}" for idx in range(max(0, size - len(_DOMAIN_WORDS)))]
+
+
+def _zipf_weights(size: int) -> List[float]:
+    # Cumulative Zipf(s=1) weights: rank r is drawn with probability ~ 1/r.
+    return list(itertools.accumulate(1.0 / rank for rank in range(1, size + 1)))
+
+
+def _description(rng: random.Random, vocabulary: List[str], weights: List[float]) -> str:
+    words = set(rng.choices(vocabulary, cum_weights=weights, k=rng.randint(4, 9)))
+    return " ".join(sorted(words))
+
+
+def _populate(
+    registry: SharedToolRegistry,
+    entries: int,
+    vocabulary: List[str],
+    weights: List[float],
+    seed: int,
+) -> None:
+    """
+    Bulk-load synthetic entries through the registry's own index writer.
+    """
+
+    rng = random.Random(seed)
+    conn = registry._connect()
+    conn.execute("BEGIN IMMEDIATE")
+    for idx in range(entries):
+        code_hash = f"{idx:064x}"
+        samples = [_description(rng, vocabulary, weights) for _ in range(rng.randint(1, 3))]
+        tool_name = f"tool_{idx}"
+        success_count = rng.randint(0, 5)
+        conn.execute(
+            """
+            INSERT INTO tool_entries (
+                code_hash, tool_name, origin, code, sample_input_json,
+                description_samples_json, contributors_json, success_count,
+                failure_count, last_error, created_at, updated_at
+            ) VALUES (?, ?, 'llm', '', '{}', ?, '[]', ?, ?, '', ?, ?)
+            """,
+            (
+                code_hash,
+                tool_name,
+                json.dumps(samples),
+                success_count,
+                rng.randint(0, 3),
+                f"2026-01-01T00:00:{idx:08d}",
+                f"2026-01-01T00:00:{idx:08d}",
+            ),
+        )
+        registry._index_entry(
+            conn,
+            code_hash,
+            registry._entry_tokens(
+                {"tool_name": tool_name, "origin": "llm", "description_samples": samples}
+            ),
+        )
+    conn.execute("COMMIT")
+
+
+def _full_scan(registry: SharedToolRegistry, description: str) -> Optional[Dict[str, Any]]:
+    """
+    The pre-index algorithm: score every entry in recency order.
+    """
+
+    query_tokens = registry._token_set(description)
+    best: Optional[Dict[str, Any]] = None
+    best_score = 0.0
+    for entry in registry.entries():
+        success_count = int(entry.get("success_count", 0))
+        if success_count <= 0:
+            continue
+        failure_count = int(entry.get("failure_count", 0))
+        similarity = registry._jaccard_similarity(query_tokens, registry._entry_tokens(entry))
+        reliability = success_count / max(1, success_count + failure_count)
+        score = (0.75 * similarity) + (0.25 * reliability)
+        if score > best_score:
+            best_score = score
+            best = dict(entry)
+    if best is None or best_score <= 0:
+        return None
+    best["similarity"] = round(best_score, 6)
+    return best
+
+
+def run(
+    entries: int, queries: int, scan_queries: int, vocabulary_size: int, seed: int
+) -> List[Dict[str, Any]]:
+    vocabulary = _vocabulary(vocabulary_size)
+    weights = _zipf_weights(len(vocabulary))
+    rng = random.Random(seed + 1)
+    query_texts = [_description(rng, vocabulary, weights) for _ in range(queries)]
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = SharedToolRegistry(str(Path(tmp) / "registry.json"), max_entries=entries)
+        started = time.perf_counter()
+        _populate(registry, entries, vocabulary, weights, seed)
+        load_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        indexed = [registry.suggest_tool(subtask_description=text) for text in query_texts]
+        indexed_s = time.perf_counter() - started
+
+        scan_texts = query_texts[:scan_queries]
+        started = time.perf_counter()
+        scanned = [_full_scan(registry, text) for text in scan_texts]
+        scan_s = time.perf_counter() - started
+
+        mismatches = sum(
+            1
+            for left, right in zip(indexed, scanned)
+            if (left or {}).get("code_hash") != (right or {}).get("code_hash")
+            or (left or {}).get("similarity") != (right or {}).get("similarity")
+        )
+        db_bytes = Path(registry.db_path).stat().st_size
+        postings = registry._connect().execute("SELECT COUNT(*) FROM entry_tokens").fetchone()[0]
+
+    results.append(
+        {
+            "mode": "inverted_index",
+            "entries": entries,
+            "queries": len(query_texts),
+            "ms_per_query": round(indexed_s * 1000 / max(1, len(query_texts)), 3),
+            "load_s": round(load_s, 2),
+            "postings": postings,
+            "db_bytes": db_bytes,
+        }
+    )
+    results.append(
+        {
+            "mode": "full_scan",
+            "entries": entries,
+            "queries": len(scan_texts),
+            "ms_per_query": round(scan_s * 1000 / max(1, len(scan_texts)), 3),
+            "mismatches_vs_index": mismatches,
+        }
+    )
+    for row in results:
+        print(json.dumps(row), flush=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument(
+        "--scan-queries", type=int, default=10, help="Queries also answered by full scan."
+    )
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.entries, args.queries, args.scan_queries, args.vocabulary, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark LocalVectorStore search: legacy JSONL scan vs memory-mapped index.
+
+Usage:
+    python -m dwc.benchmarks.vector_store_bench --sizes 10000 100000 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from dwc.memory.vector_store import LocalVectorStore
+
+QUERIES = (
+    "extract code blocks from markdown",
+    "summarize the latest pdf report",
+    "fetch weather for a city and format it",
+    "search python files for a function",
+    "compare two csv files and report differences",
+)
+
+
+def _synthetic_rows(start: int, count: int, dim: int, rng: np.random.Generator):
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    rows = [
+        {"key": f"doc-{idx}", "text": f"synthetic document {idx}", "metadata": {"type": "bench"}}
+        for idx in range(start, start + count)
+    ]
+    return vectors, rows
+
+
+def _time_queries(store: LocalVectorStore, repeats: int, top_k: int) -> float:
+    samples: List[float] = []
+    for _ in range(repeats):
+        for query in QUERIES:
+            started = time.perf_counter()
+            store.search(query, top_k=top_k)
+            samples.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(samples)
+
+
+def run(sizes: List[int], *, dim: int, top_k: int, repeats: int, legacy_max: int) -> List[Dict]:
+    results = []
+    rng = np.random.default_rng(7)
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "vector_store.jsonl"
+            store = LocalVectorStore(str(path), dim=dim)
+            started = time.perf_counter()
+            batch = 100_000
+            for start in range(0, size, batch):
+                vectors, rows = _synthetic_rows(start, min(batch, size - start), dim, rng)
+                store._append_rows(vectors, rows)
+            build_s = time.perf_counter() - started
+            row = {
+                "records": size,
+                "index_build_s": round(build_s, 3),
+                "index_query_ms_p50": round(_time_queries(store, repeats, top_k), 3),
+                "legacy_query_ms_p50": None,
+            }
+            if size <= legacy_max:
+                matrix = np.load(store.matrix_path, mmap_mode="r")
+                with path.open("w", encoding="utf-8") as handle:
+                    for idx in range(size):
+                        handle.write(
+                            json.dumps(
+                                {
+                                    "key": f"doc-{idx}",
+                                    "text": f"synthetic document {idx}",
+                                    "vector": matrix[idx].tolist(),
+                                    "metadata": {"type": "bench"},
+                                },
+                                sort_keys=True,
+                            )
+                            + "\n"
+                        )
+                legacy = LocalVectorStore(str(path), dim=dim, use_index=False)
+                row["legacy_query_ms_p50"] = round(_time_queries(legacy, 1, top_k), 3)
+            results.append(row)
+            print(json.dumps(row), flush=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=100_000,
+        help="Largest size to also time with the legacy JSONL scan.",
+    )
+    args = parser.parse_args()
+    run(
+        args.sizes,
+        dim=args.dim,
+        top_k=args.top_k,
+        repeats=args.repeats,
+        legacy_max=args.legacy_max,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Content-addressed store for generated workflow artifacts.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+from pathlib import Path
+from typing import Dict, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+class ArtifactStore:
+    """
+    Generated file bodies keyed by SHA-256, hardlinked into version folders.
+
+    `objects/<aa>/<digest>` holds each distinct body once; identical
+    `tools.py` or `README.md` files across workflow versions share one inode.
+    `specs/<artifact_key>.json` maps a rendered artifact (see
+    `LangGraphCodeGenerator.generate`) to the digest of each of its files, so
+    a spec that was rendered before can be linked back into place without
+    rendering it again. Objects are made read-only because every link shares
+    them; editors that replace files keep working, in-place writes do not.
+    Where hardlinks are not possible (another filesystem, no permission) the
+    object is copied instead.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.specs_dir = self.root / "specs"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.specs_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def digest(body: bytes) -> str:
+        return hashlib.sha256(body).hexdigest()
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def put(self, body: bytes) -> str:
+        digest = self.digest(body)
+        path = self.object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{digest}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(body)
+            os.chmod(tmp_path, READ_ONLY)
+            os.replace(tmp_path, path)
+        return digest
+
+    def link(self, digest: str, destination: Path) -> None:
+        """
+        Point `destination` at the object, replacing whatever is there.
+        """
+
+        source = self.object_path(digest)
+        try:
+            if destination.exists() and os.path.samefile(source, destination):
+                return
+        except OSError:
+            pass
+        tmp_path = destination.with_name(f".{destination.name}.{os.getpid()}.tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, destination)
+
+    def manifest(self, artifact_key: str) -> Optional[Dict[str, str]]:
+        """
+        File name -> object digest for a stored artifact, or None when it is
+        unknown or any of its objects has gone missing.
+        """
+
+        path = self.specs_dir / f"{artifact_key}.json"
+        try:
+            files = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(files, dict):
+            return None
+        for digest in files.values():
+            if not self.object_path(str(digest)).exists():
+                return None
+        return {str(name): str(digest) for name, digest in files.items()}
+
+    def record(self, artifact_key: str, files: Dict[str, str]) -> None:
+        path = self.specs_dir / f"{artifact_key}.json"
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(files, sort_keys=True), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            LOGGER.warning("Could not record artifact manifest %s: %s", artifact_key, exc)
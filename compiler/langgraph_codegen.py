@@ -7,14 +7,40 @@ from __future__ import annotations
 import json
 import re
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from pydantic import BaseModel, Field
 
-from dwc.ir.spec_schema import WorkflowSpec
+from dwc.compiler.artifact_store import ArtifactStore
+from dwc.compiler.pass_cache import content_digest
+from dwc.compiler.prompt_layout import DEFAULT_SYNTHESIS_PROMPT, runtime_source
+from dwc.ir.spec_schema import WorkflowSpec, model_dump_compat
 from dwc.llm import DWC_BEDROCK_MODEL_ID
 
 
+# Bump when rendering changes so stored artifacts are not reused.
+CODEGEN_VERSION = 3
+
+# Metadata that varies between compiles of the same spec (cache hits, pass
+# timings) and does not change what is rendered into the workflow script.
+SPEC_HASH_EXCLUDED_METADATA = ("optimization_trace",)
+
+
+def canonical_spec_hash(spec: WorkflowSpec) -> str:
+    """
+    SHA-256 of the spec's sorted-key JSON, without
+    `SPEC_HASH_EXCLUDED_METADATA`.
+    """
+
+    payload = model_dump_compat(spec)
+    payload["metadata"] = {
+        key: value
+        for key, value in (payload.get("metadata") or {}).items()
+        if key not in SPEC_HASH_EXCLUDED_METADATA
+    }
+    return content_digest(payload)
+
+
 def _safe_name(value: str) -> str:
     return re.sub(r"[^a-zA-Z0-9_]+", "_", value).strip("_") or "workflow"
 
@@ -44,12 +70,18 @@ class CodegenResult(BaseModel):
     requirements: List[str] = Field(default_factory=list)
     entrypoint: str = "run_workflow"
     io_contract: WorkflowIOContract = Field(default_factory=WorkflowIOContract)
+    spec_hash: str = ""
+    file_hashes: Dict[str, str] = Field(default_factory=dict)
+    reused: bool = False
 
 
 class LangGraphCodeGenerator:
-    def __init__(self, output_dir: str = ".dwc/workflows") -> None:
+    def __init__(
+        self, output_dir: str = ".dwc/workflows", store: Optional[ArtifactStore] = None
+    ) -> None:
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.store = store or ArtifactStore(str(self.output_dir / ".store"))
 
     def generate(
         self, spec: WorkflowSpec, filename: Optional[str] = None
@@ -66,48 +98,32 @@ class LangGraphCodeGenerator:
         runbook_path = workflow_dir / "README.md"
 
         io_contract = self._build_io_contract(spec)
-        subtasks = self._extract_subtasks(spec)
-        tool_functions = self._extract_tool_functions(spec, subtasks)
-        synthesis_prompt = str(
-            spec.metadata.get(
-                "synthesis_prompt",
-                (
-                    "You are the synthesis head. Combine subtask outputs into one "
-                    "coherent plain-text answer. Do not return JSON."
-                ),
-            )
-        )
-        approved_plan = str(spec.metadata.get("approved_plan", ""))
-        intent_summary = str(spec.metadata.get("intent_summary", ""))
-        current_task_description = str(
-            spec.metadata.get("current_task_description", spec.description)
-        )
-
-        spec_path.write_text(spec.to_json(indent=2), encoding="utf-8")
-        tools_path.write_text(
-            self.render_tools_module(tool_functions), encoding="utf-8"
-        )
-        script_path.write_text(
-            self.render_workflow_script(
-                spec=spec,
-                subtasks=subtasks,
-                io_contract=io_contract,
-                synthesis_prompt=synthesis_prompt,
-                approved_plan=approved_plan,
-                intent_summary=intent_summary,
-                current_task_description=current_task_description,
-            ),
-            encoding="utf-8",
-        )
-        runbook_path.write_text(
-            self.render_runbook(
-                spec=spec,
-                subtasks=subtasks,
-                io_contract=io_contract,
-                script_filename=script_filename,
-            ),
-            encoding="utf-8",
+        spec_hash = canonical_spec_hash(spec)
+        artifact_key = content_digest(
+            {
+                "spec": spec_hash,
+                "codegen": CODEGEN_VERSION,
+                "script_filename": script_filename,
+            }
         )
+        files = self.store.manifest(artifact_key)
+        reused = files is not None
+        if files is None:
+            files = {
+                path.name: self.store.put(body.encode("utf-8"))
+                for path, body in self._render_files(
+                    spec,
+                    io_contract=io_contract,
+                    script_filename=script_filename,
+                    script_path=script_path,
+                    tools_path=tools_path,
+                    spec_path=spec_path,
+                    runbook_path=runbook_path,
+                )
+            }
+            self.store.record(artifact_key, files)
+        for file_name, digest in files.items():
+            self.store.link(digest, workflow_dir / file_name)
 
         requirements = [
             "langgraph>=0.2.0",
@@ -126,7 +142,55 @@ class LangGraphCodeGenerator:
             requirements=sorted(set(requirements)),
             entrypoint="run_workflow",
             io_contract=io_contract,
+            spec_hash=spec_hash,
+            file_hashes=files,
+            reused=reused,
+        )
+
+    def _render_files(
+        self,
+        spec: WorkflowSpec,
+        *,
+        io_contract: WorkflowIOContract,
+        script_filename: str,
+        script_path: Path,
+        tools_path: Path,
+        spec_path: Path,
+        runbook_path: Path,
+    ) -> List[Tuple[Path, str]]:
+        subtasks = self._extract_subtasks(spec)
+        tool_functions = self._extract_tool_functions(spec, subtasks)
+        synthesis_prompt = str(spec.metadata.get("synthesis_prompt", DEFAULT_SYNTHESIS_PROMPT))
+        approved_plan = str(spec.metadata.get("approved_plan", ""))
+        intent_summary = str(spec.metadata.get("intent_summary", ""))
+        current_task_description = str(
+            spec.metadata.get("current_task_description", spec.description)
         )
+        return [
+            (spec_path, spec.to_json(indent=2)),
+            (tools_path, self.render_tools_module(tool_functions)),
+            (
+                script_path,
+                self.render_workflow_script(
+                    spec=spec,
+                    subtasks=subtasks,
+                    io_contract=io_contract,
+                    synthesis_prompt=synthesis_prompt,
+                    approved_plan=approved_plan,
+                    intent_summary=intent_summary,
+                    current_task_description=current_task_description,
+                ),
+            ),
+            (
+                runbook_path,
+                self.render_runbook(
+                    spec=spec,
+                    subtasks=subtasks,
+                    io_contract=io_contract,
+                    script_filename=script_filename,
+                ),
+            ),
+        ]
 
     def _build_io_contract(self, spec: WorkflowSpec) -> WorkflowIOContract:
         required_fields: List[str] = []
@@ -439,6 +503,16 @@ def {function_name}(task_input: Dict[str, Any]) -> Dict[str, Any]:
         payload_intent = json.dumps(intent_summary)
         payload_task = json.dumps(current_task_description)
         payload_model = json.dumps(DWC_BEDROCK_MODEL_ID)
+        schedule = spec.metadata.get("schedule")
+        schedule = schedule if isinstance(schedule, dict) else {}
+        payload_priority = json.dumps([str(item) for item in schedule.get("priority_order") or []])
+        max_concurrency = schedule.get("max_concurrency")
+        payload_prompt_layout = runtime_source()
+        payload_concurrency = (
+            str(max_concurrency)
+            if isinstance(max_concurrency, int) and max_concurrency > 0
+            else "None"
+        )
 
         return f'''"""
 Generated workflow runtime.
@@ -449,6 +523,8 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from pathlib import Path
@@ -472,6 +548,14 @@ SYNTH_MODEL_ID: str = {payload_model}
 APPROVED_PLAN: str = {payload_plan}
 INTENT_SUMMARY: str = {payload_intent}
 CURRENT_TASK_DESCRIPTION: str = {payload_task}
+# Critical-path-first node order from the optimizer's schedule
+# (metadata.schedule), plus its concurrency cap when one was requested.
+STEP_PRIORITY: List[str] = {payload_priority}
+MAX_CONCURRENCY: Optional[int] = {payload_concurrency}
+# Per-step timings are appended here as JSON lines when set (see WorkflowExecutor).
+STEP_METRICS_PATH: str = os.getenv("DWC_STEP_METRICS_PATH", "").strip()
+STEP_METRICS_LOCK = threading.Lock()
+STEP_USAGE: Dict[str, Dict[str, Any]] = {{}}
 
 STEP_MAP: Dict[str, Dict[str, Any]] = {{
     str(step.get("id")): step for step in STEP_DEFS if str(step.get("id", "")).strip()
@@ -489,7 +573,10 @@ for edge in EDGE_DEFS:
     )
     IN_DEGREE[target] = IN_DEGREE.get(target, 0) + 1
 
-ROOT_STEPS: List[str] = [step_id for step_id in STEP_ORDER if IN_DEGREE.get(step_id, 0) == 0]
+NODE_ORDER: List[str] = [step_id for step_id in STEP_PRIORITY if step_id in STEP_MAP]
+_SCHEDULED = set(NODE_ORDER)
+NODE_ORDER.extend(step_id for step_id in STEP_ORDER if step_id not in _SCHEDULED)
+ROOT_STEPS: List[str] = [step_id for step_id in NODE_ORDER if IN_DEGREE.get(step_id, 0) == 0]
 if not ROOT_STEPS and STEP_ORDER:
     ROOT_STEPS = [STEP_ORDER[0]]
 SINK_STEPS: List[str] = [step_id for step_id in STEP_ORDER if not EDGES_BY_SOURCE.get(step_id)]
@@ -498,6 +585,35 @@ OUTPUT_SOURCES: List[str] = [
     for output in OUTPUT_DEFS
     if str(output.get("source_step", "")).strip()
 ]
+# Tool steps fused by the optimizer run inside one node: the node keeps the
+# first member's id and definition, the other members' definitions are in
+# config.fused_step_defs, and config.fused_steps gives the run order.
+FUSED_MEMBERS: Dict[str, List[str]] = {{}}
+FUSED_STEP_DEFS: Dict[str, Dict[str, Any]] = {{}}
+for _step in STEP_DEFS:
+    _config = dict(_step.get("config") or {{}})
+    _members = _config.get("fused_step_defs")
+    if str(_step.get("type")) != "tool" or not isinstance(_members, list):
+        continue
+    _head_id = str(_step.get("id"))
+    FUSED_STEP_DEFS[_head_id] = dict(
+        _step,
+        config={{
+            key: value
+            for key, value in _config.items()
+            if key not in ("fused_steps", "fused_step_defs")
+        }},
+    )
+    for _member in _members:
+        FUSED_STEP_DEFS[str(_member.get("id"))] = dict(_member)
+    FUSED_MEMBERS[_head_id] = [
+        str(member_id)
+        for member_id in _config.get("fused_steps") or [_head_id]
+        if str(member_id) in FUSED_STEP_DEFS
+    ]
+RESULT_ORDER: List[str] = []
+for _step_id in STEP_ORDER:
+    RESULT_ORDER.extend(FUSED_MEMBERS.get(_step_id, [_step_id]))
 
 
 class WorkflowState(TypedDict, total=False):
@@ -689,6 +805,16 @@ def _run_with_timeout(callback: Callable[[], Dict[str, Any]], timeout_seconds: i
         return future.result(timeout=max(1, int(timeout_seconds)))
 
 
+def _run_inline(callback: Callable[[], Dict[str, Any]], timeout_seconds: int) -> Dict[str, Any]:
+    # Same outcome as _run_with_timeout, whose pool also waits for the call to
+    # return before raising: a result that arrives late counts as a timeout.
+    started = time.perf_counter()
+    result = callback()
+    if time.perf_counter() - started > max(1, int(timeout_seconds)):
+        raise TimeoutError()
+    return result
+
+
 def _tool_step_once(step: Dict[str, Any], state: WorkflowState) -> Dict[str, Any]:
     step_id = str(step.get("id", "unknown_step"))
     config = dict(step.get("config") or {{}})
@@ -720,8 +846,8 @@ def _fallback_synthesis(state: WorkflowState) -> str:
     lines: List[str] = []
     if input_payload.get("query"):
         lines.append(f"Request: {{input_payload.get('query')}}")
-    for step_id in STEP_ORDER:
-        step = STEP_MAP.get(step_id, {{}})
+    for step_id in RESULT_ORDER:
+        step = FUSED_STEP_DEFS.get(step_id) or STEP_MAP.get(step_id, {{}})
         config = dict(step.get("config") or {{}})
         desc = str(config.get("subtask_description") or step_id)
         result = step_results.get(step_id, {{}})
@@ -731,6 +857,8 @@ def _fallback_synthesis(state: WorkflowState) -> str:
     return summary or "No answer generated."
 
 
+{payload_prompt_layout}
+
 def _llm_step_once(step: Dict[str, Any], state: WorkflowState) -> Dict[str, Any]:
     step_id = str(step.get("id", "llm_step"))
     config = dict(step.get("config") or {{}})
@@ -752,15 +880,16 @@ def _llm_step_once(step: Dict[str, Any], state: WorkflowState) -> Dict[str, Any]
 
     try:
         llm = ChatBedrockConverse(model=model_id, temperature=temperature)
-        prompt = (
-            prompt_template
-            + "\\n\\nCurrent task:\\n" + CURRENT_TASK_DESCRIPTION
-            + "\\n\\nApproved plan:\\n" + APPROVED_PLAN
-            + "\\n\\nIntent summary:\\n" + INTENT_SUMMARY
-            + "\\n\\nUser input:\\n" + json.dumps(state.get("input", {{}}), sort_keys=True)
-            + "\\n\\nStep outputs:\\n" + json.dumps(state.get("step_results", {{}}), sort_keys=True)
+        prompt = assemble_llm_prompt(
+            prompt_template,
+            current_task_description=CURRENT_TASK_DESCRIPTION,
+            approved_plan=APPROVED_PLAN,
+            intent_summary=INTENT_SUMMARY,
+            input_json=json.dumps(state.get("input", {{}}), sort_keys=True),
+            step_outputs_json=json.dumps(state.get("step_results", {{}}), sort_keys=True),
         )
         response = llm.invoke(prompt)
+        _note_llm_usage(step_id, prompt, state, response)
         content = getattr(response, "content", None)
         if isinstance(content, list):
             answer = " ".join(str(chunk) for chunk in content).strip()
@@ -801,8 +930,60 @@ def _execute_step_once(step: Dict[str, Any], state: WorkflowState) -> Dict[str,
     }}
 
 
-def _execute_step_with_policy(step: Dict[str, Any], state: WorkflowState) -> Dict[str, Any]:
+def _note_llm_usage(step_id: str, prompt: str, state: WorkflowState, response: Any) -> None:
+    if not STEP_METRICS_PATH:
+        return
+    usage = getattr(response, "usage_metadata", None)
+    usage = usage if isinstance(usage, dict) else {{}}
+    with STEP_METRICS_LOCK:
+        STEP_USAGE[step_id] = {{
+            "prompt_chars": len(prompt),
+            "input_chars": len(json.dumps(state.get("input", {{}}), sort_keys=True)),
+            "input_tokens": usage.get("input_tokens"),
+            "output_tokens": usage.get("output_tokens"),
+        }}
+
+
+def _record_step_metrics(
+    step: Dict[str, Any],
+    *,
+    status: str,
+    started: float,
+    attempt_started: float,
+    attempts: int,
+    timeouts: int,
+    errors: int,
+    result: Optional[Dict[str, Any]] = None,
+) -> None:
+    if not STEP_METRICS_PATH:
+        return
+    finished = time.perf_counter()
+    step_id = str(step.get("id", "unknown_step"))
+    row = {{
+        "step_id": step_id,
+        "step_type": str(step.get("type", "tool")),
+        "status": status,
+        "duration_ms": round((finished - started) * 1000, 3),
+        "attempt_ms": round((finished - attempt_started) * 1000, 3),
+        "attempts": attempts,
+        "timeouts": timeouts,
+        "errors": errors,
+        "output_chars": len(str((result or {{}}).get("result", ""))),
+    }}
+    try:
+        with STEP_METRICS_LOCK:
+            row.update(STEP_USAGE.pop(step_id, {{}}))
+            with open(STEP_METRICS_PATH, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(row, sort_keys=True) + "\\n")
+    except OSError:
+        pass
+
+
+def _execute_step_with_policy(
+    step: Dict[str, Any], state: WorkflowState, inline: bool = False
+) -> Dict[str, Any]:
     step_id = str(step.get("id", "unknown_step"))
+    runner = _run_inline if inline else _run_with_timeout
     retry_cfg = _retry_config(step)
     max_retries = int(retry_cfg.get("max_retries", 0))
     try:
@@ -811,19 +992,36 @@ def _execute_step_with_policy(step: Dict[str, Any], state: WorkflowState) -> Dic
         timeout_seconds = 120
 
     last_error = "Step failed."
+    started = time.perf_counter()
+    timeouts = 0
+    errors = 0
     for attempt in range(max_retries + 1):
+        attempt_started = time.perf_counter()
         try:
-            result = _run_with_timeout(
+            result = runner(
                 lambda: _execute_step_once(step, state),
                 timeout_seconds=timeout_seconds,
             )
-            return _sanitize_result(step_id, result)
+            result = _sanitize_result(step_id, result)
+            _record_step_metrics(
+                step,
+                status=str(result.get("status", "ok")),
+                started=started,
+                attempt_started=attempt_started,
+                attempts=attempt + 1,
+                timeouts=timeouts,
+                errors=errors,
+                result=result,
+            )
+            return result
         except TimeoutError:
+            timeouts += 1
             last_error = (
                 f"Step '{{step_id}}' exceeded timeout {{timeout_seconds}}s "
                 f"(attempt {{attempt + 1}}/{{max_retries + 1}})."
             )
         except Exception as exc:
+            errors += 1
             last_error = str(exc)
 
         if attempt < max_retries:
@@ -831,6 +1029,15 @@ def _execute_step_with_policy(step: Dict[str, Any], state: WorkflowState) -> Dic
             if delay > 0:
                 time.sleep(delay)
 
+    _record_step_metrics(
+        step,
+        status="error",
+        started=started,
+        attempt_started=attempt_started,
+        attempts=max_retries + 1,
+        timeouts=timeouts,
+        errors=errors,
+    )
     return {{
         "tool": step_id,
         "status": "error",
@@ -872,6 +1079,26 @@ def _make_step_node(step_id: str) -> Callable[[WorkflowState], Dict[str, Any]]:
     return _node
 
 
+def _make_fused_node(step_id: str) -> Callable[[WorkflowState], Dict[str, Any]]:
+    members = FUSED_MEMBERS[step_id]
+
+    def _node(state: WorkflowState) -> Dict[str, Any]:
+        step_results = dict(state.get("step_results", {{}}))
+        member_state: WorkflowState = dict(state)  # type: ignore[assignment]
+        member_state["step_results"] = step_results
+        updates: Dict[str, Any] = {{"step_results": step_results}}
+        for member_id in members:
+            result = _execute_step_with_policy(
+                FUSED_STEP_DEFS[member_id], member_state, inline=True
+            )
+            step_results[member_id] = result
+            if member_id in OUTPUT_SOURCES:
+                updates["final_answer"] = str(result.get("result", "")).strip()
+        return updates
+
+    return _node
+
+
 def _make_router(source_step: str) -> Callable[[WorkflowState], str]:
     def _router(state: WorkflowState) -> str:
         source_output = dict(state.get("step_results", {{}})).get(source_step, {{}})
@@ -887,8 +1114,11 @@ def _make_router(source_step: str) -> Callable[[WorkflowState], str]:
 
 
 builder = StateGraph(WorkflowState)
-for step_id in STEP_ORDER:
-    builder.add_node(step_id, _make_step_node(step_id))
+for step_id in NODE_ORDER:
+    if step_id in FUSED_MEMBERS:
+        builder.add_node(step_id, _make_fused_node(step_id))
+    else:
+        builder.add_node(step_id, _make_step_node(step_id))
 
 for root_step in ROOT_STEPS:
     builder.add_edge(START, root_step)
@@ -918,7 +1148,10 @@ def run_workflow(input_payload: Optional[Dict[str, Any]] = None) -> str:
         "step_results": {{}},
         "final_answer": "",
     }}
-    result = GRAPH.invoke(state)
+    if MAX_CONCURRENCY:
+        result = GRAPH.invoke(state, config={{"max_concurrency": MAX_CONCURRENCY}})
+    else:
+        result = GRAPH.invoke(state)
     final_answer = str(result.get("final_answer", "")).strip()
     if final_answer:
         return final_answer
@@ -4,41 +4,96 @@ Optimization pass pipeline for WorkflowSpec.
 
 from __future__ import annotations
 
-from abc import ABC, abstractmethod
-from collections import deque
-from typing import Dict, List, Optional, Set
+import ast
+import heapq
+import json
+import math
+from abc import ABC
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
 from dwc.compiler.dependency_resolver import DependencyResolver
-from dwc.ir.spec_schema import EdgeSpec, StepSpec, WorkflowSpec, model_dump_compat
+from dwc.compiler.pass_cache import PassCache, WorkflowHasher
+from dwc.compiler.pass_profiler import PassProfiler
+from dwc.compiler.prompt_layout import DEFAULT_SYNTHESIS_PROMPT, assemble_llm_prompt
+from dwc.compiler.token_counter import TokenCounter
+from dwc.ir.mutable_spec import MutableEdge, MutableStep, MutableWorkflow
+from dwc.ir.spec_schema import WorkflowSpec
 from dwc.ir.validators import (
     SpecValidationError,
-    normalize_workflow_spec,
     select_terminal_steps,
+    validate_mutable_workflow,
     validate_workflow_spec,
 )
+from dwc.memory.history_store import HistoryStore
 
 
 class OptimizationPass(ABC):
+    """
+    Passes edit a `MutableWorkflow` in place via `run`.
+
+    `apply` keeps the WorkflowSpec-in, WorkflowSpec-out interface for using a
+    pass on its own. A pass that only overrides `apply` still works inside the
+    `Optimizer`, at the cost of a conversion round trip for that pass.
+    Subclasses must override one of the two; this is checked when the class
+    is defined, except for intermediate bases that list `ABC` directly.
+
+    Results are cached by the optimizer when `cacheable` is true, keyed by the
+    input state and `cache_identity()`. Bump `version` when a pass's logic
+    changes, and return any constructor settings that affect its output from
+    `cache_config()`. Passes that read anything besides the workflow (clock,
+    network, mutable stores) must set `cacheable = False` or put a digest of
+    that input in their config.
+    """
+
     name = "base"
+    version = 1
+    cacheable = True
+
+    def cache_config(self) -> Dict[str, Any]:
+        return {}
+
+    def cache_identity(self) -> Dict[str, Any]:
+        cls = type(self)
+        return {
+            "name": self.name,
+            "class": f"{cls.__module__}.{cls.__qualname__}",
+            "version": self.version,
+            "config": self.cache_config(),
+        }
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # Intermediate bases list ABC directly; concrete passes must define
+        # `run` or `apply`, otherwise each default would call the other forever.
+        if ABC in cls.__bases__:
+            return
+        if cls.run is OptimizationPass.run and cls.apply is OptimizationPass.apply:
+            raise TypeError(
+                f"{cls.__qualname__} must override OptimizationPass.run or apply"
+            )
+
+    def run(self, workflow: MutableWorkflow) -> None:
+        workflow.update_from(MutableWorkflow.from_spec(self.apply(workflow.to_spec())))
 
-    @abstractmethod
     def apply(self, spec: WorkflowSpec) -> WorkflowSpec:
-        raise NotImplementedError
+        workflow = MutableWorkflow.from_spec(spec)
+        self.run(workflow)
+        return workflow.to_spec()
 
 
 class ValidatePass(OptimizationPass):
     name = "validate"
 
-    def apply(self, spec: WorkflowSpec) -> WorkflowSpec:
-        validate_workflow_spec(spec)
-        return spec
+    def run(self, workflow: MutableWorkflow) -> None:
+        validate_mutable_workflow(workflow)
 
 
 class NormalizePass(OptimizationPass):
     name = "normalize"
 
-    def apply(self, spec: WorkflowSpec) -> WorkflowSpec:
-        return normalize_workflow_spec(spec)
+    def run(self, workflow: MutableWorkflow) -> None:
+        workflow.sort_canonical()
+        validate_mutable_workflow(workflow)
 
 
 class DependencyResolvePass(OptimizationPass):
@@ -47,58 +102,54 @@ class DependencyResolvePass(OptimizationPass):
     def __init__(self) -> None:
         self.resolver = DependencyResolver()
 
-    def apply(self, spec: WorkflowSpec) -> WorkflowSpec:
-        payload = model_dump_compat(spec)
-        payload.setdefault("metadata", {})
-        payload["metadata"]["dependency"] = {
-            "topological_order": self.resolver.topological_order(spec),
-            "roots": self.resolver.roots(spec),
-            "sinks": self.resolver.sinks(spec),
+    def run(self, workflow: MutableWorkflow) -> None:
+        workflow.metadata["dependency"] = {
+            "topological_order": self.resolver.topological_order(workflow),
+            "roots": self.resolver.roots(workflow),
+            "sinks": self.resolver.sinks(workflow),
         }
-        return WorkflowSpec(**payload)
 
 
 class DeadStepEliminationPass(OptimizationPass):
     name = "dead_step_elimination"
 
-    def apply(self, spec: WorkflowSpec) -> WorkflowSpec:
-        if not spec.steps:
-            return spec
+    def __init__(self) -> None:
+        self.resolver = DependencyResolver()
 
-        reverse: Dict[str, Set[str]] = {step.id: set() for step in spec.steps}
-        for edge in spec.edges:
-            reverse.setdefault(edge.target, set()).add(edge.source)
-            reverse.setdefault(edge.source, set())
+    def run(self, workflow: MutableWorkflow) -> None:
+        if not workflow.steps:
+            return
 
-        terminals = select_terminal_steps(spec)
+        terminals = select_terminal_steps(workflow)
         if not terminals:
-            return spec
-
-        queue = deque(terminals)
-        useful: Set[str] = set(terminals)
-        while queue:
-            node = queue.popleft()
-            for parent in reverse.get(node, set()):
-                if parent not in useful:
-                    useful.add(parent)
-                    queue.append(parent)
-
-        retained_steps = [step for step in spec.steps if step.id in useful]
-        retained_edges = [
+            return
+
+        # A step is useful when it reaches (or is) a terminal step.
+        analysis = self.resolver.analysis(workflow)
+        terminal_mask = 0
+        for step_id in terminals:
+            if step_id in analysis.index:
+                terminal_mask |= 1 << analysis.index[step_id]
+        descendants = analysis.descendants
+        useful: Set[str] = {
+            node
+            for node_id, node in enumerate(analysis.nodes)
+            if descendants[node_id] & terminal_mask
+        }
+
+        workflow.steps = {
+            step_id: step for step_id, step in workflow.steps.items() if step_id in useful
+        }
+        workflow.edges = [
             edge
-            for edge in spec.edges
+            for edge in workflow.edges
             if edge.source in useful and edge.target in useful
         ]
-
-        payload = model_dump_compat(spec)
-        payload["steps"] = [model_dump_compat(step) for step in retained_steps]
-        payload["edges"] = [model_dump_compat(edge) for edge in retained_edges]
-        payload["outputs"] = [
+        workflow.outputs = [
             output
-            for output in payload.get("outputs", [])
-            if not output.get("source_step") or output.get("source_step") in useful
+            for output in workflow.outputs
+            if not output.source_step or output.source_step in useful
         ]
-        return WorkflowSpec(**payload)
 
 
 class MergeCompatibleStepsPass(OptimizationPass):
@@ -108,19 +159,18 @@ class MergeCompatibleStepsPass(OptimizationPass):
 
     name = "merge_compatible_steps"
 
-    def apply(self, spec: WorkflowSpec) -> WorkflowSpec:
-        step_by_id: Dict[str, StepSpec] = {step.id: step for step in spec.steps}
-        incoming: Dict[str, List[EdgeSpec]] = {step.id: [] for step in spec.steps}
-        outgoing: Dict[str, List[EdgeSpec]] = {step.id: [] for step in spec.steps}
-        for edge in spec.edges:
+    def run(self, workflow: MutableWorkflow) -> None:
+        step_by_id: Dict[str, MutableStep] = workflow.steps
+        incoming: Dict[str, List[MutableEdge]] = {step_id: [] for step_id in step_by_id}
+        outgoing: Dict[str, List[MutableEdge]] = {step_id: [] for step_id in step_by_id}
+        for edge in workflow.edges:
             incoming.setdefault(edge.target, []).append(edge)
             outgoing.setdefault(edge.source, []).append(edge)
 
         merged_into: Dict[str, str] = {}
         removed_steps: Set[str] = set()
 
-        for step in spec.steps:
-            source_id = step.id
+        for source_id in list(step_by_id):
             if source_id in removed_steps:
                 continue
 
@@ -152,33 +202,24 @@ class MergeCompatibleStepsPass(OptimizationPass):
                 if "prompt" in target.config:
                     merged_prompt.append(str(target.config["prompt"]))
 
-                source_config = dict(source.config)
                 if merged_prompt:
-                    source_config["prompt"] = "\n\n".join(merged_prompt)
-                source_config["fused_steps"] = [
+                    source.config["prompt"] = "\n\n".join(merged_prompt)
+                source.config["fused_steps"] = [
                     source_id,
                     target_id,
                 ]
-                source_retry = source.retry_policy
-                source_timeout = max(source.timeout_seconds, target.timeout_seconds)
-                step_by_id[source_id] = StepSpec(
-                    id=source.id,
-                    type=source.type,
-                    config=source_config,
-                    retry_policy=source_retry,
-                    timeout_seconds=source_timeout,
-                )
+                source.timeout_seconds = max(source.timeout_seconds, target.timeout_seconds)
 
                 for target_edge in list(outgoing.get(target_id, [])):
                     outgoing[source_id].append(
-                        EdgeSpec(
+                        MutableEdge(
                             source=source_id,
                             target=target_edge.target,
                             condition=target_edge.condition,
                         )
                     )
                     incoming[target_edge.target] = [
-                        EdgeSpec(
+                        MutableEdge(
                             source=source_id if e.source == target_id else e.source,
                             target=e.target,
                             condition=e.condition,
@@ -195,12 +236,11 @@ class MergeCompatibleStepsPass(OptimizationPass):
                 removed_steps.add(target_id)
 
         if not removed_steps:
-            return spec
+            return
 
-        new_steps = [
-            step_by_id[step.id] for step in spec.steps if step.id not in removed_steps
-        ]
-        new_edges: List[EdgeSpec] = []
+        for step_id in removed_steps:
+            del step_by_id[step_id]
+        new_edges: List[MutableEdge] = []
         seen_edges: Set[str] = set()
         for source_id, edges in outgoing.items():
             if source_id in removed_steps:
@@ -215,17 +255,13 @@ class MergeCompatibleStepsPass(OptimizationPass):
                     continue
                 seen_edges.add(key)
                 new_edges.append(
-                    EdgeSpec(source=source_key, target=target_id, condition=edge.condition)
+                    MutableEdge(source=source_key, target=target_id, condition=edge.condition)
                 )
 
-        payload = model_dump_compat(spec)
-        payload["steps"] = [model_dump_compat(step) for step in new_steps]
-        payload["edges"] = [model_dump_compat(edge) for edge in new_edges]
-        for output in payload.get("outputs", []):
-            source_step = output.get("source_step")
-            if source_step in merged_into:
-                output["source_step"] = merged_into[source_step]
-        return WorkflowSpec(**payload)
+        workflow.edges = new_edges
+        for output in workflow.outputs:
+            if output.source_step in merged_into:
+                output.source_step = merged_into[output.source_step]
 
 
 class ParallelizationPass(OptimizationPass):
@@ -234,40 +270,31 @@ class ParallelizationPass(OptimizationPass):
     def __init__(self) -> None:
         self.resolver = DependencyResolver()
 
-    def apply(self, spec: WorkflowSpec) -> WorkflowSpec:
-        groups = self.resolver.find_parallel_groups(spec)
+    def run(self, workflow: MutableWorkflow) -> None:
+        groups = self.resolver.find_parallel_groups(workflow)
         if not groups:
-            return spec
+            return
 
-        payload = model_dump_compat(spec)
-        payload.setdefault("metadata", {})
-        payload["metadata"]["parallel_groups"] = groups
-        group_index: Dict[str, int] = {}
+        workflow.metadata["parallel_groups"] = groups
         for idx, group in enumerate(groups):
             for step_id in group:
-                group_index[step_id] = idx
-
-        for step in payload["steps"]:
-            if step["id"] in group_index:
-                step.setdefault("config", {})
-                step["config"]["parallel_group"] = f"group_{group_index[step['id']]}"
-        return WorkflowSpec(**payload)
+                step = workflow.steps.get(step_id)
+                if step is not None:
+                    step.config["parallel_group"] = f"group_{idx}"
 
 
 class RetryPolicyInjectionPass(OptimizationPass):
     name = "retry_policy_injection"
 
-    def apply(self, spec: WorkflowSpec) -> WorkflowSpec:
-        payload = model_dump_compat(spec)
-        for step in payload["steps"]:
-            retry = step.get("retry_policy", {})
-            step_type = step["type"]
-            if step_type == "llm":
+    def run(self, workflow: MutableWorkflow) -> None:
+        for step in workflow.steps.values():
+            retry = step.retry_policy
+            if step.type == "llm":
                 retry["max_retries"] = max(2, int(retry.get("max_retries", 0)))
                 retry["backoff_strategy"] = retry.get(
                     "backoff_strategy", "exponential"
                 )
-            elif step_type == "tool":
+            elif step.type == "tool":
                 retry["max_retries"] = max(1, int(retry.get("max_retries", 0)))
                 retry["backoff_strategy"] = retry.get("backoff_strategy", "fixed")
             else:
@@ -276,44 +303,895 @@ class RetryPolicyInjectionPass(OptimizationPass):
 
             retry.setdefault("initial_delay_seconds", 1.0)
             retry.setdefault("max_delay_seconds", 30.0)
-            step["retry_policy"] = retry
-            step["timeout_seconds"] = max(30, step.get("timeout_seconds", 30))
-        return WorkflowSpec(**payload)
+            step.timeout_seconds = max(30, step.timeout_seconds)
+
+
+def fused_step_defs(step: MutableStep) -> List[Dict[str, Any]]:
+    """
+    Definitions of the members a `ToolFusionPass` composite runs after its
+    own step; empty for ordinary steps.
+    """
+
+    members = step.config.get("fused_step_defs")
+    if step.type != "tool" or not isinstance(members, list):
+        return []
+    return [member for member in members if isinstance(member, dict)]
+
+
+def fused_member_steps(step: MutableStep) -> List[MutableStep]:
+    """
+    `fused_step_defs` as steps, for passes that account for each member.
+    """
+
+    return [
+        MutableStep(
+            id=str(member.get("id")),
+            type=str(member.get("type") or "tool"),
+            config=dict(member.get("config") or {}),
+            retry_policy=dict(member.get("retry_policy") or {}),
+            timeout_seconds=int(member.get("timeout_seconds") or 0),
+        )
+        for member in fused_step_defs(step)
+    ]
+
+
+class HistoryCalibratedPass(OptimizationPass, ABC):
+    """
+    Base for passes driven by per-step runtime telemetry (`step_runs` in
+    `HistoryStore`, summarized over the most recent `window` runs).
+
+    A step's own stats count only when its recorded type still matches and
+    there are at least `min_samples` runs. The history revision is part of
+    the cache identity, so newly recorded runs invalidate cached outputs.
+    Without a history store, subclasses see no observations.
+    """
+
+    def __init__(
+        self,
+        history: Optional[HistoryStore] = None,
+        *,
+        min_samples: int = 3,
+        window: int = 50,
+    ) -> None:
+        self.history = history
+        self.min_samples = max(1, int(min_samples))
+        self.window = max(1, int(window))
+
+    def cache_config(self) -> Dict[str, Any]:
+        return {
+            "history_revision": (
+                self.history.step_runs_revision() if self.history is not None else None
+            ),
+            "min_samples": self.min_samples,
+            "window": self.window,
+        }
+
+    def observed_steps(
+        self, workflow: MutableWorkflow, *, include_fused: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Usable stats per step id. With `include_fused`, members of fused tool
+        composites (`config.fused_step_defs`) are included; their runs are
+        recorded under their own ids.
+        """
+
+        if self.history is None:
+            return {}
+        step_types = {step_id: step.type for step_id, step in workflow.steps.items()}
+        if include_fused:
+            for step in workflow.steps.values():
+                for member in fused_step_defs(step):
+                    step_types.setdefault(str(member.get("id")), str(member.get("type")))
+        stats = self.history.step_run_stats(workflow.name, window=self.window)
+        return {
+            step_id: row
+            for step_id, row in stats.items()
+            if step_types.get(step_id) == row["step_type"] and self.usable(row)
+        }
+
+    def observed_types(self) -> Dict[str, Dict[str, Any]]:
+        if self.history is None:
+            return {}
+        stats = self.history.step_type_stats(window=self.window * 10)
+        return {step_type: row for step_type, row in stats.items() if self.usable(row)}
+
+    def usable(self, stats: Optional[Dict[str, Any]]) -> bool:
+        return stats is not None and stats.get("samples", 0) >= self.min_samples
+
+
+class ProfileGuidedOptimizationPass(HistoryCalibratedPass):
+    """
+    Retune steps from their observed runs in earlier executions of the same
+    workflow; runs after `RetryPolicyInjectionPass` and overrides its blanket
+    defaults for profiled steps only.
+
+    - Timeout: p99 of successful final attempts times `timeout_headroom`,
+      clamped to [`min_timeout_seconds`, `max_timeout_seconds`]. Those samples
+      are censored when attempts timed out, so the timeout never shrinks then.
+    - Retries: the fewest (at least `min_retries`, at most `max_retries`) that
+      bring the observed per-attempt transient failure rate (timeouts plus
+      raised errors) to `target_failure_rate`. Steps whose runs mostly end in
+      an error despite retries are deterministic failures; they keep
+      `min_retries`.
+    - Ordering: steps within each parallel group are sorted by measured p50,
+      longest first. Per-wave concurrency and critical-path priority from
+      measured costs are left to `CriticalPathSchedulingPass`.
+
+    Every change is recorded in `metadata.pgo.decisions`.
+    """
+
+    name = "profile_guided"
+
+    def __init__(
+        self,
+        history: Optional[HistoryStore] = None,
+        *,
+        min_samples: int = 5,
+        window: int = 50,
+        timeout_headroom: float = 1.5,
+        min_timeout_seconds: int = 5,
+        max_timeout_seconds: int = 900,
+        target_failure_rate: float = 0.01,
+        min_retries: int = 1,
+        max_retries: int = 5,
+    ) -> None:
+        super().__init__(history, min_samples=min_samples, window=window)
+        self.timeout_headroom = max(1.0, float(timeout_headroom))
+        self.min_timeout_seconds = max(1, int(min_timeout_seconds))
+        self.max_timeout_seconds = max(self.min_timeout_seconds, int(max_timeout_seconds))
+        self.target_failure_rate = min(1.0, max(1e-6, float(target_failure_rate)))
+        self.min_retries = max(0, int(min_retries))
+        self.max_retries = max(self.min_retries, int(max_retries))
+
+    def cache_config(self) -> Dict[str, Any]:
+        config = super().cache_config()
+        config.update(
+            {
+                "timeout_headroom": self.timeout_headroom,
+                "min_timeout_seconds": self.min_timeout_seconds,
+                "max_timeout_seconds": self.max_timeout_seconds,
+                "target_failure_rate": self.target_failure_rate,
+                "min_retries": self.min_retries,
+                "max_retries": self.max_retries,
+            }
+        )
+        return config
+
+    def run(self, workflow: MutableWorkflow) -> None:
+        observed = self.observed_steps(workflow)
+        if not observed:
+            return
+
+        decisions: List[Dict[str, Any]] = []
+        for step_id, stats in observed.items():
+            step = workflow.steps[step_id]
+            timeout = self._tuned_timeout(step, stats)
+            if timeout is not None and timeout[0] != step.timeout_seconds:
+                decisions.append(
+                    {
+                        "step_id": step_id,
+                        "action": "set_timeout_seconds",
+                        "before": step.timeout_seconds,
+                        "after": timeout[0],
+                        "reason": timeout[1],
+                    }
+                )
+                step.timeout_seconds = timeout[0]
+
+            retries, reason = self._tuned_retries(stats)
+            before = int(step.retry_policy.get("max_retries", 0))
+            if retries != before:
+                decisions.append(
+                    {
+                        "step_id": step_id,
+                        "action": "set_max_retries",
+                        "before": before,
+                        "after": retries,
+                        "reason": reason,
+                    }
+                )
+                step.retry_policy["max_retries"] = retries
+
+        groups = workflow.metadata.get("parallel_groups")
+        if groups:
+            reordered: List[List[str]] = []
+            for idx, group in enumerate(groups):
+                ordered = sorted(
+                    group,
+                    key=lambda step_id: -float(observed.get(step_id, {}).get("p50_ms") or 0.0),
+                )
+                if ordered != list(group):
+                    decisions.append(
+                        {
+                            "action": "reorder_parallel_group",
+                            "group": f"group_{idx}",
+                            "before": list(group),
+                            "after": ordered,
+                            "reason": "Longest measured p50 first.",
+                        }
+                    )
+                reordered.append(ordered)
+            workflow.metadata["parallel_groups"] = reordered
+
+        workflow.metadata["pgo"] = {
+            "profiled_steps": {
+                step_id: {
+                    key: stats[key]
+                    for key in (
+                        "samples",
+                        "p50_ms",
+                        "p99_ms",
+                        "attempt_p99_ms",
+                        "mean_attempts",
+                        "timeout_rate",
+                        "error_rate",
+                        "failure_rate",
+                    )
+                }
+                for step_id, stats in sorted(observed.items())
+            },
+            "unprofiled_steps": sorted(set(workflow.steps) - set(observed)),
+            "decisions": decisions,
+        }
+
+    def _tuned_timeout(
+        self, step: MutableStep, stats: Dict[str, Any]
+    ) -> Optional[Tuple[int, str]]:
+        p99_ms = stats.get("attempt_p99_ms")
+        if p99_ms is None:
+            return None
+        seconds = int(math.ceil(float(p99_ms) * self.timeout_headroom / 1000.0))
+        seconds = min(self.max_timeout_seconds, max(self.min_timeout_seconds, seconds))
+        reason = (
+            f"Successful-attempt p99 {float(p99_ms):.0f} ms x {self.timeout_headroom:g} headroom "
+            f"over {stats['samples']} run(s)."
+        )
+        if stats.get("timeout_rate") and seconds < step.timeout_seconds:
+            return step.timeout_seconds, reason
+        return seconds, reason
+
+    def _tuned_retries(self, stats: Dict[str, Any]) -> Tuple[int, str]:
+        rate = float(stats.get("timeout_rate") or 0.0) + float(stats.get("error_rate") or 0.0)
+        if float(stats.get("failure_rate") or 0.0) >= 0.5:
+            return self.min_retries, (
+                f"{float(stats['failure_rate']):.0%} of runs failed after retries; "
+                "failures are not transient."
+            )
+        if rate <= 0.0:
+            return self.min_retries, f"No failed attempts in {stats['samples']} run(s)."
+        retries = self.max_retries
+        if rate < 1.0:
+            needed = math.ceil(math.log(self.target_failure_rate) / math.log(rate)) - 1
+            retries = min(self.max_retries, max(self.min_retries, needed))
+        return retries, (
+            f"Transient failure rate {rate:.1%} per attempt; "
+            f"target {self.target_failure_rate:.1%} per run."
+        )
+
+
+class ToolFusionPass(HistoryCalibratedPass):
+    """
+    Fuse chains and sibling groups of cheap, deterministic tool steps into one
+    composite graph node whose members still run with their own policies.
+    """
+
+    name = "tool_fusion"
+    FUSED_CONFIG_KEYS = ("fused_steps", "fused_step_defs")
+    # Names, attributes, and imported modules (lower-cased) that disqualify a tool.
+    NONDETERMINISTIC_NAMES = frozenset(
+        (
+            "safe_cli", "subprocess", "system", "popen", "environ", "getenv",
+            "os", "io", "pathlib", "path", "listdir", "scandir", "walk", "glob",
+            "iglob", "shutil", "tempfile", "fileinput", "sqlite3", "pickle",
+            "shelve", "dbm", "read_text", "read_bytes", "write_text", "write_bytes",
+            "mkdir", "makedirs", "remove", "unlink", "rename",
+            "socket", "urllib", "requests", "http", "httpx", "boto3",
+            "random", "secrets", "uuid", "nonce", "time", "datetime",
+            "timestamp", "clock", "date", "threading", "asyncio", "open", "input",
+            "__import__", "importlib", "eval", "exec",
+        )
+    )
+
+    def __init__(
+        self,
+        history: Optional[HistoryStore] = None,
+        *,
+        min_samples: int = 3,
+        window: int = 50,
+        max_step_ms: float = 100.0,
+        max_fused_steps: int = 8,
+    ) -> None:
+        super().__init__(history, min_samples=min_samples, window=window)
+        self.resolver = DependencyResolver()
+        self.max_step_ms = max(0.0, float(max_step_ms))
+        self.max_fused_steps = max(2, int(max_fused_steps))
+
+    def cache_config(self) -> Dict[str, Any]:
+        config = super().cache_config()
+        config.update(
+            {"max_step_ms": self.max_step_ms, "max_fused_steps": self.max_fused_steps}
+        )
+        return config
+
+    def run(self, workflow: MutableWorkflow) -> None:
+        candidates = self._candidates(workflow)
+        if len(candidates) < 2:
+            return
+        analysis = self.resolver.analysis(workflow)
+        conditional: Set[Tuple[str, str]] = {
+            (edge.source, edge.target) for edge in workflow.edges if edge.condition
+        }
 
+        def preds(step_id: str) -> List[str]:
+            return [analysis.nodes[idx] for idx in analysis.predecessors[analysis.index[step_id]]]
+
+        def succs(step_id: str) -> List[str]:
+            return [analysis.nodes[idx] for idx in analysis.successors[analysis.index[step_id]]]
+
+        def plain_out(step_id: str) -> bool:
+            return all((step_id, target) not in conditional for target in succs(step_id))
+
+        def plain_in(step_id: str) -> bool:
+            return all((source, step_id) not in conditional for source in preds(step_id))
+
+        # Chains, walked in topological order from each unabsorbed candidate.
+        units: List[List[str]] = []
+        absorbed: Set[str] = set()
+        for step_id in analysis.topological_order():
+            if step_id not in candidates or step_id in absorbed:
+                continue
+            unit = [step_id]
+            absorbed.add(step_id)
+            tail = step_id
+            while len(unit) < self.max_fused_steps and plain_out(tail):
+                following = succs(tail)
+                if len(following) != 1:
+                    break
+                target = following[0]
+                if (
+                    target not in candidates
+                    or target in absorbed
+                    or preds(target) != [tail]
+                    or not plain_out(target)
+                ):
+                    break
+                unit.append(target)
+                absorbed.add(target)
+                tail = target
+            units.append(unit)
+
+        # Sibling groups: units whose members all connect only through plain
+        # edges and share the same predecessors and successors.
+        by_neighbors: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], List[List[str]]] = {}
+        fused: List[List[str]] = []
+        for unit in units:
+            if plain_in(unit[0]) and plain_out(unit[-1]):
+                key = (tuple(preds(unit[0])), tuple(succs(unit[-1])))
+                by_neighbors.setdefault(key, []).append(unit)
+            elif len(unit) > 1:
+                fused.append(unit)
+        for siblings in by_neighbors.values():
+            current: List[str] = []
+            for unit in sorted(siblings, key=lambda members: members[0]):
+                if current and len(current) + len(unit) > self.max_fused_steps:
+                    if len(current) > 1:
+                        fused.append(current)
+                    current = []
+                current = current + unit
+            if len(current) > 1:
+                fused.append(current)
+        if not fused:
+            return
+
+        head_of: Dict[str, str] = {}
+        for members in fused:
+            head = workflow.steps[members[0]]
+            head.config["fused_steps"] = list(members)
+            head.config["fused_step_defs"] = [
+                workflow.steps[member_id].to_payload() for member_id in members[1:]
+            ]
+            for member_id in members:
+                head_of[member_id] = members[0]
+        for member_id, head_id in head_of.items():
+            if member_id != head_id:
+                del workflow.steps[member_id]
+
+        new_edges: List[MutableEdge] = []
+        seen_edges: Set[Tuple[str, str, str]] = set()
+        for edge in workflow.edges:
+            source = head_of.get(edge.source, edge.source)
+            target = head_of.get(edge.target, edge.target)
+            key = (source, target, edge.condition or "")
+            if source == target or key in seen_edges:
+                continue
+            seen_edges.add(key)
+            new_edges.append(MutableEdge(source=source, target=target, condition=edge.condition))
+        workflow.edges = new_edges
+
+        groups = workflow.metadata.get("parallel_groups")
+        if groups:
+            remapped: List[List[str]] = []
+            for group in groups:
+                members = list(dict.fromkeys(head_of.get(step_id, step_id) for step_id in group))
+                if len(members) > 1:
+                    remapped.append(members)
+            workflow.metadata["parallel_groups"] = remapped
+            for step in workflow.steps.values():
+                step.config.pop("parallel_group", None)
+            for idx, group in enumerate(remapped):
+                for step_id in group:
+                    workflow.steps[step_id].config["parallel_group"] = f"group_{idx}"
+
+        workflow.metadata["tool_fusion"] = {
+            "fused": {members[0]: list(members) for members in fused},
+            "steps_fused": sum(len(members) for members in fused),
+            "nodes_saved": sum(len(members) - 1 for members in fused),
+        }
+
+    def _candidates(self, workflow: MutableWorkflow) -> Set[str]:
+        observed = self.observed_steps(workflow)
+        output_sources = {output.source_step for output in workflow.outputs if output.source_step}
+        tool_functions = workflow.metadata.get("tool_functions")
+        tool_functions = tool_functions if isinstance(tool_functions, dict) else {}
+        candidates: Set[str] = set()
+        for step in workflow.steps.values():
+            if (
+                step.type != "tool"
+                or step.id in output_sources
+                or step.config.get("loader")
+                or any(key in step.config for key in self.FUSED_CONFIG_KEYS)
+            ):
+                continue
+            # Unprofiled steps are never assumed cheap.
+            stats = observed.get(step.id)
+            if (
+                not self.usable(stats)
+                or float(stats.get("p95_ms") or 0.0) > self.max_step_ms
+                or float(stats.get("timeout_rate") or 0.0) > 0
+            ):
+                continue
+            tool = tool_functions.get(str(step.config.get("tool_name") or ""))
+            code = str(tool.get("code") or "") if isinstance(tool, dict) else ""
+            names = self._code_names(code)
+            if names is None or not self.NONDETERMINISTIC_NAMES.isdisjoint(names):
+                continue
+            candidates.add(step.id)
+        return candidates
+
+    @staticmethod
+    def _code_names(code: str) -> Optional[Set[str]]:
+        """
+        Lower-cased names, attributes, and imported module parts in `code`, or
+        None when there is no source or it does not parse.
+        """
+
+        if not code.strip():
+            return None
+        try:
+            tree = ast.parse(code)
+        except (SyntaxError, ValueError):
+            return None
+        names: Set[str] = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name):
+                names.add(node.id.lower())
+            elif isinstance(node, ast.Attribute):
+                names.add(node.attr.lower())
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    names.update(alias.name.lower().split("."))
+            elif isinstance(node, ast.ImportFrom):
+                names.update((node.module or "").lower().split("."))
+                names.update(alias.name.lower() for alias in node.names)
+        return names
+
+
+class CriticalPathSchedulingPass(HistoryCalibratedPass):
+    """
+    Estimate a cost for every step, then derive the critical path, per-step
+    slack, and execution waves; everything goes to `metadata.schedule`.
+
+    A step's cost is the p50 duration of its observed runs in this workflow,
+    else the p50 of its step type across workflows, else a prior of
+    `PRIOR_TIMEOUT_FRACTION` of its timeout; a fused composite costs the sum
+    of its members. Conditional edges are treated as hard dependencies.
+    Waves are ASAP levels; a wave's recommended concurrency is the fewest workers that
+    finish it (longest-processing-time-first packing) within its longest
+    step, and is informational only. `priority_order` (wave, then least
+    slack, then most expensive) is the node order codegen emits. The runtime
+    is throttled only when `max_concurrency` is set explicitly.
+    """
+
+    name = "critical_path_schedule"
+    PRIOR_TIMEOUT_FRACTION = {"llm": 0.1, "tool": 0.05}
+    DEFAULT_PRIOR_FRACTION = 0.01
+
+    def __init__(
+        self,
+        history: Optional[HistoryStore] = None,
+        *,
+        min_samples: int = 3,
+        window: int = 50,
+        max_concurrency: Optional[int] = None,
+    ) -> None:
+        super().__init__(history, min_samples=min_samples, window=window)
+        self.resolver = DependencyResolver()
+        self.max_concurrency = (
+            max(1, int(max_concurrency)) if max_concurrency is not None else None
+        )
+
+    def cache_config(self) -> Dict[str, Any]:
+        config = super().cache_config()
+        config["max_concurrency"] = self.max_concurrency
+        return config
+
+    def run(self, workflow: MutableWorkflow) -> None:
+        if not workflow.steps:
+            return
+        costs = self._step_costs(workflow)
+        analysis = self.resolver.analysis(workflow)
+        order = analysis.topological_order()
+
+        parents_of = {
+            step_id: [analysis.nodes[idx] for idx in analysis.predecessors[analysis.index[step_id]]]
+            for step_id in order
+        }
+        children_of = {
+            step_id: [analysis.nodes[idx] for idx in analysis.successors[analysis.index[step_id]]]
+            for step_id in order
+        }
+
+        earliest: Dict[str, float] = {}
+        level: Dict[str, int] = {}
+        for step_id in order:
+            parents = parents_of[step_id]
+            earliest[step_id] = max(
+                (earliest[parent] + costs[parent][0] for parent in parents), default=0.0
+            )
+            level[step_id] = max((level[parent] + 1 for parent in parents), default=0)
+        makespan = max(earliest[step_id] + costs[step_id][0] for step_id in order)
+
+        latest: Dict[str, float] = {}
+        for step_id in reversed(order):
+            deadline = min((latest[child] for child in children_of[step_id]), default=makespan)
+            latest[step_id] = deadline - costs[step_id][0]
+
+        def finish(step_id: str) -> float:
+            return earliest[step_id] + costs[step_id][0]
+
+        # Walk back from the step finishing last through the parent gating each start.
+        critical_path: List[str] = []
+        current: Optional[str] = max(order, key=finish)
+        while current is not None:
+            critical_path.append(current)
+            current = max(parents_of[current], key=finish, default=None)
+        critical_path.reverse()
+
+        steps: Dict[str, Dict[str, Any]] = {}
+        for step_id in order:
+            slack = max(0.0, latest[step_id] - earliest[step_id])
+            steps[step_id] = {
+                "cost_ms": round(costs[step_id][0], 3),
+                "cost_source": costs[step_id][1],
+                "earliest_start_ms": round(earliest[step_id], 3),
+                "latest_start_ms": round(latest[step_id], 3),
+                "slack_ms": round(slack, 3),
+                "wave": level[step_id],
+                "critical": slack <= 1e-6,
+            }
+
+        priority_order = sorted(
+            order,
+            key=lambda step_id: (
+                level[step_id],
+                latest[step_id] - earliest[step_id],
+                -costs[step_id][0],
+            ),
+        )
+        waves: List[Dict[str, Any]] = []
+        for step_id in priority_order:
+            if not waves or waves[-1]["index"] != level[step_id]:
+                waves.append({"index": level[step_id], "steps": []})
+            waves[-1]["steps"].append(step_id)
+        for wave in waves:
+            concurrency, estimated = self._wave_concurrency(
+                [costs[step_id][0] for step_id in wave["steps"]]
+            )
+            wave["recommended_concurrency"] = concurrency
+            wave["estimated_ms"] = round(estimated, 3)
+
+        sources: Dict[str, int] = {}
+        for _, source in costs.values():
+            sources[source] = sources.get(source, 0) + 1
+        workflow.metadata["schedule"] = {
+            "makespan_ms": round(makespan, 3),
+            "sequential_ms": round(sum(cost for cost, _ in costs.values()), 3),
+            "critical_path": critical_path,
+            "cost_sources": dict(sorted(sources.items())),
+            "max_concurrency": self.max_concurrency,
+            "priority_order": priority_order,
+            "waves": waves,
+            "steps": steps,
+        }
+
+    def _step_costs(self, workflow: MutableWorkflow) -> Dict[str, Tuple[float, str]]:
+        step_stats = self.observed_steps(workflow, include_fused=True)
+        type_stats = self.observed_types()
+
+        def cost(step_id: str, step_type: str, timeout_seconds: int) -> Tuple[float, str]:
+            if step_id in step_stats:
+                return float(step_stats[step_id]["p50_ms"]), "history"
+            if step_type in type_stats:
+                return float(type_stats[step_type]["p50_ms"]), "step_type_history"
+            fraction = self.PRIOR_TIMEOUT_FRACTION.get(step_type, self.DEFAULT_PRIOR_FRACTION)
+            return timeout_seconds * 1000.0 * fraction, "timeout_prior"
+
+        costs: Dict[str, Tuple[float, str]] = {}
+        for step in workflow.steps.values():
+            own = cost(step.id, step.type, step.timeout_seconds)
+            members = fused_step_defs(step)
+            if members:
+                total = own[0] + sum(
+                    cost(
+                        str(member.get("id")),
+                        str(member.get("type")),
+                        int(member.get("timeout_seconds") or 0),
+                    )[0]
+                    for member in members
+                )
+                costs[step.id] = (total, "fused")
+            else:
+                costs[step.id] = own
+        return costs
+
+    def _wave_concurrency(self, costs: List[float]) -> Tuple[int, float]:
+        ordered = sorted(costs, reverse=True)
+        target = ordered[0]
+        limit = min(len(ordered), self.max_concurrency or len(ordered))
+        # No packing beats total / longest workers, so start the search there.
+        lower = math.ceil(sum(ordered) / target - 1e-9) if target > 0 else 1
+        for workers in range(max(1, min(lower, limit)), limit + 1):
+            loads = [0.0] * workers
+            for cost in ordered:
+                heapq.heappush(loads, heapq.heappop(loads) + cost)
+            if max(loads) <= target or workers == limit:
+                return workers, max(loads)
+        return limit, target
+
+
+class CostEstimationPass(HistoryCalibratedPass):
+    """
+    p50/p95 token, cost, and latency estimates per LLM step and per workflow,
+    written to `metadata.cost_estimate`.
+    """
 
-class CostEstimationPass(OptimizationPass):
     name = "cost_estimation"
+    version = 2
+    OUTPUT_PRIOR_CHARS = {"tool": 400, "llm": 2000}
+    DEFAULT_OUTPUT_PRIOR_CHARS = 200
+    INPUT_PRIOR_CHARS = {"document": 8000}
+    DEFAULT_INPUT_PRIOR_CHARS = 200
+    PRIOR_P95_FACTOR = 3.0
+    CALIBRATION_BOUNDS = (0.25, 4.0)
+    LLM_OVERHEAD_MS = 400.0
+    INPUT_TOKENS_PER_SECOND = 5000.0
+    OUTPUT_TOKENS_PER_SECOND = 60.0
 
-    def apply(self, spec: WorkflowSpec) -> WorkflowSpec:
-        llm_steps = [step for step in spec.steps if step.type == "llm"]
-        estimated_input_tokens = 0
-        estimated_output_tokens = 0
-
-        for step in llm_steps:
-            prompt = str(step.config.get("prompt", ""))
-            prompt_tokens = max(1, len(prompt) // 4)
-            response_tokens = int(step.config.get("max_output_tokens", 512))
-            estimated_input_tokens += prompt_tokens
-            estimated_output_tokens += response_tokens
-
-        # Conservative default estimate for Claude-like pricing:
-        # $0.003 / 1k input tokens, $0.015 / 1k output tokens
-        input_cost = (estimated_input_tokens / 1000.0) * 0.003
-        output_cost = (estimated_output_tokens / 1000.0) * 0.015
-
-        payload = model_dump_compat(spec)
-        payload.setdefault("metadata", {})
-        payload["metadata"]["cost_estimate"] = {
-            "llm_steps": len(llm_steps),
-            "estimated_input_tokens": estimated_input_tokens,
-            "estimated_output_tokens": estimated_output_tokens,
-            "estimated_total_usd": round(input_cost + output_cost, 6),
+    def __init__(
+        self,
+        history: Optional[HistoryStore] = None,
+        *,
+        min_samples: int = 3,
+        window: int = 50,
+        token_counter: Optional[TokenCounter] = None,
+        input_usd_per_1k: float = 0.003,
+        output_usd_per_1k: float = 0.015,
+    ) -> None:
+        super().__init__(history, min_samples=min_samples, window=window)
+        self.resolver = DependencyResolver()
+        self.token_counter = token_counter or TokenCounter()
+        self.input_usd_per_1k = float(input_usd_per_1k)
+        self.output_usd_per_1k = float(output_usd_per_1k)
+
+    def cache_config(self) -> Dict[str, Any]:
+        config = super().cache_config()
+        config.update(
+            {
+                "tokenizer": self.token_counter.name,
+                "input_usd_per_1k": self.input_usd_per_1k,
+                "output_usd_per_1k": self.output_usd_per_1k,
+            }
+        )
+        return config
+
+    def run(self, workflow: MutableWorkflow) -> None:
+        step_stats = self.observed_steps(workflow, include_fused=True)
+        type_stats = self.observed_types()
+        analysis = self.resolver.analysis(workflow)
+        metadata = workflow.metadata
+        task = str(metadata.get("current_task_description", workflow.description))
+        plan = str(metadata.get("approved_plan", ""))
+        intent = str(metadata.get("intent_summary", ""))
+        input_prior = sum(
+            self.INPUT_PRIOR_CHARS.get(item.data_type, self.DEFAULT_INPUT_PRIOR_CHARS)
+            for item in workflow.inputs
+        )
+
+        def observed(step: MutableStep, field: str) -> Optional[Tuple[float, float]]:
+            for stats in (step_stats.get(step.id), type_stats.get(step.type)):
+                if stats is not None and stats.get(f"{field}_p50") is not None:
+                    return float(stats[f"{field}_p50"]), float(stats[f"{field}_p95"])
+            return None
+
+        def output_chars(step: MutableStep) -> Tuple[float, float]:
+            sizes = observed(step, "output_chars")
+            if sizes is not None:
+                return sizes
+            prior = float(self.OUTPUT_PRIOR_CHARS.get(step.type, self.DEFAULT_OUTPUT_PRIOR_CHARS))
+            return prior, prior * self.PRIOR_P95_FACTOR
+
+        estimates: Dict[str, Dict[str, Any]] = {}
+        for step in workflow.steps.values():
+            if step.type != "llm":
+                continue
+            template = str(
+                step.config.get("prompt")
+                or metadata.get("synthesis_prompt")
+                or DEFAULT_SYNTHESIS_PROMPT
+            )
+            target = analysis.index[step.id]
+            # Fused tool members each write their own step_results entry.
+            upstream: List[MutableStep] = []
+            for row in workflow.steps.values():
+                if row.id != step.id and analysis.descendants[analysis.index[row.id]] >> target & 1:
+                    upstream.append(row)
+                    upstream.extend(fused_member_steps(row))
+            skeleton = json.dumps(
+                {
+                    row.id: {
+                        "result": "",
+                        "status": "ok",
+                        "tool": str(row.config.get("tool_name") or row.id),
+                    }
+                    for row in upstream
+                },
+                sort_keys=True,
+            )
+            fixed_text = assemble_llm_prompt(
+                template,
+                current_task_description=task,
+                approved_plan=plan,
+                intent_summary=intent,
+                input_json="",
+                step_outputs_json=skeleton,
+            )
+            fixed_tokens = self.token_counter.count(fixed_text)
+            density = self.token_counter.tokens_per_char(fixed_text)
+            input_sizes = observed(step, "input_chars") or (
+                float(input_prior),
+                input_prior * self.PRIOR_P95_FACTOR,
+            )
+            upstream_sizes = [output_chars(row) for row in upstream]
+            input_tokens = [
+                fixed_tokens
+                + density * (input_sizes[idx] + sum(sizes[idx] for sizes in upstream_sizes))
+                for idx in (0, 1)
+            ]
+
+            input_source = "tokenizer" if self.token_counter.exact else "chars_estimate"
+            calibration = 1.0
+            real_tokens = observed(step, "input_tokens")
+            prompt_chars = observed(step, "prompt_chars")
+            if real_tokens is not None and prompt_chars is not None and prompt_chars[0] > 0:
+                low, high = self.CALIBRATION_BOUNDS
+                calibration = min(high, max(low, real_tokens[0] / (prompt_chars[0] * density)))
+                input_tokens = [tokens * calibration for tokens in input_tokens]
+                input_source += "+calibrated"
+
+            max_output = int(step.config.get("max_output_tokens", 512))
+            output_tokens = observed(step, "output_tokens")
+            output_source = "history"
+            if output_tokens is None:
+                output_tokens = (max_output / 2.0, float(max_output))
+                output_source = "max_output_tokens"
+
+            latency = None
+            stats = step_stats.get(step.id)
+            if stats is not None:
+                latency = (float(stats["p50_ms"]), float(stats["p95_ms"]))
+            latency_source = "history"
+            if latency is None:
+                latency_source = "token_rate"
+                latency = tuple(
+                    self.LLM_OVERHEAD_MS
+                    + input_tokens[idx] / self.INPUT_TOKENS_PER_SECOND * 1000.0
+                    + output_tokens[idx] / self.OUTPUT_TOKENS_PER_SECOND * 1000.0
+                    for idx in (0, 1)
+                )
+
+            estimates[step.id] = {
+                "input_tokens": self._pair(input_tokens, digits=0),
+                "output_tokens": self._pair(output_tokens, digits=0),
+                "usd": self._pair(
+                    [
+                        input_tokens[idx] / 1000.0 * self.input_usd_per_1k
+                        + output_tokens[idx] / 1000.0 * self.output_usd_per_1k
+                        for idx in (0, 1)
+                    ],
+                    digits=6,
+                ),
+                "latency_ms": self._pair(latency, digits=1),
+                "upstream_steps": len(upstream),
+                "calibration": round(calibration, 4),
+                "sources": {
+                    "input": input_source,
+                    "output": output_source,
+                    "latency": latency_source,
+                },
+            }
+
+        totals = {
+            quantile: {
+                field: round(sum(row[field][quantile] for row in estimates.values()), digits)
+                for field, digits in (("input_tokens", 0), ("output_tokens", 0), ("usd", 6))
+            }
+            for quantile in ("p50", "p95")
+        }
+        for quantile, latency_ms in self._workflow_latency(workflow, step_stats, estimates).items():
+            totals[quantile]["latency_ms"] = latency_ms
+
+        workflow.metadata["cost_estimate"] = {
+            "llm_steps": len(estimates),
+            "tokenizer": self.token_counter.name,
+            "estimated_input_tokens": int(totals["p50"]["input_tokens"]),
+            "estimated_output_tokens": int(totals["p50"]["output_tokens"]),
+            "estimated_total_usd": totals["p50"]["usd"],
+            "p50": totals["p50"],
+            "p95": totals["p95"],
+            "steps": estimates,
         }
-        return WorkflowSpec(**payload)
+
+    @staticmethod
+    def _pair(values: Sequence[float], *, digits: int) -> Dict[str, float]:
+        if digits == 0:
+            return {"p50": int(round(values[0])), "p95": int(round(values[1]))}
+        return {"p50": round(values[0], digits), "p95": round(values[1], digits)}
+
+    def _workflow_latency(
+        self,
+        workflow: MutableWorkflow,
+        step_stats: Dict[str, Dict[str, Any]],
+        estimates: Dict[str, Dict[str, Any]],
+    ) -> Dict[str, float]:
+        schedule_steps = (workflow.metadata.get("schedule") or {}).get("steps") or {}
+        analysis = self.resolver.analysis(workflow)
+        result: Dict[str, float] = {}
+        for quantile in ("p50", "p95"):
+            finish: Dict[str, float] = {}
+            for step_id in analysis.topological_order():
+                if step_id in estimates:
+                    cost = float(estimates[step_id]["latency_ms"][quantile])
+                elif step_id in step_stats and not fused_step_defs(workflow.steps[step_id]):
+                    cost = float(step_stats[step_id][f"{quantile}_ms"])
+                else:
+                    cost = float((schedule_steps.get(step_id) or {}).get("cost_ms") or 0.0)
+                parents = analysis.predecessors[analysis.index[step_id]]
+                start = max((finish[analysis.nodes[idx]] for idx in parents), default=0.0)
+                finish[step_id] = start + cost
+            result[quantile] = round(max(finish.values(), default=0.0), 1)
+        return result
 
 
 class Optimizer:
-    def __init__(self, passes: Optional[List[OptimizationPass]] = None) -> None:
+    def __init__(
+        self,
+        passes: Optional[List[OptimizationPass]] = None,
+        *,
+        cache: Optional[PassCache] = None,
+        profile: bool = False,
+        history: Optional[HistoryStore] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> None:
         self.passes = passes or [
             ValidatePass(),
             NormalizePass(),
@@ -322,24 +1200,138 @@ class Optimizer:
             MergeCompatibleStepsPass(),
             ParallelizationPass(),
             RetryPolicyInjectionPass(),
-            CostEstimationPass(),
+            ProfileGuidedOptimizationPass(history=history),
+            ToolFusionPass(history=history),
+            CriticalPathSchedulingPass(history=history, max_concurrency=max_concurrency),
+            CostEstimationPass(history=history),
         ]
+        self.cache = cache
+        self.profile = profile
 
     def optimize(self, spec: WorkflowSpec) -> WorkflowSpec:
-        current = spec
-        trace: List[str] = []
+        """
+        Run every pass over one MutableWorkflow, converting from and back to
+        WorkflowSpec once; the result is validated (schema and graph) at exit.
+
+        `metadata.optimization_trace` lists `{"pass", "cache"}` per pass, where
+        cache is "hit", "miss", or "off" (no cache, or pass not cacheable).
+        With `profile=True`, entries for passes that ran also carry the
+        `PassProfiler` fields (wall time, tracemalloc bytes, step/edge counts
+        and serialized size before and after).
+        """
+
+        workflow = MutableWorkflow.from_spec(spec)
+        trace: List[Dict[str, Any]] = []
+        hasher = WorkflowHasher()
+        profiler = PassProfiler(hasher) if self.profile else None
+        if profiler is not None:
+            profiler.start()
+        try:
+            if self.cache is None:
+                for optimization_pass in self.passes:
+                    entry: Dict[str, Any] = {"pass": optimization_pass.name, "cache": "off"}
+                    trace.append(entry)
+                    self._run_pass(optimization_pass, workflow, entry, profiler)
+            else:
+                self._run_cached(workflow, self.cache, trace, hasher, profiler)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+
+        workflow.metadata["optimization_trace"] = trace
+        return validate_workflow_spec(workflow.to_spec())
+
+    def _run_pass(
+        self,
+        optimization_pass: OptimizationPass,
+        workflow: MutableWorkflow,
+        entry: Dict[str, Any],
+        profiler: Optional[PassProfiler],
+    ) -> None:
+        try:
+            if profiler is None:
+                optimization_pass.run(workflow)
+            else:
+                with profiler.measure(workflow, entry):
+                    optimization_pass.run(workflow)
+        except SpecValidationError:
+            raise
+        except Exception as exc:
+            raise RuntimeError(
+                f"Optimization pass '{optimization_pass.name}' failed: {exc}"
+            ) from exc
+
+    def _run_cached(
+        self,
+        workflow: MutableWorkflow,
+        cache: PassCache,
+        trace: List[Dict[str, Any]],
+        hasher: WorkflowHasher,
+        profiler: Optional[PassProfiler],
+    ) -> None:
+        """
+        Chain pass keys through cached output hashes. Consecutive hits only
+        advance the state hash; the cached state is decoded once, when a pass
+        has to run or the pipeline ends.
+        """
+
+        state_hash: Optional[str] = hasher.state(workflow).digest
+        pending_key: Optional[str] = None
+        # Passes answered from the cache but not yet reflected in `workflow`.
+        skipped: List[Tuple[OptimizationPass, Dict[str, Any]]] = []
+
         for optimization_pass in self.passes:
-            try:
-                current = optimization_pass.apply(current)
-                trace.append(optimization_pass.name)
-            except SpecValidationError:
-                raise
-            except Exception as exc:
-                raise RuntimeError(
-                    f"Optimization pass '{optimization_pass.name}' failed: {exc}"
-                ) from exc
-
-        payload = model_dump_compat(current)
-        payload.setdefault("metadata", {})
-        payload["metadata"]["optimization_trace"] = trace
-        return WorkflowSpec(**payload)
+            entry: Dict[str, Any] = {"pass": optimization_pass.name, "cache": "off"}
+            trace.append(entry)
+            if not optimization_pass.cacheable:
+                self._restore(workflow, cache, hasher, pending_key, skipped, profiler)
+                pending_key, skipped = None, []
+                self._run_pass(optimization_pass, workflow, entry, profiler)
+                state_hash = None
+                continue
+
+            if state_hash is None:
+                state_hash = hasher.state(workflow).digest
+            key = PassCache.pass_key(state_hash, optimization_pass.cache_identity())
+            output_hash = cache.lookup(key)
+            if output_hash is not None:
+                entry["cache"] = "hit"
+                pending_key, state_hash = key, output_hash
+                skipped.append((optimization_pass, entry))
+                continue
+
+            self._restore(workflow, cache, hasher, pending_key, skipped, profiler)
+            pending_key, skipped = None, []
+            self._run_pass(optimization_pass, workflow, entry, profiler)
+            entry["cache"] = "miss"
+            state = hasher.state(workflow)
+            state_hash = state.digest
+            cache.store(
+                key,
+                pass_name=optimization_pass.name,
+                state=state,
+                workflow=workflow,
+                hasher=hasher,
+            )
+
+        self._restore(workflow, cache, hasher, pending_key, skipped, profiler)
+
+    def _restore(
+        self,
+        workflow: MutableWorkflow,
+        cache: PassCache,
+        hasher: WorkflowHasher,
+        pending_key: Optional[str],
+        skipped: List[Tuple[OptimizationPass, Dict[str, Any]]],
+        profiler: Optional[PassProfiler],
+    ) -> None:
+        if pending_key is None:
+            return
+        cached = cache.load(pending_key, hasher)
+        if cached is None:
+            # Evicted or unreadable since the lookup: run the skipped passes.
+            for optimization_pass, entry in skipped:
+                self._run_pass(optimization_pass, workflow, entry, profiler)
+                entry["cache"] = "miss"
+            return
+        workflow.update_from(cached)
@@ -0,0 +1,331 @@
+"""
+Persistent, content-addressed cache of optimizer pass outputs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from dwc.ir.mutable_spec import MutableWorkflow
+
+LOGGER = logging.getLogger(__name__)
+
+
+def canonical_json(value: Any) -> bytes:
+    """
+    Sorted-key, compact JSON; the form hashed and stored by the pass cache.
+    """
+
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def content_digest(value: Any) -> str:
+    return hashlib.sha256(canonical_json(value)).hexdigest()
+
+
+class WorkflowState(NamedTuple):
+    digest: str
+    metadata_refs: Dict[str, str]
+    spec_json: bytes
+
+
+class WorkflowHasher:
+    """
+    Content hashes for MutableWorkflow states within one optimizer run,
+    memoized per metadata value by object identity.
+    """
+
+    def __init__(self) -> None:
+        # id(value) -> (value, ...); holding the value keeps its id stable.
+        self._encoded: Dict[int, Tuple[Any, bytes]] = {}
+        self._digests: Dict[int, Tuple[Any, str]] = {}
+        self._by_digest: Dict[str, Any] = {}
+
+    def value_digest(self, value: Any) -> str:
+        cached = self._digests.get(id(value))
+        if cached is not None and cached[0] is value:
+            return cached[1]
+        digest = hashlib.sha256(self.encoded(value)).hexdigest()
+        self.remember(value, digest)
+        return digest
+
+    def encoded(self, value: Any) -> bytes:
+        cached = self._encoded.get(id(value))
+        if cached is not None and cached[0] is value:
+            return cached[1]
+        encoded = canonical_json(value)
+        self._encoded[id(value)] = (value, encoded)
+        return encoded
+
+    def remember(self, value: Any, digest: str) -> None:
+        self._digests[id(value)] = (value, digest)
+        self._by_digest.setdefault(digest, value)
+
+    def known(self, digest: str) -> Tuple[bool, Any]:
+        if digest in self._by_digest:
+            return True, self._by_digest[digest]
+        return False, None
+
+    def serialized_size(self, workflow: MutableWorkflow) -> int:
+        """
+        Exact length of `canonical_json(workflow.to_payload())`, assembled
+        from the memoized metadata encodings.
+        """
+
+        spec_json = canonical_json(workflow.to_payload(include_metadata=False))
+        metadata = workflow.metadata
+        metadata_size = 2 + max(0, len(metadata) - 1)
+        for key, value in metadata.items():
+            metadata_size += len(canonical_json(key)) + 1 + len(self.encoded(value))
+        return len(spec_json) + len(',"metadata":') + metadata_size
+
+    def state(self, workflow: MutableWorkflow) -> WorkflowState:
+        refs = {key: self.value_digest(value) for key, value in workflow.metadata.items()}
+        spec_json = canonical_json(workflow.to_payload(include_metadata=False))
+        digest = content_digest(
+            {"spec": hashlib.sha256(spec_json).hexdigest(), "metadata": refs}
+        )
+        return WorkflowState(digest, refs, spec_json)
+
+
+class PassCache:
+    """
+    Optimizer pass outputs keyed by (input state hash, pass identity), with
+    metadata values stored once per digest.
+    """
+
+    MAX_ENTRIES = 2000
+
+    def __init__(
+        self,
+        path: str = ".dwc/shared/optimizer/pass_cache.db",
+        *,
+        max_entries: int = MAX_ENTRIES,
+    ) -> None:
+        self.path = Path(path)
+        self.max_entries = max(1, int(max_entries))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._ensure_initialized()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _ensure_initialized(self) -> None:
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pass_results (
+                pass_key TEXT PRIMARY KEY,
+                pass_name TEXT NOT NULL,
+                output_hash TEXT NOT NULL,
+                spec_blob BLOB NOT NULL,
+                metadata_refs_json TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                last_used_at TEXT NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_pass_results_last_used
+            ON pass_results(last_used_at)
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS metadata_values (
+                value_hash TEXT PRIMARY KEY,
+                value_blob BLOB NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pass_result_values (
+                pass_key TEXT NOT NULL,
+                value_hash TEXT NOT NULL,
+                PRIMARY KEY (pass_key, value_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_pass_result_values_hash
+            ON pass_result_values(value_hash)
+            """
+        )
+
+    @staticmethod
+    def pass_key(state_hash: str, identity: Dict[str, Any]) -> str:
+        return content_digest({"input": state_hash, "pass": identity})
+
+    def lookup(self, pass_key: str) -> Optional[str]:
+        """
+        Output state hash for `pass_key`, or None on a miss.
+        """
+
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT output_hash FROM pass_results WHERE pass_key = ?", (pass_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                """
+                UPDATE pass_results SET hits = hits + 1, last_used_at = ?
+                WHERE pass_key = ?
+                """,
+                (_now(), pass_key),
+            )
+            return str(row[0])
+        except sqlite3.Error as exc:
+            LOGGER.warning("Optimizer pass cache lookup failed: %s", exc)
+            return None
+
+    def load(self, pass_key: str, hasher: WorkflowHasher) -> Optional[MutableWorkflow]:
+        """
+        Rebuild the cached output state. Metadata values `hasher` has already
+        seen in this run are reused instead of decoded.
+        """
+
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT spec_blob, metadata_refs_json FROM pass_results WHERE pass_key = ?",
+                (pass_key,),
+            ).fetchone()
+            if row is None:
+                return None
+            payload = json.loads(zlib.decompress(row[0]).decode("utf-8"))
+            refs: Dict[str, str] = json.loads(row[1])
+            metadata: Dict[str, Any] = {}
+            for key, value_hash in refs.items():
+                found, value = hasher.known(value_hash)
+                if not found:
+                    value_row = conn.execute(
+                        "SELECT value_blob FROM metadata_values WHERE value_hash = ?",
+                        (value_hash,),
+                    ).fetchone()
+                    if value_row is None:
+                        return None
+                    value = json.loads(zlib.decompress(value_row[0]).decode("utf-8"))
+                    hasher.remember(value, value_hash)
+                metadata[key] = value
+        except (sqlite3.Error, zlib.error, ValueError) as exc:
+            LOGGER.warning("Optimizer pass cache load failed: %s", exc)
+            return None
+        payload["metadata"] = metadata
+        return MutableWorkflow.from_payload(payload)
+
+    def store(
+        self,
+        pass_key: str,
+        *,
+        pass_name: str,
+        state: WorkflowState,
+        workflow: MutableWorkflow,
+        hasher: WorkflowHasher,
+    ) -> None:
+        spec_blob = zlib.compress(state.spec_json, 6)
+        now = _now()
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for key, value_hash in state.metadata_refs.items():
+                    exists = conn.execute(
+                        "SELECT 1 FROM metadata_values WHERE value_hash = ?", (value_hash,)
+                    ).fetchone()
+                    if exists is None:
+                        conn.execute(
+                            "INSERT INTO metadata_values (value_hash, value_blob) VALUES (?, ?)",
+                            (value_hash, zlib.compress(hasher.encoded(workflow.metadata[key]), 6)),
+                        )
+                conn.execute(
+                    """
+                    INSERT INTO pass_results (
+                        pass_key, pass_name, output_hash, spec_blob,
+                        metadata_refs_json, created_at, last_used_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(pass_key) DO UPDATE SET
+                        output_hash = excluded.output_hash,
+                        spec_blob = excluded.spec_blob,
+                        metadata_refs_json = excluded.metadata_refs_json,
+                        last_used_at = excluded.last_used_at
+                    """,
+                    (
+                        pass_key,
+                        pass_name,
+                        state.digest,
+                        spec_blob,
+                        json.dumps(state.metadata_refs),
+                        now,
+                        now,
+                    ),
+                )
+                conn.execute("DELETE FROM pass_result_values WHERE pass_key = ?", (pass_key,))
+                conn.executemany(
+                    "INSERT INTO pass_result_values (pass_key, value_hash) VALUES (?, ?)",
+                    [(pass_key, value_hash) for value_hash in set(state.metadata_refs.values())],
+                )
+                self._evict_overflow(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as exc:
+            LOGGER.warning("Optimizer pass cache store failed: %s", exc)
+
+    def _evict_overflow(self, conn: sqlite3.Connection) -> None:
+        count = int(conn.execute("SELECT COUNT(*) FROM pass_results").fetchone()[0])
+        if count <= self.max_entries:
+            return
+        stale: List[Tuple[str]] = conn.execute(
+            "SELECT pass_key FROM pass_results ORDER BY last_used_at ASC LIMIT ?",
+            (count - self.max_entries,),
+        ).fetchall()
+        conn.executemany("DELETE FROM pass_results WHERE pass_key = ?", stale)
+        conn.executemany("DELETE FROM pass_result_values WHERE pass_key = ?", stale)
+        conn.execute(
+            """
+            DELETE FROM metadata_values
+            WHERE value_hash NOT IN (SELECT value_hash FROM pass_result_values)
+            """
+        )
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._connect()
+        entries, hits = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM pass_results"
+        ).fetchone()
+        values = conn.execute("SELECT COUNT(*) FROM metadata_values").fetchone()[0]
+        return {"entries": int(entries), "hits": int(hits), "metadata_values": int(values)}
+
+    def clear(self) -> None:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM pass_results")
+        conn.execute("DELETE FROM pass_result_values")
+        conn.execute("DELETE FROM metadata_values")
+        conn.execute("COMMIT")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
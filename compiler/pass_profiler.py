@@ -0,0 +1,115 @@
+"""
+Per-pass instrumentation for the optimizer pipeline.
+"""
+
+from __future__ import annotations
+
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from dwc.compiler.pass_cache import WorkflowHasher
+from dwc.ir.mutable_spec import MutableWorkflow
+
+PROFILE_FIELDS = (
+    "wall_ms",
+    "alloc_net_bytes",
+    "alloc_peak_bytes",
+    "steps_before",
+    "steps_after",
+    "edges_before",
+    "edges_after",
+    "bytes_before",
+    "bytes_after",
+)
+
+
+class PassProfiler:
+    """
+    Measures one pass at a time and writes the numbers into its trace entry.
+
+    Wall time and tracemalloc figures cover only `run` itself. IR shape
+    (step/edge counts and canonical-JSON size, see
+    `WorkflowHasher.serialized_size`) is taken outside that window.
+    `alloc_net_bytes` is memory still held after the pass, and
+    `alloc_peak_bytes` is the high-water mark above the starting point.
+    tracemalloc is started for the run if it is not already tracing, and
+    slows the whole pipeline down while it is on.
+    """
+
+    def __init__(self, hasher: Optional[WorkflowHasher] = None) -> None:
+        self.hasher = hasher or WorkflowHasher()
+        self._owns_tracing = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+
+    def stop(self) -> None:
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    def _shape(self, workflow: MutableWorkflow) -> Dict[str, int]:
+        return {
+            "steps": len(workflow.steps),
+            "edges": len(workflow.edges),
+            "bytes": self.hasher.serialized_size(workflow),
+        }
+
+    @contextmanager
+    def measure(self, workflow: MutableWorkflow, entry: Dict[str, Any]) -> Iterator[None]:
+        before = self._shape(workflow)
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        yield
+        wall_ms = (time.perf_counter() - started) * 1000
+        current, peak = tracemalloc.get_traced_memory()
+        after = self._shape(workflow)
+        entry.update(
+            {
+                "wall_ms": round(wall_ms, 3),
+                "alloc_net_bytes": current - baseline,
+                "alloc_peak_bytes": max(0, peak - baseline),
+                "steps_before": before["steps"],
+                "steps_after": after["steps"],
+                "edges_before": before["edges"],
+                "edges_after": after["edges"],
+                "bytes_before": before["bytes"],
+                "bytes_after": after["bytes"],
+            }
+        )
+
+
+def render_pass_profile(trace: List[Dict[str, Any]]) -> str:
+    """
+    Fixed-width table of a profiled `optimization_trace`.
+    """
+
+    header = (
+        f"{'pass':<24} {'cache':<5} {'wall ms':>9} {'net KiB':>9} {'peak KiB':>9} "
+        f"{'steps':>11} {'edges':>11} {'size KiB':>17}"
+    )
+    lines = [header, "-" * len(header)]
+    total_ms = 0.0
+    for entry in trace:
+        name = str(entry.get("pass", ""))[:24]
+        cache = str(entry.get("cache", ""))
+        if "wall_ms" not in entry:
+            blanks = f"{'-':>9} {'-':>9} {'-':>9} {'-':>11} {'-':>11} {'-':>17}"
+            lines.append(f"{name:<24} {cache:<5} {blanks}")
+            continue
+        total_ms += float(entry["wall_ms"])
+        steps = f"{entry['steps_before']}->{entry['steps_after']}"
+        edges = f"{entry['edges_before']}->{entry['edges_after']}"
+        size = f"{entry['bytes_before'] / 1024:.1f}->{entry['bytes_after'] / 1024:.1f}"
+        lines.append(
+            f"{name:<24} {cache:<5} {entry['wall_ms']:>9.2f} "
+            f"{entry['alloc_net_bytes'] / 1024:>9.1f} {entry['alloc_peak_bytes'] / 1024:>9.1f} "
+            f"{steps:>11} {edges:>11} {size:>17}"
+        )
+    lines.append(f"{'total':<24} {'':<5} {total_ms:>9.2f}")
+    return "\n".join(lines)
@@ -0,0 +1,39 @@
+"""
+Layout of the prompt a generated LLM step sends, shared by codegen and the
+cost estimate.
+"""
+
+from __future__ import annotations
+
+import inspect
+
+DEFAULT_SYNTHESIS_PROMPT = (
+    "You are the synthesis head. Combine subtask outputs into one "
+    "coherent plain-text answer. Do not return JSON."
+)
+
+# (heading, field) sections appended to the step's prompt template, in order.
+PROMPT_SECTIONS = (
+    ("Current task", "current_task_description"),
+    ("Approved plan", "approved_plan"),
+    ("Intent summary", "intent_summary"),
+    ("User input", "input_json"),
+    ("Step outputs", "step_outputs_json"),
+)
+
+
+def assemble_llm_prompt(prompt_template: str, **fields: str) -> str:
+    return prompt_template + "".join(
+        "\n\n" + heading + ":\n" + fields[field] for heading, field in PROMPT_SECTIONS
+    )
+
+
+def runtime_source() -> str:
+    """
+    `PROMPT_SECTIONS` and `assemble_llm_prompt` as source for the generated
+    workflow script, so the runtime builds prompts with this exact code.
+    """
+
+    return f"PROMPT_SECTIONS = {PROMPT_SECTIONS!r}\n\n\n" + inspect.getsource(
+        assemble_llm_prompt
+    )
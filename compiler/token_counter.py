@@ -0,0 +1,75 @@
+"""
+Token counting for compile-time cost estimates.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from typing import Any, Optional
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover
+    tiktoken = None  # type: ignore[assignment]
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TokenCounter:
+    """
+    Counts tokens with `tiktoken` when it is installed and the encoding loads
+    (the BPE file may need a one-time download), and otherwise approximates
+    `CHARS_PER_TOKEN` characters per token. tiktoken encodings are OpenAI's,
+    so for Bedrock models they are still an approximation; the cost pass
+    corrects for that with a calibration factor taken from observed usage.
+    """
+
+    CHARS_PER_TOKEN = 4.0
+
+    def __init__(self, encoding_name: str = "cl100k_base") -> None:
+        self.encoding_name = encoding_name
+        self._encoding: Any = None
+        self._loaded = False
+
+    def _load(self) -> Optional[Any]:
+        if not self._loaded:
+            self._loaded = True
+            if tiktoken is not None:
+                try:
+                    self._encoding = tiktoken.get_encoding(self.encoding_name)
+                except Exception as exc:
+                    LOGGER.warning(
+                        "tiktoken encoding %s unavailable; approximating tokens: %s",
+                        self.encoding_name,
+                        exc,
+                    )
+        return self._encoding
+
+    @property
+    def name(self) -> str:
+        if self._load() is not None:
+            return f"tiktoken:{self.encoding_name}"
+        return f"chars/{self.CHARS_PER_TOKEN:g}"
+
+    @property
+    def exact(self) -> bool:
+        return self._load() is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        encoding = self._load()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return int(math.ceil(len(text) / self.CHARS_PER_TOKEN))
+
+    def tokens_per_char(self, sample: str) -> float:
+        """
+        Token density of `sample`, used to convert character counts of text
+        not known at compile time; falls back to 1 / `CHARS_PER_TOKEN`.
+        """
+
+        if len(sample) < 200:
+            return 1.0 / self.CHARS_PER_TOKEN
+        return self.count(sample) / len(sample)
@@ -1,3 +1,4 @@
+from dwc.ir.mutable_spec import MutableEdge, MutableOutput, MutableStep, MutableWorkflow
 from dwc.ir.spec_schema import (
     ConstraintSpec,
     EdgeSpec,
@@ -18,6 +19,10 @@ __all__ = [
     "EdgeSpec",
     "RetryPolicy",
     "ConstraintSpec",
+    "MutableWorkflow",
+    "MutableStep",
+    "MutableEdge",
+    "MutableOutput",
     "SpecValidationError",
     "validate_workflow_spec",
     "normalize_workflow_spec",
@@ -0,0 +1,258 @@
+"""
+Shared structural analysis of workflow graphs.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+
+from dwc.ir.spec_schema import WorkflowSpec
+
+if TYPE_CHECKING:
+    from dwc.ir.mutable_spec import MutableWorkflow
+
+SpecLike = Union[WorkflowSpec, "MutableWorkflow"]
+GraphKey = Tuple[FrozenSet[str], FrozenSet[Tuple[str, str]]]
+_IdentityEntry = Tuple[WorkflowSpec, Tuple[int, int], "GraphAnalysis"]
+
+
+class GraphAnalysis:
+    """
+    Immutable analysis of one workflow graph.
+
+    Nodes get integer ids (spec step order, then edge-only nodes).
+    Reachability is a transitive-closure bitset per node: Python ints, where
+    bit `j` of `descendants[i]` is set when node `j` is reachable from node
+    `i`. Each node reaches itself. Reachability queries are then a shift and
+    a mask.
+    """
+
+    def __init__(self, nodes: List[str], edges: List[Tuple[str, str]]) -> None:
+        self.nodes: List[str] = []
+        self.index: Dict[str, int] = {}
+        for node in nodes:
+            self._add_node(node)
+        successors: List[Set[int]] = [set() for _ in self.nodes]
+        predecessors: List[Set[int]] = [set() for _ in self.nodes]
+        for source, target in edges:
+            for node in (source, target):
+                if node not in self.index:
+                    self._add_node(node)
+                    successors.append(set())
+                    predecessors.append(set())
+            source_id, target_id = self.index[source], self.index[target]
+            successors[source_id].add(target_id)
+            predecessors[target_id].add(source_id)
+        self.successors: List[Tuple[int, ...]] = [
+            tuple(sorted(targets, key=self.nodes.__getitem__)) for targets in successors
+        ]
+        self.predecessors: List[Tuple[int, ...]] = [
+            tuple(sorted(sources, key=self.nodes.__getitem__)) for sources in predecessors
+        ]
+        self._order = self._kahn_order()
+        self._descendants: Optional[List[int]] = None
+
+    @classmethod
+    def from_spec(cls, spec: SpecLike) -> "GraphAnalysis":
+        return cls(
+            spec.step_ids(),
+            [(edge.source, edge.target) for edge in spec.edges],
+        )
+
+    def _add_node(self, node: str) -> None:
+        if node not in self.index:
+            self.index[node] = len(self.nodes)
+            self.nodes.append(node)
+
+    def _kahn_order(self) -> Optional[List[int]]:
+        # Same tie-breaking as the original resolver: a name-sorted initial
+        # queue, then each node's targets in name order.
+        in_degree = [len(sources) for sources in self.predecessors]
+        queue = deque(
+            sorted(
+                (node_id for node_id, degree in enumerate(in_degree) if degree == 0),
+                key=self.nodes.__getitem__,
+            )
+        )
+        order: List[int] = []
+        while queue:
+            node_id = queue.popleft()
+            order.append(node_id)
+            for target in self.successors[node_id]:
+                in_degree[target] -= 1
+                if in_degree[target] == 0:
+                    queue.append(target)
+        if len(order) != len(self.nodes):
+            return None
+        return order
+
+    @property
+    def is_acyclic(self) -> bool:
+        return self._order is not None
+
+    def topological_order(self) -> List[str]:
+        if self._order is None:
+            raise ValueError("Workflow graph contains a cycle and cannot be sorted.")
+        return [self.nodes[node_id] for node_id in self._order]
+
+    def roots(self) -> List[str]:
+        return sorted(
+            node for node_id, node in enumerate(self.nodes) if not self.predecessors[node_id]
+        )
+
+    def sinks(self) -> List[str]:
+        return sorted(
+            node for node_id, node in enumerate(self.nodes) if not self.successors[node_id]
+        )
+
+    @property
+    def descendants(self) -> List[int]:
+        """
+        Transitive-closure bitsets, built on first use.
+        """
+
+        if self._descendants is None:
+            self._descendants = self._build_closure()
+        return self._descendants
+
+    def _build_closure(self) -> List[int]:
+        reach = [1 << node_id for node_id in range(len(self.nodes))]
+        if self._order is not None:
+            for node_id in reversed(self._order):
+                bits = reach[node_id]
+                for target in self.successors[node_id]:
+                    bits |= reach[target]
+                reach[node_id] = bits
+            return reach
+
+        # Cyclic graph: one BFS per node.
+        for node_id in range(len(self.nodes)):
+            bits = reach[node_id]
+            queue = deque(self.successors[node_id])
+            while queue:
+                current = queue.popleft()
+                if bits >> current & 1:
+                    continue
+                bits |= 1 << current
+                queue.extend(self.successors[current])
+            reach[node_id] = bits
+        return reach
+
+    def has_path(self, source: str, target: str) -> bool:
+        source_id = self.index.get(source)
+        target_id = self.index.get(target)
+        if source_id is None or target_id is None:
+            return False
+        return bool(self.descendants[source_id] >> target_id & 1)
+
+    def parallel_groups(self) -> List[List[str]]:
+        """
+        Per parent, the greedy (name-ordered) set of children with no path
+        between any pair: a child joins when it is neither reachable from nor
+        able to reach the children already chosen.
+        """
+
+        descendants = self.descendants
+        groups: List[List[str]] = []
+        for parent_id in sorted(range(len(self.nodes)), key=self.nodes.__getitem__):
+            children = self.successors[parent_id]
+            if len(children) < 2:
+                continue
+            chosen_mask = 0
+            reachable_from_chosen = 0
+            independent: List[str] = []
+            for child in children:
+                if reachable_from_chosen >> child & 1 or descendants[child] & chosen_mask:
+                    continue
+                chosen_mask |= 1 << child
+                reachable_from_chosen |= descendants[child]
+                independent.append(self.nodes[child])
+            if len(independent) > 1:
+                groups.append(independent)
+        return groups
+
+
+class GraphAnalysisCache:
+    """
+    GraphAnalysis objects shared by the validators, `DependencyResolver`, and
+    the optimizer passes.
+
+    Analyses are keyed by graph structure: the set of step ids and the set of
+    (source, target) edges. Step and edge order, edge conditions, configs, and
+    metadata are not part of the key, so re-sorting a spec, re-validating it,
+    or rewriting step configs reuses the analysis, and only adding or removing
+    steps or edges builds a new one. Every GraphAnalysis answer is name-sorted
+    and independent of node numbering, so the first spec's step order is
+    safe to reuse. Keying costs one pass over steps and edges; a WorkflowSpec,
+    which is not edited after construction, is also memoized by identity. The
+    least recently used analyses beyond `max_entries` are dropped.
+    """
+
+    MAX_ENTRIES = 16
+
+    def __init__(self, max_entries: int = MAX_ENTRIES) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self._by_key: "OrderedDict[GraphKey, GraphAnalysis]" = OrderedDict()
+        # id(spec) -> (spec, (steps, edges) sizes, analysis); holding the spec
+        # keeps its id from being reused.
+        self._by_identity: "OrderedDict[int, _IdentityEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    def for_spec(self, spec: SpecLike) -> GraphAnalysis:
+        sizes = (len(spec.steps), len(spec.edges))
+        if isinstance(spec, WorkflowSpec):
+            with self._lock:
+                cached = self._by_identity.get(id(spec))
+                if cached is not None and cached[0] is spec and cached[1] == sizes:
+                    self._by_identity.move_to_end(id(spec))
+                    self.hits += 1
+                    return cached[2]
+        analysis = self.for_parts(
+            spec.step_ids(), [(edge.source, edge.target) for edge in spec.edges]
+        )
+        if isinstance(spec, WorkflowSpec):
+            with self._lock:
+                self._by_identity[id(spec)] = (spec, sizes, analysis)
+                while len(self._by_identity) > self.max_entries:
+                    self._by_identity.popitem(last=False)
+        return analysis
+
+    def for_parts(
+        self, step_ids: Iterable[str], edges: Iterable[Tuple[str, str]]
+    ) -> GraphAnalysis:
+        nodes = list(step_ids)
+        pairs = list(edges)
+        key: GraphKey = (frozenset(nodes), frozenset(pairs))
+        with self._lock:
+            analysis = self._by_key.get(key)
+            if analysis is not None:
+                self._by_key.move_to_end(key)
+                self.hits += 1
+                return analysis
+        analysis = GraphAnalysis(nodes, pairs)
+        with self._lock:
+            self.builds += 1
+            self._by_key[key] = analysis
+            while len(self._by_key) > self.max_entries:
+                self._by_key.popitem(last=False)
+        return analysis
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_key.clear()
+            self._by_identity.clear()
+
+
+SHARED_GRAPH_ANALYSIS = GraphAnalysisCache()
+
+
+def graph_analysis(spec: SpecLike) -> GraphAnalysis:
+    """
+    The shared, cached GraphAnalysis of `spec`.
+    """
+
+    return SHARED_GRAPH_ANALYSIS.for_spec(spec)
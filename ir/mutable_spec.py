@@ -0,0 +1,226 @@
+"""
+Mutable working form of WorkflowSpec for the optimizer pass pipeline.
+"""
+
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional
+
+from dwc.ir.spec_schema import ConstraintSpec, InputSpec, WorkflowSpec, model_dump_compat
+from dwc.ir.validators import SpecValidationError
+
+
+# Explicit __slots__ rather than dataclass(slots=True), which needs Python 3.10;
+# fields therefore carry no class-level defaults.
+
+
+@dataclass
+class MutableStep:
+    __slots__ = ("id", "type", "config", "retry_policy", "timeout_seconds")
+
+    id: str
+    type: str
+    config: Dict[str, Any]
+    retry_policy: Dict[str, Any]
+    timeout_seconds: int
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "config": self.config,
+            "retry_policy": self.retry_policy,
+            "timeout_seconds": self.timeout_seconds,
+        }
+
+
+@dataclass
+class MutableEdge:
+    __slots__ = ("source", "target", "condition")
+
+    source: str
+    target: str
+    condition: Optional[str]
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {"source": self.source, "target": self.target, "condition": self.condition}
+
+
+@dataclass
+class MutableOutput:
+    __slots__ = ("id", "name", "data_type", "source_step", "description")
+
+    id: str
+    name: str
+    data_type: str
+    source_step: Optional[str]
+    description: Optional[str]
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "data_type": self.data_type,
+            "source_step": self.source_step,
+            "description": self.description,
+        }
+
+
+@dataclass
+class MutableWorkflow:
+    """
+    Optimizer-side IR: steps are an insertion-ordered map keyed by step id,
+    and passes edit steps, edges, outputs, and metadata in place.
+
+    Built once from a validated WorkflowSpec and turned back into one (a
+    single pydantic validation) when the pipeline finishes. Step configs and
+    retry policies are copied on entry so the source spec is never mutated;
+    `metadata` is copied one level deep, so passes replace top-level metadata
+    keys instead of editing the nested values (e.g. `tool_functions`) in place.
+    Inputs and constraints are not rewritten by passes and stay pydantic models.
+    """
+
+    __slots__ = (
+        "version",
+        "name",
+        "description",
+        "steps",
+        "edges",
+        "outputs",
+        "inputs",
+        "constraints",
+        "metadata",
+    )
+
+    version: str
+    name: str
+    description: str
+    steps: Dict[str, MutableStep]
+    edges: List[MutableEdge]
+    outputs: List[MutableOutput]
+    inputs: List[InputSpec]
+    constraints: Optional[List[ConstraintSpec]]
+    metadata: Dict[str, Any]
+
+    @classmethod
+    def from_spec(cls, spec: WorkflowSpec) -> "MutableWorkflow":
+        steps: Dict[str, MutableStep] = {}
+        for step in spec.steps:
+            if step.id in steps:
+                # An id-indexed map cannot hold duplicates; same error as the validator.
+                raise SpecValidationError("Step IDs must be unique.")
+            steps[step.id] = MutableStep(
+                id=step.id,
+                type=step.type,
+                config=copy.deepcopy(step.config),
+                retry_policy=model_dump_compat(step.retry_policy),
+                timeout_seconds=step.timeout_seconds,
+            )
+        return cls(
+            version=spec.version,
+            name=spec.name,
+            description=spec.description,
+            steps=steps,
+            edges=[
+                MutableEdge(source=edge.source, target=edge.target, condition=edge.condition)
+                for edge in spec.edges
+            ],
+            outputs=[
+                MutableOutput(
+                    id=output.id,
+                    name=output.name,
+                    data_type=output.data_type,
+                    source_step=output.source_step,
+                    description=output.description,
+                )
+                for output in spec.outputs
+            ],
+            inputs=list(spec.inputs),
+            constraints=list(spec.constraints) if spec.constraints is not None else None,
+            metadata=dict(spec.metadata),
+        )
+
+    def to_spec(self) -> WorkflowSpec:
+        return WorkflowSpec(
+            version=self.version,
+            name=self.name,
+            description=self.description,
+            inputs=self.inputs,
+            outputs=[output.to_payload() for output in self.outputs],
+            steps=[step.to_payload() for step in self.steps.values()],
+            edges=[edge.to_payload() for edge in self.edges],
+            constraints=self.constraints,
+            metadata=self.metadata,
+        )
+
+    def to_payload(self, *, include_metadata: bool = True) -> Dict[str, Any]:
+        """
+        Plain-dict form (WorkflowSpec field layout) without pydantic validation.
+        """
+
+        payload: Dict[str, Any] = {
+            "version": self.version,
+            "name": self.name,
+            "description": self.description,
+            "inputs": [model_dump_compat(item) for item in self.inputs],
+            "outputs": [output.to_payload() for output in self.outputs],
+            "steps": [step.to_payload() for step in self.steps.values()],
+            "edges": [edge.to_payload() for edge in self.edges],
+            "constraints": (
+                [model_dump_compat(item) for item in self.constraints]
+                if self.constraints is not None
+                else None
+            ),
+        }
+        if include_metadata:
+            payload["metadata"] = self.metadata
+        return payload
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "MutableWorkflow":
+        """
+        Inverse of `to_payload`, for payloads this class produced.
+        """
+
+        constraints = payload.get("constraints")
+        return cls(
+            version=payload["version"],
+            name=payload["name"],
+            description=payload["description"],
+            steps={row["id"]: MutableStep(**row) for row in payload.get("steps", [])},
+            edges=[MutableEdge(**row) for row in payload.get("edges", [])],
+            outputs=[MutableOutput(**row) for row in payload.get("outputs", [])],
+            inputs=[InputSpec(**row) for row in payload.get("inputs", [])],
+            constraints=(
+                [ConstraintSpec(**row) for row in constraints] if constraints is not None else None
+            ),
+            metadata=dict(payload.get("metadata") or {}),
+        )
+
+    def update_from(self, other: "MutableWorkflow") -> None:
+        """
+        Replace this workflow's contents with `other`'s, keeping identity.
+        """
+
+        for item in fields(self):
+            setattr(self, item.name, getattr(other, item.name))
+
+    def step_ids(self) -> List[str]:
+        return list(self.steps)
+
+    def step_list(self) -> List[MutableStep]:
+        return list(self.steps.values())
+
+    def sort_canonical(self) -> None:
+        """
+        In-place equivalent of `normalize_workflow_spec`'s ordering.
+        """
+
+        self.inputs.sort(key=lambda item: item.id)
+        self.outputs.sort(key=lambda item: item.id)
+        self.steps = {step_id: self.steps[step_id] for step_id in sorted(self.steps)}
+        self.edges.sort(key=lambda item: (item.source, item.target, item.condition or ""))
+        if self.constraints:
+            self.constraints.sort(key=lambda item: item.id)
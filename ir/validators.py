@@ -4,70 +4,56 @@ Validation and normalization utilities for WorkflowSpec.
 
 from __future__ import annotations
 
-from collections import deque
-from typing import Dict, List, Set
+from typing import TYPE_CHECKING, Any, List, Sequence, Union
 
+from dwc.ir.graph_analysis import SHARED_GRAPH_ANALYSIS, graph_analysis
 from dwc.ir.spec_schema import EdgeSpec, StepSpec, WorkflowSpec, model_dump_compat
 
+if TYPE_CHECKING:
+    from dwc.ir.mutable_spec import MutableWorkflow
+
 
 class SpecValidationError(ValueError):
     """Raised when a workflow spec fails semantic validation."""
 
 
-def _build_graph(spec: WorkflowSpec) -> Dict[str, Set[str]]:
-    graph: Dict[str, Set[str]] = {step.id: set() for step in spec.steps}
-    for edge in spec.edges:
-        graph.setdefault(edge.source, set()).add(edge.target)
-        graph.setdefault(edge.target, set())
-    return graph
-
-
-def _topological_order(spec: WorkflowSpec) -> List[str]:
-    graph = _build_graph(spec)
-    in_degree: Dict[str, int] = {node: 0 for node in graph}
-    for source, targets in graph.items():
-        for target in targets:
-            in_degree[target] += 1
-
-    queue = deque(sorted(node for node, degree in in_degree.items() if degree == 0))
-    order: List[str] = []
-    while queue:
-        node = queue.popleft()
-        order.append(node)
-        for target in sorted(graph[node]):
-            in_degree[target] -= 1
-            if in_degree[target] == 0:
-                queue.append(target)
-
-    if len(order) != len(graph):
-        raise SpecValidationError("Workflow graph contains a cycle.")
-    return order
+def validate_workflow_spec(spec: WorkflowSpec) -> WorkflowSpec:
+    _validate_parts(spec.steps, spec.edges, spec.outputs)
+    return spec
 
 
-def validate_workflow_spec(spec: WorkflowSpec) -> WorkflowSpec:
-    if not spec.steps:
+def validate_mutable_workflow(workflow: "MutableWorkflow") -> "MutableWorkflow":
+    """Same semantic checks as `validate_workflow_spec`, on the optimizer IR."""
+
+    _validate_parts(workflow.step_list(), workflow.edges, workflow.outputs)
+    return workflow
+
+
+def _validate_parts(steps: Sequence[Any], edges: Sequence[Any], outputs: Sequence[Any]) -> None:
+    # Duck-typed over StepSpec/EdgeSpec/OutputSpec and their mutable counterparts.
+    if not steps:
         raise SpecValidationError("Workflow must include at least one step.")
 
-    step_ids = [step.id.strip() for step in spec.steps]
+    step_ids = [step.id.strip() for step in steps]
     if len(step_ids) != len(set(step_ids)):
         raise SpecValidationError("Step IDs must be unique.")
     if any(not step_id for step_id in step_ids):
         raise SpecValidationError("Step IDs cannot be empty.")
 
     step_id_set = set(step_ids)
-    for edge in spec.edges:
+    for edge in edges:
         if edge.source not in step_id_set:
             raise SpecValidationError(f"Edge source does not exist: {edge.source}")
         if edge.target not in step_id_set:
             raise SpecValidationError(f"Edge target does not exist: {edge.target}")
 
-    for output in spec.outputs:
+    for output in outputs:
         if output.source_step and output.source_step not in step_id_set:
             raise SpecValidationError(
                 f"Output '{output.id}' references unknown step: {output.source_step}"
             )
 
-    for step in spec.steps:
+    for step in steps:
         if step.type == "tool" and not (
             step.config.get("tool_name") or step.config.get("loader")
         ):
@@ -79,12 +65,14 @@ def validate_workflow_spec(spec: WorkflowSpec) -> WorkflowSpec:
                 f"Step '{step.id}' timeout_seconds must be positive."
             )
 
-    order = _topological_order(spec)
-    if len(order) == 0:
+    analysis = SHARED_GRAPH_ANALYSIS.for_parts(
+        step_ids, [(edge.source, edge.target) for edge in edges]
+    )
+    if not analysis.is_acyclic:
+        raise SpecValidationError("Workflow graph contains a cycle.")
+    if not analysis.nodes:
         raise SpecValidationError("Workflow graph is empty after validation.")
 
-    return spec
-
 
 def normalize_workflow_spec(spec: WorkflowSpec) -> WorkflowSpec:
     """Create canonical ordering for deterministic serialization and codegen."""
@@ -107,7 +95,7 @@ def normalize_workflow_spec(spec: WorkflowSpec) -> WorkflowSpec:
     return normalized
 
 
-def select_terminal_steps(spec: WorkflowSpec) -> List[str]:
+def select_terminal_steps(spec: Union[WorkflowSpec, "MutableWorkflow"]) -> List[str]:
     """Return the steps that contribute to workflow outputs."""
 
     if spec.outputs:
@@ -115,11 +103,7 @@ def select_terminal_steps(spec: WorkflowSpec) -> List[str]:
         if explicit:
             return sorted(set(explicit))
 
-    outgoing: Dict[str, int] = {step.id: 0 for step in spec.steps}
-    for edge in spec.edges:
-        outgoing[edge.source] += 1
-    sinks = [step_id for step_id, count in outgoing.items() if count == 0]
-    return sorted(sinks)
+    return graph_analysis(spec).sinks()
 
 
 def create_spec(
@@ -4,28 +4,685 @@ Shared LLM configuration for DWC.
 
 from __future__ import annotations
 
+import logging
 import os
-from typing import Any, Dict, Optional
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from dwc.memory.history_store import HistoryStore
 
 DWC_BEDROCK_MODEL_ID = "us.anthropic.claude-sonnet-4-20250514-v1:0"
 
+# Bedrock Converse prompt-cache checkpoint; everything before it is cacheable.
+BEDROCK_CACHE_POINT: Dict[str, Any] = {"cachePoint": {"type": "default"}}
+
+LOGGER = logging.getLogger(__name__)
+
 
 def build_chat_bedrock_converse(
     *,
     region_name: Optional[str] = None,
     temperature: float = 0.0,
+    model_id: str = DWC_BEDROCK_MODEL_ID,
 ) -> Any:
     """
-    Build a ChatBedrockConverse client pinned to the DWC default model.
+    Build a ChatBedrockConverse client pinned to the DWC default model
+    (or an explicit `model_id`, e.g. the router's fast model).
     """
 
     from langchain_aws import ChatBedrockConverse
 
     resolved_region = region_name or os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION")
     kwargs: Dict[str, Any] = {
-        "model": DWC_BEDROCK_MODEL_ID,
+        "model": model_id,
         "temperature": temperature,
     }
     if resolved_region:
         kwargs["region_name"] = resolved_region
     return ChatBedrockConverse(**kwargs)
+
+
+class HedgePolicy(BaseModel):
+    """
+    Hedged-request settings for compile-side agent LLM calls.
+
+    A duplicate request is issued when a call has not returned within the
+    observed latency percentile of its agent; the first response wins.
+    """
+
+    enabled: bool = False
+    percentile: float = Field(default=0.9, gt=0, lt=1)
+    max_hedges: int = Field(default=1, ge=0, le=4)
+    min_samples: int = Field(default=20, ge=1)
+    history_window: int = Field(default=200, ge=1)
+    min_delay_ms: int = Field(default=250, ge=0)
+
+
+class RoutingPolicy(BaseModel):
+    """
+    Complexity-aware routing for agent calls that have a deterministic fallback.
+
+    Low-complexity tasks with short inputs use the agent heuristic; low/medium
+    tasks within `fast_max_chars` use the fast model when one is configured;
+    everything else uses the pinned default model.
+    """
+
+    enabled: bool = False
+    fast_model_id: Optional[str] = Field(
+        default_factory=lambda: os.getenv("DWC_BEDROCK_FAST_MODEL_ID") or None
+    )
+    heuristic_max_chars: int = Field(default=800, ge=0)
+    fast_max_chars: int = Field(default=6000, ge=0)
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    agent_name: str
+    task: str
+    route: str
+    model_id: Optional[str]
+    complexity: str
+    input_chars: int
+    reason: str
+
+
+@dataclass(frozen=True)
+class TokenUsage:
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cache_read_tokens: Optional[int] = None
+    cache_write_tokens: Optional[int] = None
+
+    @classmethod
+    def from_response(cls, response: Any) -> "TokenUsage":
+        """
+        Read LangChain `usage_metadata`; `input_tokens` includes cache reads/writes.
+        """
+
+        usage = getattr(response, "usage_metadata", None)
+        if not isinstance(usage, dict):
+            return cls()
+        details = usage.get("input_token_details")
+        if not isinstance(details, dict):
+            details = {}
+        return cls(
+            input_tokens=_optional_int(usage.get("input_tokens")),
+            output_tokens=_optional_int(usage.get("output_tokens")),
+            cache_read_tokens=_optional_int(details.get("cache_read")),
+            cache_write_tokens=_optional_int(details.get("cache_creation")),
+        )
+
+
+def _optional_int(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMUsageStats:
+    """
+    Thread-safe per-compile counters for agent LLM calls.
+    """
+
+    COUNTERS = (
+        "calls",
+        "failed_calls",
+        "hedged_calls",
+        "hedges_issued",
+        "hedge_wins",
+        "input_tokens",
+        "output_tokens",
+        "cache_read_input_tokens",
+        "cache_write_input_tokens",
+        "uncached_input_tokens",
+        "routed_heuristic",
+        "routed_fast",
+        "routed_default",
+    )
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._agents: Dict[str, Dict[str, int]] = {}
+
+    def record(
+        self,
+        agent_name: str,
+        *,
+        hedges_issued: int,
+        hedge_won: bool,
+        usage: TokenUsage,
+        success: bool,
+    ) -> None:
+        input_tokens = int(usage.input_tokens or 0)
+        cache_read = int(usage.cache_read_tokens or 0)
+        cache_write = int(usage.cache_write_tokens or 0)
+        with self._lock:
+            row = self._agents.setdefault(
+                agent_name, {key: 0 for key in self.COUNTERS}
+            )
+            row["calls"] += 1
+            if not success:
+                row["failed_calls"] += 1
+            if hedges_issued:
+                row["hedged_calls"] += 1
+                row["hedges_issued"] += hedges_issued
+            if hedge_won:
+                row["hedge_wins"] += 1
+            row["input_tokens"] += input_tokens
+            row["output_tokens"] += int(usage.output_tokens or 0)
+            row["cache_read_input_tokens"] += cache_read
+            row["cache_write_input_tokens"] += cache_write
+            row["uncached_input_tokens"] += max(0, input_tokens - cache_read - cache_write)
+
+    def record_route(self, agent_name: str, route: str) -> None:
+        key = f"routed_{route}"
+        if key not in self.COUNTERS:
+            return
+        with self._lock:
+            row = self._agents.setdefault(
+                agent_name, {counter: 0 for counter in self.COUNTERS}
+            )
+            row[key] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            agents = {name: dict(row) for name, row in sorted(self._agents.items())}
+        totals: Dict[str, Any] = {
+            key: sum(row[key] for row in agents.values()) for key in self.COUNTERS
+        }
+        for row in [*agents.values(), totals]:
+            row["hedge_rate"] = round(row["hedged_calls"] / row["calls"], 6) if row["calls"] else 0.0
+            row["cache_hit_ratio"] = (
+                round(row["cache_read_input_tokens"] / row["input_tokens"], 6)
+                if row["input_tokens"]
+                else 0.0
+            )
+        return {"agents": agents, "totals": totals}
+
+
+class InstrumentedLLM:
+    """
+    Agent-scoped LLM wrapper that persists per-call latency/token accounting
+    to `HistoryStore.llm_calls` and optionally hedges slow calls.
+
+    Hedge delays are learned per agent from that same history table.
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        *,
+        agent_name: str,
+        history_store: Optional[HistoryStore] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        usage_stats: Optional[LLMUsageStats] = None,
+        model_id: str = DWC_BEDROCK_MODEL_ID,
+    ) -> None:
+        self.llm = llm
+        self.agent_name = agent_name
+        self.history_store = history_store
+        self.hedge_policy = hedge_policy or HedgePolicy()
+        self.usage_stats = usage_stats
+        self.model_id = model_id
+
+    def invoke(self, prompt: Any, **kwargs: Any) -> Any:
+        return self._call(lambda: self.llm.invoke(prompt, **kwargs))
+
+    @property
+    def bind_tools(self) -> Callable[..., "InstrumentedLLM"]:
+        # Property so `hasattr(wrapper, "bind_tools")` mirrors the wrapped adapter.
+        bind = getattr(self.llm, "bind_tools")
+
+        def _bind(*args: Any, **kwargs: Any) -> "InstrumentedLLM":
+            return self._derive(bind(*args, **kwargs))
+
+        return _bind
+
+    @property
+    def stream(self) -> Callable[..., Iterator[Any]]:
+        # Property so `hasattr(wrapper, "stream")` mirrors the wrapped adapter.
+        stream = getattr(self.llm, "stream")
+
+        def _stream(prompt: Any, **kwargs: Any) -> Iterator[Any]:
+            return self._stream(stream, prompt, **kwargs)
+
+        return _stream
+
+    def _stream(
+        self, stream: Callable[..., Iterator[Any]], prompt: Any, **kwargs: Any
+    ) -> Iterator[Any]:
+        # Streams are never hedged; accounting is recorded when the consumer
+        # finishes or stops early (usage arrives on the final chunk, if at all).
+        started = time.perf_counter()
+        usage_chunk: Any = None
+        success = False
+        try:
+            for chunk in stream(prompt, **kwargs):
+                if getattr(chunk, "usage_metadata", None):
+                    usage_chunk = chunk
+                yield chunk
+            success = True
+        except GeneratorExit:
+            # Consumer stopped reading (e.g. the code fence closed): not a failure.
+            success = True
+            raise
+        finally:
+            self._record(
+                latency_ms=int((time.perf_counter() - started) * 1000),
+                response=usage_chunk,
+                hedges_issued=0,
+                hedge_won=False,
+                success=success,
+            )
+
+    @property
+    def supports_prompt_caching(self) -> bool:
+        return supports_prompt_caching(self.llm)
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+    def _derive(self, llm: Any) -> "InstrumentedLLM":
+        return InstrumentedLLM(
+            llm,
+            agent_name=self.agent_name,
+            history_store=self.history_store,
+            hedge_policy=self.hedge_policy,
+            usage_stats=self.usage_stats,
+            model_id=self.model_id,
+        )
+
+    def _call(self, call: Callable[[], Any]) -> Any:
+        delay_seconds = self._hedge_delay_seconds()
+        hedges_issued = 0
+        hedge_won = False
+        # Latency is what the caller waited for, even when a hedge answers.
+        started = time.perf_counter()
+        try:
+            if delay_seconds is None:
+                response = call()
+            else:
+                response, hedges_issued, hedge_won = self._call_hedged(
+                    call, delay_seconds
+                )
+        except Exception:
+            self._record(
+                latency_ms=int((time.perf_counter() - started) * 1000),
+                response=None,
+                hedges_issued=hedges_issued,
+                hedge_won=False,
+                success=False,
+            )
+            raise
+        self._record(
+            latency_ms=int((time.perf_counter() - started) * 1000),
+            response=response,
+            hedges_issued=hedges_issued,
+            hedge_won=hedge_won,
+            success=True,
+        )
+        return response
+
+    def _call_hedged(
+        self, call: Callable[[], Any], delay_seconds: float
+    ) -> Tuple[Any, int, bool]:
+        # The primary gets its own thread so the caller stays free to return
+        # the first success; hedges get a per-call pool of `max_hedges`
+        # workers, so they never queue behind other agents' calls.
+        primary = self._start_primary(call)
+        hedge_pool: Optional[ThreadPoolExecutor] = None
+        pending = {primary}
+        hedges_issued = 0
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                can_hedge = hedges_issued < self.hedge_policy.max_hedges
+                done, pending = wait(
+                    pending,
+                    timeout=delay_seconds if can_hedge else None,
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    if hedge_pool is None:
+                        hedge_pool = ThreadPoolExecutor(
+                            max_workers=self.hedge_policy.max_hedges,
+                            thread_name_prefix="dwc-llm-hedge",
+                        )
+                    hedges_issued += 1
+                    pending.add(hedge_pool.submit(call))
+                    LOGGER.info(
+                        "Hedging LLM call for agent '%s' after %.0fms (hedge %d/%d).",
+                        self.agent_name,
+                        delay_seconds * 1000,
+                        hedges_issued,
+                        self.hedge_policy.max_hedges,
+                    )
+                    continue
+                for future in done:
+                    error = future.exception()
+                    if error is None:
+                        # Losing attempts finish in the background; their results are dropped.
+                        return future.result(), hedges_issued, future is not primary
+                    last_error = error
+        finally:
+            if hedge_pool is not None:
+                hedge_pool.shutdown(wait=False)
+        assert last_error is not None
+        raise last_error
+
+    def _start_primary(self, call: Callable[[], Any]) -> Future:
+        future: Future = Future()
+
+        def _run() -> None:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(call())
+            except BaseException as exc:
+                future.set_exception(exc)
+
+        threading.Thread(
+            target=_run, name=f"dwc-llm-{self.agent_name}", daemon=True
+        ).start()
+        return future
+
+    def _hedge_delay_seconds(self) -> Optional[float]:
+        policy = self.hedge_policy
+        if not policy.enabled or policy.max_hedges < 1 or self.history_store is None:
+            return None
+        try:
+            stats = self.history_store.llm_latency_percentiles(
+                self.agent_name,
+                percentiles=(policy.percentile,),
+                window=policy.history_window,
+                model_id=self.model_id,
+            )
+        except Exception as exc:
+            LOGGER.warning("LLM hedging disabled for '%s': %s", self.agent_name, exc)
+            return None
+        if int(stats.get("samples", 0)) < policy.min_samples:
+            return None
+        threshold_ms = stats.get(f"p{int(round(policy.percentile * 100))}")
+        if threshold_ms is None:
+            return None
+        return max(float(policy.min_delay_ms), float(threshold_ms)) / 1000.0
+
+    def _record(
+        self,
+        *,
+        latency_ms: int,
+        response: Any,
+        hedges_issued: int,
+        hedge_won: bool,
+        success: bool,
+    ) -> None:
+        usage = TokenUsage.from_response(response)
+        if self.usage_stats is not None:
+            self.usage_stats.record(
+                self.agent_name,
+                hedges_issued=hedges_issued,
+                hedge_won=hedge_won,
+                usage=usage,
+                success=success,
+            )
+        if self.history_store is None:
+            return
+        try:
+            self.history_store.add_llm_call(
+                agent_name=self.agent_name,
+                model_id=self.model_id,
+                latency_ms=latency_ms,
+                input_tokens=usage.input_tokens,
+                output_tokens=usage.output_tokens,
+                hedged=hedges_issued > 0,
+                success=success,
+                created_at=datetime.now(timezone.utc).isoformat(),
+                cache_read_tokens=usage.cache_read_tokens,
+                cache_write_tokens=usage.cache_write_tokens,
+            )
+        except Exception as exc:
+            LOGGER.warning("Failed to persist LLM call accounting: %s", exc)
+
+
+class LLMRouter:
+    """
+    Per-agent router choosing heuristic, fast-model, or default-model paths.
+
+    `select` returns the LLM to call, or None when the agent should use its
+    deterministic heuristic. Every decision is logged and persisted to
+    `HistoryStore.llm_routes` for quality/latency audits.
+    """
+
+    ROUTE_HEURISTIC = "heuristic"
+    ROUTE_FAST = "fast"
+    ROUTE_DEFAULT = "default"
+
+    # Unknown tasks are treated as high complexity and never downgraded.
+    TASK_COMPLEXITY: Dict[str, str] = {
+        "intent_summary": "low",
+        "synthesis_prompt": "low",
+        "plan": "medium",
+        "plan_with_intent": "medium",
+        "subtask_split": "medium",
+        "tool_code": "high",
+    }
+
+    def __init__(
+        self,
+        *,
+        agent_name: str,
+        default_llm: Optional[Any],
+        fast_llm: Optional[Any] = None,
+        policy: Optional[RoutingPolicy] = None,
+        history_store: Optional[HistoryStore] = None,
+        usage_stats: Optional[LLMUsageStats] = None,
+        default_model_id: str = DWC_BEDROCK_MODEL_ID,
+    ) -> None:
+        self.agent_name = agent_name
+        self.default_llm = default_llm
+        self.fast_llm = fast_llm
+        self.policy = policy or RoutingPolicy(enabled=True)
+        self.history_store = history_store
+        self.usage_stats = usage_stats
+        self.default_model_id = default_model_id
+
+    def select(self, task: str, *, input_text: str) -> Optional[Any]:
+        decision = self.classify(task, input_text=input_text)
+        self._record(decision)
+        if decision.route == self.ROUTE_FAST:
+            return self.fast_llm
+        if decision.route == self.ROUTE_DEFAULT:
+            return self.default_llm
+        return None
+
+    def classify(self, task: str, *, input_text: str) -> RouteDecision:
+        complexity = self.TASK_COMPLEXITY.get(task, "high")
+        input_chars = len(input_text or "")
+        policy = self.policy
+
+        route = self.ROUTE_DEFAULT
+        reason = f"{complexity} complexity"
+        if self.default_llm is None:
+            route, reason = self.ROUTE_HEURISTIC, "no LLM configured"
+        elif not policy.enabled:
+            reason = "routing disabled"
+        elif complexity == "low" and input_chars <= policy.heuristic_max_chars:
+            route = self.ROUTE_HEURISTIC
+            reason = f"low complexity, input {input_chars} <= {policy.heuristic_max_chars} chars"
+        elif complexity in ("low", "medium") and input_chars <= policy.fast_max_chars:
+            if self.fast_llm is not None:
+                route = self.ROUTE_FAST
+                reason = f"{complexity} complexity, input {input_chars} <= {policy.fast_max_chars} chars"
+            else:
+                reason = f"{complexity} complexity; no fast model configured"
+        else:
+            reason = f"{complexity} complexity, input {input_chars} chars"
+
+        model_id: Optional[str] = None
+        if route == self.ROUTE_FAST:
+            model_id = policy.fast_model_id
+        elif route == self.ROUTE_DEFAULT:
+            model_id = self.default_model_id
+        return RouteDecision(
+            agent_name=self.agent_name,
+            task=task,
+            route=route,
+            model_id=model_id,
+            complexity=complexity,
+            input_chars=input_chars,
+            reason=reason,
+        )
+
+    def _record(self, decision: RouteDecision) -> None:
+        LOGGER.info(
+            "LLM route %s.%s -> %s (%s)",
+            decision.agent_name,
+            decision.task,
+            decision.route,
+            decision.reason,
+        )
+        if self.usage_stats is not None:
+            self.usage_stats.record_route(decision.agent_name, decision.route)
+        if self.history_store is None:
+            return
+        try:
+            self.history_store.add_llm_route(
+                agent_name=decision.agent_name,
+                task=decision.task,
+                route=decision.route,
+                model_id=decision.model_id,
+                complexity=decision.complexity,
+                input_chars=decision.input_chars,
+                reason=decision.reason,
+                created_at=datetime.now(timezone.utc).isoformat(),
+            )
+        except Exception as exc:
+            LOGGER.warning("Failed to persist LLM route decision: %s", exc)
+
+
+def route_llm(
+    router: Optional[LLMRouter], llm: Optional[Any], task: str, *, input_text: str
+) -> Optional[Any]:
+    """
+    Resolve the LLM for one agent call; without a router, the agent's own LLM.
+    """
+
+    if router is None:
+        return llm
+    return router.select(task, input_text=input_text)
+
+
+def message_text(message: Any) -> str:
+    """
+    Extract plain text from an LLM response or streamed chunk.
+    """
+
+    content = getattr(message, "content", None)
+    if content is None:
+        return "" if message is None else str(message)
+    if isinstance(content, list):
+        parts = []
+        for block in content:
+            if isinstance(block, dict):
+                text = block.get("text")
+                if isinstance(text, str):
+                    parts.append(text)
+            elif isinstance(block, str):
+                parts.append(block)
+        return "".join(parts)
+    return str(content)
+
+
+def iter_text_chunks(llm: Any, prompt: Any) -> Iterator[str]:
+    """
+    Yield response text incrementally; adapters without `stream` yield once.
+
+    Closing the iterator early stops reading the provider stream.
+    """
+
+    if not hasattr(llm, "stream"):
+        yield message_text(llm.invoke(prompt))
+        return
+    chunks = llm.stream(prompt)
+    try:
+        for chunk in chunks:
+            text = message_text(chunk)
+            if text:
+                yield text
+    finally:
+        close = getattr(chunks, "close", None)
+        if callable(close):
+            close()
+
+
+def supports_prompt_caching(llm: Any) -> bool:
+    """
+    True for adapters that accept Converse `cachePoint` content blocks.
+
+    Other adapters (custom stubs included) opt in via a boolean
+    `supports_prompt_caching` attribute.
+    """
+
+    if llm is None:
+        return False
+    flag = getattr(llm, "supports_prompt_caching", None)
+    if isinstance(flag, bool):
+        return flag
+    return type(llm).__name__ == "ChatBedrockConverse"
+
+
+def build_cached_prompt(llm: Any, *, shared_prefix: str, suffix: str) -> Any:
+    """
+    Build a prompt whose stable `shared_prefix` ends at a cache checkpoint.
+
+    Adapters without prompt caching receive the same text as a plain string.
+    Bedrock only caches prefixes above a model-specific minimum token count,
+    so short prefixes are billed as regular input.
+    """
+
+    if not supports_prompt_caching(llm):
+        return f"{shared_prefix}{suffix}"
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": shared_prefix},
+                dict(BEDROCK_CACHE_POINT),
+                {"type": "text", "text": suffix},
+            ],
+        }
+    ]
+
+
+def instrument_llm(
+    llm: Optional[Any],
+    *,
+    agent_name: str,
+    history_store: Optional[HistoryStore] = None,
+    hedge_policy: Optional[HedgePolicy] = None,
+    usage_stats: Optional[LLMUsageStats] = None,
+    model_id: str = DWC_BEDROCK_MODEL_ID,
+) -> Optional[Any]:
+    """
+    Wrap an agent LLM with accounting/hedging; heuristic mode (None) passes through.
+    """
+
+    if llm is None:
+        return None
+    return InstrumentedLLM(
+        llm,
+        agent_name=agent_name,
+        history_store=history_store,
+        hedge_policy=hedge_policy,
+        usage_stats=usage_stats,
+        model_id=model_id,
+    )
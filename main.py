@@ -29,9 +29,19 @@ from dwc.agents.subtask_agent import SubtaskAgent
 from dwc.agents.synthesis_agent import SynthesisAgent
 from dwc.agents.tool_builder_agent import ToolBuilderAgent
 from dwc.agents.tool_verifier_agent import ToolVerifierAgent
+from dwc.compiler.optimization_passes import Optimizer
+from dwc.compiler.pass_cache import PassCache
+from dwc.compiler.pass_profiler import render_pass_profile
 from dwc.ir.spec_schema import model_dump_compat
 from dwc.ir.versioning import WorkflowVersionManager, normalize_workflow_name
-from dwc.llm import build_chat_bedrock_converse
+from dwc.llm import (
+    HedgePolicy,
+    LLMRouter,
+    LLMUsageStats,
+    RoutingPolicy,
+    build_chat_bedrock_converse,
+    instrument_llm,
+)
 from dwc.memory.agent_todo_board import AgentTodoBoard
 from dwc.memory.history_store import HistoryStore
 from dwc.memory.markdown_memory import MarkdownMemoryStore
@@ -64,6 +74,8 @@ class CompilationArtifact(BaseModel):
     workflow_dir: Optional[str] = None
     workflow_runbook_path: Optional[str] = None
     workflow_tools_path: Optional[str] = None
+    spec_hash: Optional[str] = None
+    artifact_reused: bool = False
     requires_document: bool = False
     subtasks: List[Dict[str, Any]] = Field(default_factory=list)
     tools: List[Dict[str, Any]] = Field(default_factory=list)
@@ -73,6 +85,8 @@ class CompilationArtifact(BaseModel):
     stability: Dict[str, Any] = Field(default_factory=dict)
     session_mode: str = "isolated"
     session_id: str = "unknown"
+    llm_usage: Dict[str, Any] = Field(default_factory=dict)
+    tool_dedupe: Dict[str, int] = Field(default_factory=dict)
 
 
 class DynamicWorkflowCompiler:
@@ -84,18 +98,43 @@ class DynamicWorkflowCompiler:
         session_mode: str = "isolated",
         session_id: Optional[str] = None,
         dwc_root: str = ".dwc",
+        hedge_policy: Optional[HedgePolicy] = None,
+        stream_tool_code: bool = False,
+        routing_policy: Optional[RoutingPolicy] = None,
+        fast_llm: Optional[LLMProtocol] = None,
+        history_retention_days: Optional[float] = None,
+        optimizer_cache: bool = True,
+        profile_passes: bool = False,
+        max_concurrency: Optional[int] = None,
     ) -> None:
         resolved_llm = llm or self._build_default_llm()
         self.llm = resolved_llm
+        self.routing_policy = routing_policy or RoutingPolicy()
+        self.fast_llm = fast_llm or self._build_fast_llm(self.routing_policy)
         self.session_paths: SessionPaths = resolve_session_paths(
             dwc_root=dwc_root,
             session_mode=session_mode,
             session_id=session_id,
         )
         migrate_legacy_shared_tool_registry(self.session_paths)
-        self.planner = PlannerAgent(llm=resolved_llm)
-        self.subtask_agent = SubtaskAgent(llm=resolved_llm)
-        self.tool_builder = ToolBuilderAgent(llm=resolved_llm)
+        self.history_store = HistoryStore(
+            db_path=str(self.session_paths.history_db_path),
+            retention_days=history_retention_days,
+        )
+        self.hedge_policy = hedge_policy or HedgePolicy()
+        self.llm_usage = LLMUsageStats()
+        planner_llm = self._agent_llm("planner_agent")
+        self.planner = PlannerAgent(
+            llm=planner_llm, router=self._agent_router("planner_agent", planner_llm)
+        )
+        subtask_llm = self._agent_llm("subtask_agent")
+        self.subtask_agent = SubtaskAgent(
+            llm=subtask_llm, router=self._agent_router("subtask_agent", subtask_llm)
+        )
+        self.tool_builder = ToolBuilderAgent(
+            llm=self._agent_llm("tool_builder_agent"),
+            stream_code=stream_tool_code,
+        )
         verifier_sandbox = VenvSandbox(
             SandboxConfig(
                 root_dir=str(self.session_paths.sandboxes_dir),
@@ -104,9 +143,23 @@ class DynamicWorkflowCompiler:
             )
         )
         self.tool_verifier = ToolVerifierAgent(sandbox=verifier_sandbox)
-        self.synthesis_agent = SynthesisAgent(llm=resolved_llm)
-
-        self.optimizer = OptimizerAgent()
+        synthesis_llm = self._agent_llm("synthesis_agent")
+        self.synthesis_agent = SynthesisAgent(
+            llm=synthesis_llm, router=self._agent_router("synthesis_agent", synthesis_llm)
+        )
+
+        self.optimizer = OptimizerAgent(
+            Optimizer(
+                cache=(
+                    PassCache(path=str(self.session_paths.optimizer_cache_path))
+                    if optimizer_cache
+                    else None
+                ),
+                profile=profile_passes,
+                history=self.history_store,
+                max_concurrency=max_concurrency,
+            )
+        )
         self.codegen = CodegenAgent()
         self.executor = WorkflowExecutor(
             sandbox=VenvSandbox(
@@ -122,7 +175,6 @@ class DynamicWorkflowCompiler:
         self.versioning = WorkflowVersionManager()
 
         self.vector_store = LocalVectorStore(path=str(self.session_paths.vector_store_path))
-        self.history_store = HistoryStore(db_path=str(self.session_paths.history_db_path))
         self.memory_store = MarkdownMemoryStore(root_dir=str(self.session_paths.memory_md_dir))
         self.todo_board = AgentTodoBoard(
             root_dir=str(self.memory_store.root_dir),
@@ -153,6 +205,49 @@ class DynamicWorkflowCompiler:
             todo_board=self.todo_board,
         )
 
+    def _agent_llm(self, agent_name: str) -> Optional[LLMProtocol]:
+        return instrument_llm(
+            self.llm,
+            agent_name=agent_name,
+            history_store=self.history_store,
+            hedge_policy=self.hedge_policy,
+            usage_stats=self.llm_usage,
+        )
+
+    def _agent_router(
+        self, agent_name: str, agent_llm: Optional[LLMProtocol]
+    ) -> Optional[LLMRouter]:
+        if not self.routing_policy.enabled:
+            return None
+        fast_llm = None
+        if self.fast_llm is not None and self.routing_policy.fast_model_id:
+            fast_llm = instrument_llm(
+                self.fast_llm,
+                agent_name=agent_name,
+                history_store=self.history_store,
+                hedge_policy=self.hedge_policy,
+                usage_stats=self.llm_usage,
+                model_id=self.routing_policy.fast_model_id,
+            )
+        return LLMRouter(
+            agent_name=agent_name,
+            default_llm=agent_llm,
+            fast_llm=fast_llm,
+            policy=self.routing_policy,
+            history_store=self.history_store,
+            usage_stats=self.llm_usage,
+        )
+
+    @staticmethod
+    def _build_fast_llm(policy: RoutingPolicy) -> Optional[LLMProtocol]:
+        if not policy.enabled or not policy.fast_model_id:
+            return None
+        try:
+            return build_chat_bedrock_converse(model_id=policy.fast_model_id)
+        except Exception as exc:
+            LOGGER.warning("Fast Bedrock model unavailable; routing without it: %s", exc)
+            return None
+
     @staticmethod
     def _build_default_llm() -> Optional[LLMProtocol]:
         try:
@@ -250,10 +345,16 @@ class DynamicWorkflowCompiler:
         resolved_workflow_name = workflow_name or normalize_workflow_name(requirements_text[:60])
         self._reset_todo_board(workflow_name=resolved_workflow_name, execute=execute)
 
-        approved_plan, intent_summary = self.planning_service.resolve_plan(
+        max_subtasks = 8
+        approved_plan, intent_summary, subtasks = self.planning_service.resolve_plan_overlapped(
             requirements_text=requirements_text,
             approved_plan=approved_plan,
             intent_summary=intent_summary,
+            overlap=lambda plan: self.tooling_service.split_subtasks(
+                requirements_text=requirements_text,
+                approved_plan=plan,
+                max_subtasks=max_subtasks,
+            ),
         )
         current_task_description = self.planning_service.compose_current_task_description(
             requirements_text=requirements_text,
@@ -275,8 +376,9 @@ class DynamicWorkflowCompiler:
             requirements_text=requirements_text,
             approved_plan=approved_plan,
             current_task_description=current_task_description,
-            max_subtasks=8,
+            max_subtasks=max_subtasks,
             max_tool_iterations=max_tool_iterations,
+            subtasks=subtasks,
         )
         subtask_rows = tooling.subtask_rows
         tool_functions = tooling.tool_functions
@@ -365,7 +467,11 @@ class DynamicWorkflowCompiler:
             self.todo_board.complete(
                 "codegen_agent",
                 "generate_artifacts",
-                f"Generated artifacts at {codegen_result.workflow_dir}.",
+                (
+                    f"Reused artifacts at {codegen_result.workflow_dir}."
+                    if codegen_result.reused
+                    else f"Generated artifacts at {codegen_result.workflow_dir}."
+                ),
             )
         except Exception as exc:
             self.todo_board.fail(
@@ -411,6 +517,8 @@ class DynamicWorkflowCompiler:
             workflow_dir=codegen_result.workflow_dir,
             workflow_runbook_path=codegen_result.runbook_path,
             workflow_tools_path=codegen_result.tools_path,
+            spec_hash=codegen_result.spec_hash,
+            artifact_reused=codegen_result.reused,
             requires_document=codegen_result.io_contract.requires_document,
             subtasks=subtask_rows,
             tools=[row.model_dump() for row in tool_records],
@@ -426,6 +534,8 @@ class DynamicWorkflowCompiler:
             ),
             session_mode=self.session_paths.session_mode,
             session_id=self.session_paths.session_id,
+            llm_usage=self.llm_usage.summary(),
+            tool_dedupe=tooling.dedupe_stats,
         )
 
         self.history_store.add_record(
@@ -441,6 +551,16 @@ class DynamicWorkflowCompiler:
             if hasattr(artifact, "model_dump")
             else artifact.dict(),
         )
+        if report.step_metrics:
+            # Keyed by spec name, as the scheduling pass looks them up.
+            self.history_store.add_step_runs(
+                workflow_name=optimized_spec.name,
+                version=artifact.version,
+                trace_id=report.trace_id,
+                runs=report.step_metrics,
+                created_at=created_at,
+            )
+        self.history_store.flush()
         return artifact
 
 
@@ -466,6 +586,12 @@ def _render_artifact_summary(artifact: CompilationArtifact) -> str:
         f"Version: {artifact.version}",
         f"Session: {artifact.session_mode}:{artifact.session_id}",
         f"Folder: {artifact.workflow_dir or '-'}",
+        (
+            f"Artifacts: {'reused' if artifact.artifact_reused else 'generated'}"
+            f" (spec {artifact.spec_hash[:12]})"
+            if artifact.spec_hash
+            else "Artifacts: generated"
+        ),
         f"Runbook: {artifact.workflow_runbook_path or '-'}",
         f"Entrypoint: python {artifact.generated_script_path}",
         f"Requires document: {'yes' if artifact.requires_document else 'no'}",
@@ -478,9 +604,77 @@ def _render_artifact_summary(artifact: CompilationArtifact) -> str:
         lines.append(f"Execution success: {report.get('success')}")
         if report.get("errors"):
             lines.append(f"Execution errors: {report.get('errors')}")
+    llm_totals = artifact.llm_usage.get("totals") or {}
+    if llm_totals.get("calls"):
+        lines.append(
+            f"LLM calls: {llm_totals.get('calls')} "
+            f"(hedged {llm_totals.get('hedged_calls')}, "
+            f"hedge rate {llm_totals.get('hedge_rate')})"
+        )
+        lines.append(
+            "LLM input tokens: "
+            f"{llm_totals.get('uncached_input_tokens')} uncached, "
+            f"{llm_totals.get('cache_read_input_tokens')} cache read, "
+            f"{llm_totals.get('cache_write_input_tokens')} cache write"
+        )
+    routed = [
+        f"{route} {llm_totals.get(f'routed_{route}')}"
+        for route in ("heuristic", "fast", "default")
+        if llm_totals.get(f"routed_{route}")
+    ]
+    if routed:
+        lines.append(f"LLM routing: {', '.join(routed)}")
+    metadata = artifact.optimized_spec.get("metadata", {})
+    optimization_trace = metadata.get("optimization_trace") or []
+    cache_hits = sum(1 for entry in optimization_trace if entry.get("cache") == "hit")
+    if cache_hits:
+        lines.append(
+            f"Optimizer cache: {cache_hits}/{len(optimization_trace)} pass(es) reused"
+        )
+    cost = metadata.get("cost_estimate") or {}
+    if cost.get("llm_steps") and cost.get("p50") and cost.get("p95"):
+        lines.append(
+            f"Estimated LLM cost: ${cost['p50'].get('usd')} p50 / ${cost['p95'].get('usd')} p95, "
+            f"latency {cost['p50'].get('latency_ms')} / {cost['p95'].get('latency_ms')} ms "
+            f"({cost.get('tokenizer')})"
+        )
+    pgo = metadata.get("pgo") or {}
+    if pgo.get("decisions"):
+        lines.append(
+            f"Profile-guided: {len(pgo['decisions'])} change(s) from "
+            f"{len(pgo.get('profiled_steps') or {})} profiled step(s)"
+        )
+    fusion = metadata.get("tool_fusion") or {}
+    if fusion.get("fused"):
+        lines.append(
+            f"Tool fusion: {fusion.get('steps_fused')} tool step(s) in "
+            f"{len(fusion['fused'])} node(s), {fusion.get('nodes_saved')} node(s) saved"
+        )
+    schedule = metadata.get("schedule") or {}
+    if schedule.get("critical_path"):
+        lines.append(
+            f"Critical path: {' -> '.join(schedule['critical_path'])} "
+            f"(~{schedule.get('makespan_ms')} ms estimated, "
+            f"{len(schedule.get('waves') or [])} wave(s), "
+            f"max concurrency {schedule.get('max_concurrency') or 'unlimited'})"
+        )
+    dedupe = artifact.tool_dedupe
+    if dedupe.get("sandbox_runs_saved"):
+        lines.append(
+            f"Tool dedupe: {dedupe.get('sandbox_runs_saved')} sandbox run(s) saved "
+            f"({dedupe.get('fingerprint_repeats', 0)} equivalent candidate(s), "
+            f"{dedupe.get('verifier_cache_hits', 0)} verifier cache hit(s))"
+        )
     return "\n".join(lines)
 
 
+def _routing_policy_from_args(args: argparse.Namespace) -> RoutingPolicy:
+    policy = RoutingPolicy(enabled=args.route_llm)
+    if args.fast_model_id:
+        policy.fast_model_id = args.fast_model_id
+    return policy
+
+
 def _render_home_screen() -> str:
     lines = [
         "=" * 72,
@@ -503,7 +697,8 @@ def _render_home_screen() -> str:
         "",
         "Session storage:",
         "  - Default: --session-mode isolated (per-session traces under .dwc/sessions/<id>/...).",
-        "  - Shared tool registry stays global at .dwc/shared/tools/shared_tool_registry.json.",
+        "  - Shared tool registry stays global at .dwc/shared/tools/shared_tool_registry.db.",
+        "  - Optimizer pass results are cached at .dwc/shared/optimizer/pass_cache.db.",
         "  - Use --session-id to reuse an isolated session across multiple requests.",
         "  - Use --session-mode shared for legacy global trace behavior.",
         "",
@@ -553,6 +748,55 @@ def main() -> None:
         default=".dwc",
         help="Root directory for DWC state and generated artifacts metadata.",
     )
+    parser.add_argument(
+        "--hedge-llm",
+        action="store_true",
+        help="Issue a duplicate agent LLM call when one exceeds that agent's observed p90 latency.",
+    )
+    parser.add_argument(
+        "--max-llm-hedges",
+        type=int,
+        default=1,
+        help="Maximum duplicate requests per hedged LLM call.",
+    )
+    parser.add_argument(
+        "--stream-tool-code",
+        action="store_true",
+        help="Stream tool code generation and start validation as soon as the code fence closes.",
+    )
+    parser.add_argument(
+        "--route-llm",
+        action="store_true",
+        help="Route simple agent calls to heuristics or a fast model by complexity and input size.",
+    )
+    parser.add_argument(
+        "--fast-model-id",
+        type=str,
+        default=None,
+        help="Bedrock model for the fast route (default: $DWC_BEDROCK_FAST_MODEL_ID).",
+    )
+    parser.add_argument(
+        "--history-retention-days",
+        type=float,
+        default=None,
+        help="Prune raw compile history older than this many days (rollups are kept).",
+    )
+    parser.add_argument(
+        "--no-optimizer-cache",
+        action="store_true",
+        help="Run every optimizer pass instead of reusing cached pass results.",
+    )
+    parser.add_argument(
+        "--profile-passes",
+        action="store_true",
+        help="Print per-pass time, allocations, and IR size changes after compiling.",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=None,
+        help="Cap how many workflow steps the generated runtime runs at once (default: no cap).",
+    )
     args = parser.parse_args()
 
     if args.todo_stream and args.no_todo_stream:
@@ -572,6 +816,13 @@ def main() -> None:
         session_mode=args.session_mode,
         session_id=args.session_id,
         dwc_root=args.dwc_root,
+        hedge_policy=HedgePolicy(enabled=args.hedge_llm, max_hedges=args.max_llm_hedges),
+        stream_tool_code=args.stream_tool_code,
+        routing_policy=_routing_policy_from_args(args),
+        history_retention_days=args.history_retention_days,
+        optimizer_cache=not args.no_optimizer_cache,
+        profile_passes=args.profile_passes,
+        max_concurrency=args.max_concurrency,
     )
     initial_state = _load_input_payload(args.input_json, args.input_file)
 
@@ -594,8 +845,10 @@ def main() -> None:
         plan_iterations = plan.iterations
     else:
         requirements_text = _read_requirements_text(args.requirements, args.requirements_file)
-        approved_plan = compiler.planner.propose_plan(requirements_text)
-        intent_summary = compiler.planner.capture_intent(requirements_text, approved_plan)
+        # Resolved inside compile_from_nl: one fused plan+intent call, with
+        # subtask splitting overlapped when intent must be captured separately.
+        approved_plan = None
+        intent_summary = None
         plan_iterations = 1
 
     artifact = compiler.compile_from_nl(
@@ -610,6 +863,10 @@ def main() -> None:
     )
     summary = _render_artifact_summary(artifact)
     print(summary)
+    if args.profile_passes:
+        trace = artifact.optimized_spec.get("metadata", {}).get("optimization_trace") or []
+        print("\nOptimizer pass profile:")
+        print(render_pass_profile(trace))
 
     if args.output_file:
         payload = (
@@ -0,0 +1,215 @@
+"""
+Raw and AST-normalized hashes for generated tool code.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+from typing import Dict, Optional, Set
+
+# Bump when normalization changes so stored fingerprints are recomputed.
+FINGERPRINT_VERSION = 3
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(str(code).encode("utf-8")).hexdigest()
+
+
+def code_fingerprint(code: str) -> str:
+    """
+    Hash of the code's AST with docstrings removed and function locals
+    alpha-renamed, so candidates differing only in whitespace, comments,
+    docstrings, or local variable names share a fingerprint.
+
+    Module-level names, attributes, and the parameters of top-level functions
+    are kept because callers depend on them. Code that does not parse falls
+    back to its raw hash.
+    """
+
+    try:
+        tree = ast.parse(str(code))
+    except (SyntaxError, ValueError):
+        return code_hash(code)
+    tree = _LocalRenamer().visit(_strip_docstrings(tree))
+    return hashlib.sha256(
+        ast.dump(tree, annotate_fields=False, include_attributes=False).encode("utf-8")
+    ).hexdigest()
+
+
+def _strip_docstrings(tree: ast.AST) -> ast.AST:
+    for node in ast.walk(tree):
+        if not isinstance(
+            node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+        ):
+            continue
+        body = node.body
+        if (
+            body
+            and isinstance(body[0], ast.Expr)
+            and isinstance(body[0].value, ast.Constant)
+            and isinstance(body[0].value.value, str)
+        ):
+            node.body = body[1:] or [ast.Pass()]
+    return tree
+
+
+class _LocalRenamer(ast.NodeTransformer):
+    """
+    Renames every name bound inside a top-level function (including nested
+    scopes) to `_v<n>` in order of first binding. Keyword names in calls to a
+    nested def or lambda are renamed with its parameters when they match one,
+    so `helper(alpha=3)` only keeps its fingerprint if `helper` still takes
+    `alpha`. Names bound in a class body, and its methods' parameters, are
+    never renamed: they are reachable as attributes and keywords.
+    """
+
+    def __init__(self) -> None:
+        self._mapping: Optional[Dict[str, str]] = None
+        self._local_params: Dict[str, Set[str]] = {}
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST:
+        return self._visit_function(node)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> ast.AST:
+        return self._visit_function(node)
+
+    def _visit_function(self, node: ast.AST) -> ast.AST:
+        if self._mapping is not None:
+            # Nested function: its name is already a local of the outer scope.
+            self.generic_visit(node)
+            if node.name in self._mapping:
+                node.name = self._mapping[node.name]
+            return node
+
+        public_args = {arg.arg for arg in _all_args(node.args)}
+        declared = _declared_global(node) | _class_scope_names(node)
+        mapping: Dict[str, str] = {}
+        for name in _bound_names(node):
+            if name in public_args or name in declared or name in mapping:
+                continue
+            mapping[name] = f"_v{len(mapping)}"
+        self._mapping = mapping
+        self._local_params = _local_callable_params(node)
+        try:
+            node.body = [self.visit(child) for child in node.body]
+            node.args = self.visit(node.args)
+        finally:
+            self._mapping = None
+            self._local_params = {}
+        return node
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        if self._mapping and isinstance(node.func, ast.Name):
+            params = self._local_params.get(node.func.id, set())
+            for keyword in node.keywords:
+                if keyword.arg in params and keyword.arg in self._mapping:
+                    keyword.arg = self._mapping[keyword.arg]
+        self.generic_visit(node)
+        return node
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if self._mapping and node.id in self._mapping:
+            node.id = self._mapping[node.id]
+        return node
+
+    def visit_arg(self, node: ast.arg) -> ast.AST:
+        if self._mapping and node.arg in self._mapping:
+            node.arg = self._mapping[node.arg]
+        self.generic_visit(node)
+        return node
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> ast.AST:
+        if self._mapping and node.name in self._mapping:
+            node.name = self._mapping[node.name]
+        self.generic_visit(node)
+        return node
+
+
+def _all_args(args: ast.arguments) -> list:
+    collected = [*args.posonlyargs, *args.args, *args.kwonlyargs]
+    if args.vararg is not None:
+        collected.append(args.vararg)
+    if args.kwarg is not None:
+        collected.append(args.kwarg)
+    return collected
+
+
+def _local_callable_params(node: ast.AST) -> Dict[str, Set[str]]:
+    """
+    Parameter names of the defs and lambdas bound to a name inside `node`.
+    """
+
+    params: Dict[str, Set[str]] = {}
+    for child in ast.walk(node):
+        if child is node:
+            continue
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            params.setdefault(child.name, set()).update(
+                arg.arg for arg in _all_args(child.args)
+            )
+        elif isinstance(child, ast.Assign) and isinstance(child.value, ast.Lambda):
+            for target in child.targets:
+                if isinstance(target, ast.Name):
+                    params.setdefault(target.id, set()).update(
+                        arg.arg for arg in _all_args(child.value.args)
+                    )
+    return params
+
+
+def _declared_global(node: ast.AST) -> Set[str]:
+    names: Set[str] = set()
+    for child in ast.walk(node):
+        if isinstance(child, (ast.Global, ast.Nonlocal)):
+            names.update(child.names)
+    return names
+
+
+def _class_scope_names(node: ast.AST) -> Set[str]:
+    """
+    Names bound directly in the body of any class inside `node`, plus the
+    parameters of its methods.
+    """
+
+    names: Set[str] = set()
+    for child in ast.walk(node):
+        if not isinstance(child, ast.ClassDef):
+            continue
+        pending = list(child.body)
+        while pending:
+            item = pending.pop()
+            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                names.add(item.name)
+                names.update(arg.arg for arg in _all_args(item.args))
+                continue
+            if isinstance(item, ast.ClassDef):
+                names.add(item.name)
+                continue
+            if isinstance(item, (ast.Lambda, ast.comprehension)):
+                continue
+            if isinstance(item, ast.Name) and isinstance(item.ctx, (ast.Store, ast.Del)):
+                names.add(item.id)
+            elif isinstance(item, ast.ExceptHandler) and item.name:
+                names.add(item.name)
+            pending.extend(ast.iter_child_nodes(item))
+    return names
+
+
+def _bound_names(node: ast.AST) -> list:
+    """
+    Names bound anywhere inside `node`, in source order of first binding.
+    """
+
+    names: list = []
+    for child in ast.walk(node):
+        if child is node:
+            continue
+        if isinstance(child, ast.Name) and isinstance(child.ctx, (ast.Store, ast.Del)):
+            names.append((child.lineno, child.col_offset, child.id))
+        elif isinstance(child, ast.arg):
+            names.append((child.lineno, child.col_offset, child.arg))
+        elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            names.append((child.lineno, child.col_offset, child.name))
+        elif isinstance(child, ast.ExceptHandler) and child.name:
+            names.append((child.lineno, child.col_offset, child.name))
+    return [name for _, _, name in sorted(names)]
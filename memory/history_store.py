@@ -4,21 +4,244 @@ Persistent workflow execution history.
 
 from __future__ import annotations
 
+import atexit
+import bisect
 import json
+import logging
+import math
+import queue
 import re
 import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+LOGGER = logging.getLogger(__name__)
+
+# Writer-queue control markers.
+_FLUSH = object()
+_STOP = object()
+
+
+def _flush_at_exit(store_ref: "weakref.ReferenceType[HistoryStore]") -> None:
+    store = store_ref()
+    if store is not None:
+        store.close()
 
 
 class HistoryStore:
-    def __init__(self, db_path: str = ".dwc/memory/history.db") -> None:
+    """
+    SQLite history with one persistent connection per thread (WAL mode,
+    `synchronous=NORMAL`, cached prepared statements).
+
+    High-frequency inserts (tool attempts, LLM calls, route decisions) go
+    through a write-behind queue: a writer thread commits them in batches of
+    up to `batch_size` rows or every `flush_interval_s`, whichever comes
+    first. Reads of those tables call `flush()` first, so callers always see
+    their own writes.
+
+    Durability: `flush()` and `close()` (also run at interpreter exit) block
+    until queued rows are committed. A hard crash loses at most the rows
+    still queued (one batch window); committed batches survive a process
+    crash, while under WAL + `synchronous=NORMAL` a power loss may roll back
+    the most recent commits but never corrupts the database.
+    """
+
+    # Columns indexed by `tool_attempts_fts`, with their BM25 weights.
+    FTS_COLUMNS = (
+        ("subtask_description", 1.0),
+        ("stderr_snippet", 0.25),
+        ("error_class", 0.25),
+    )
+
+    # Artifact fields moved out of `payload_json` into the zlib-compressed
+    # `payload_blob` column; `payload_json` keeps the small summary fields.
+    PAYLOAD_BLOB_FIELDS = (
+        "approved_plan",
+        "execution_report",
+        "intent_summary",
+        "optimized_spec",
+        "requirements_text",
+        "spec",
+        "subtasks",
+        "tools",
+    )
+    PAYLOAD_CODEC = "zlib"
+
+    # Columns `list_records` may project without touching the payload.
+    RECORD_COLUMNS = (
+        "id",
+        "workflow_name",
+        "version",
+        "status",
+        "latency_ms",
+        "cost_estimate",
+        "created_at",
+    )
+
+    # Optional per-run size columns of `step_runs`: result text length for every
+    # step; assembled prompt, input JSON, and token usage for LLM steps.
+    STEP_RUN_SIZE_FIELDS = (
+        "output_chars",
+        "prompt_chars",
+        "input_chars",
+        "input_tokens",
+        "output_tokens",
+    )
+
+    # Rollup time-bucket width and latency histogram bin upper bounds (ms):
+    # geometric bins 25% apart from 1 ms to ~1 h, so percentile estimates are
+    # within one bin width; one overflow bin holds anything above the last bound.
+    ROLLUP_BUCKET_SECONDS = 3600
+    LATENCY_BOUNDS_MS = tuple(sorted({int(round(1.25**step)) for step in range(69)}))
+
+    def __init__(
+        self,
+        db_path: str = ".dwc/memory/history.db",
+        *,
+        write_behind: bool = True,
+        batch_size: int = 256,
+        flush_interval_s: float = 0.2,
+        retention_days: Optional[float] = None,
+    ) -> None:
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.write_behind = write_behind
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_s = max(0.0, float(flush_interval_s))
+        self.retention_days = retention_days
+        self.fts_enabled = False
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._write_queue: "queue.Queue[Any]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._closed = False
         self._init_db()
+        atexit.register(_flush_at_exit, weakref.ref(self))
 
     def _connect(self) -> sqlite3.Connection:
-        return sqlite3.connect(str(self.db_path))
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+        return conn
+
+    def _open_connection(self) -> sqlite3.Connection:
+        # check_same_thread=False only so close() can release every thread's
+        # connection; each connection is still used by its owning thread.
+        conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=30.0,
+            cached_statements=256,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def flush(self) -> None:
+        """
+        Block until every queued write is committed.
+        """
+
+        writer = self._writer
+        if writer is None or not writer.is_alive():
+            return
+        self._write_queue.put(_FLUSH)
+        self._write_queue.join()
+
+    def close(self) -> None:
+        """
+        Flush queued writes, stop the writer thread, and close all connections.
+        """
+
+        with self._writer_lock:
+            if self._closed:
+                return
+            self._closed = True
+            writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._write_queue.put(_STOP)
+            writer.join()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+    def _enqueue_write(self, sql: str, params: Tuple[Any, ...]) -> None:
+        if not self.write_behind or self._closed:
+            with self._connect() as conn:
+                conn.execute(sql, params)
+            return
+        self._ensure_writer()
+        self._write_queue.put((sql, params))
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._writer_loop, name="dwc-history-writer", daemon=True
+                )
+                self._writer.start()
+
+    def _writer_loop(self) -> None:
+        conn = self._open_connection()
+        stop = False
+        while not stop:
+            item = self._write_queue.get()
+            batch: List[Any] = [item]
+            if item is not _FLUSH and item is not _STOP:
+                deadline = time.monotonic() + self.flush_interval_s
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._write_queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                    if item is _FLUSH or item is _STOP:
+                        break
+            stop = any(entry is _STOP for entry in batch)
+            writes = [entry for entry in batch if entry is not _FLUSH and entry is not _STOP]
+            try:
+                self._commit_batch(conn, writes)
+            except sqlite3.Error as exc:
+                LOGGER.warning("HistoryStore dropped %d queued writes: %s", len(writes), exc)
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+
+    @staticmethod
+    def _commit_batch(conn: sqlite3.Connection, writes: List[Tuple[str, Tuple[Any, ...]]]) -> None:
+        if not writes:
+            return
+        with conn:
+            # One transaction per batch; consecutive rows of the same statement
+            # share one executemany over the cached prepared statement.
+            start = 0
+            while start < len(writes):
+                sql = writes[start][0]
+                end = start
+                while end < len(writes) and writes[end][0] == sql:
+                    end += 1
+                conn.executemany(sql, [params for _, params in writes[start:end]])
+                start = end
 
     def _init_db(self) -> None:
         with self._connect() as conn:
@@ -32,10 +255,17 @@ class HistoryStore:
                     latency_ms INTEGER NOT NULL,
                     cost_estimate REAL,
                     created_at TEXT NOT NULL,
-                    payload_json TEXT NOT NULL
+                    payload_json TEXT NOT NULL,
+                    payload_blob BLOB,
+                    payload_codec TEXT
                 )
                 """
             )
+            self._ensure_columns(
+                conn,
+                "workflow_history",
+                {"payload_blob": "BLOB", "payload_codec": "TEXT"},
+            )
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS tool_attempts (
@@ -56,6 +286,97 @@ class HistoryStore:
                 )
                 """
             )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_calls (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    agent_name TEXT NOT NULL,
+                    model_id TEXT,
+                    latency_ms INTEGER NOT NULL,
+                    input_tokens INTEGER,
+                    output_tokens INTEGER,
+                    hedged INTEGER NOT NULL DEFAULT 0,
+                    success INTEGER NOT NULL DEFAULT 1,
+                    created_at TEXT NOT NULL,
+                    cache_read_tokens INTEGER,
+                    cache_write_tokens INTEGER
+                )
+                """
+            )
+            self._ensure_columns(
+                conn,
+                "llm_calls",
+                {"cache_read_tokens": "INTEGER", "cache_write_tokens": "INTEGER"},
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_routes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    agent_name TEXT NOT NULL,
+                    task TEXT NOT NULL,
+                    route TEXT NOT NULL,
+                    model_id TEXT,
+                    complexity TEXT NOT NULL,
+                    input_chars INTEGER NOT NULL,
+                    reason TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS step_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    workflow_name TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    trace_id TEXT,
+                    step_id TEXT NOT NULL,
+                    step_type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    duration_ms REAL NOT NULL,
+                    attempt_ms REAL NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    timeouts INTEGER NOT NULL,
+                    errors INTEGER NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+                """
+            )
+            self._ensure_columns(
+                conn,
+                "step_runs",
+                {
+                    "output_chars": "INTEGER",
+                    "prompt_chars": "INTEGER",
+                    "input_chars": "INTEGER",
+                    "input_tokens": "INTEGER",
+                    "output_tokens": "INTEGER",
+                },
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_step_runs_workflow_step
+                ON step_runs(workflow_name, step_id, id DESC)
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_workflow_history_workflow
+                ON workflow_history(workflow_name, id DESC)
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_llm_calls_agent
+                ON llm_calls(agent_name, id DESC)
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_llm_routes_agent_task
+                ON llm_routes(agent_name, task, id DESC)
+                """
+            )
             conn.execute(
                 """
                 CREATE INDEX IF NOT EXISTS idx_tool_attempts_workflow
@@ -68,7 +389,141 @@ class HistoryStore:
                 ON tool_attempts(success, id DESC)
                 """
             )
+            self.fts_enabled = self._init_tool_attempts_fts(conn)
+            self._init_workflow_rollups(conn)
             conn.commit()
+        self.compress_payloads()
+        if self.retention_days is not None:
+            self.prune_history()
+
+    def _init_tool_attempts_fts(self, conn: sqlite3.Connection) -> bool:
+        """
+        External-content FTS5 index over tool_attempts, kept in sync by triggers.
+
+        Returns False when this SQLite build lacks FTS5; callers then fall back
+        to the in-Python Jaccard ranking.
+        """
+
+        columns = ", ".join(name for name, _ in self.FTS_COLUMNS)
+        new_columns = ", ".join(f"new.{name}" for name, _ in self.FTS_COLUMNS)
+        old_columns = ", ".join(f"old.{name}" for name, _ in self.FTS_COLUMNS)
+        existed = (
+            conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tool_attempts_fts'"
+            ).fetchone()
+            is not None
+        )
+        try:
+            conn.execute(
+                f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS tool_attempts_fts USING fts5(
+                    {columns},
+                    content='tool_attempts',
+                    content_rowid='id'
+                )
+                """
+            )
+        except sqlite3.OperationalError:
+            return False
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS tool_attempts_fts_insert
+            AFTER INSERT ON tool_attempts BEGIN
+                INSERT INTO tool_attempts_fts(rowid, {columns})
+                VALUES (new.id, {new_columns});
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS tool_attempts_fts_delete
+            AFTER DELETE ON tool_attempts BEGIN
+                INSERT INTO tool_attempts_fts(tool_attempts_fts, rowid, {columns})
+                VALUES ('delete', old.id, {old_columns});
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS tool_attempts_fts_update
+            AFTER UPDATE ON tool_attempts BEGIN
+                INSERT INTO tool_attempts_fts(tool_attempts_fts, rowid, {columns})
+                VALUES ('delete', old.id, {old_columns});
+                INSERT INTO tool_attempts_fts(rowid, {columns})
+                VALUES (new.id, {new_columns});
+            END
+            """
+        )
+        if not existed:
+            # Backfill attempts recorded before the index existed.
+            conn.execute("INSERT INTO tool_attempts_fts(tool_attempts_fts) VALUES ('rebuild')")
+        return True
+
+    def _init_workflow_rollups(self, conn: sqlite3.Connection) -> None:
+        """
+        Per workflow/version/time-bucket rollups, updated in the same transaction
+        as each `add_record` insert and kept when raw rows are pruned.
+        """
+
+        existed = (
+            conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'workflow_rollups'"
+            ).fetchone()
+            is not None
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS workflow_rollups (
+                workflow_name TEXT NOT NULL,
+                version TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                runs INTEGER NOT NULL,
+                successes INTEGER NOT NULL,
+                latency_sum_ms INTEGER NOT NULL,
+                latency_min_ms INTEGER NOT NULL,
+                latency_max_ms INTEGER NOT NULL,
+                PRIMARY KEY (workflow_name, version, bucket_start)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS workflow_latency_histogram (
+                workflow_name TEXT NOT NULL,
+                version TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                bin INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (workflow_name, version, bucket_start, bin)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_workflow_history_created
+            ON workflow_history(created_at)
+            """
+        )
+        if not existed:
+            # Backfill rollups from rows recorded before the tables existed.
+            rows = conn.execute(
+                """
+                SELECT workflow_name, version, status, latency_ms, created_at
+                FROM workflow_history
+                ORDER BY id
+                """
+            ).fetchall()
+            for row in rows:
+                self._rollup_record(conn, *row)
+
+    @staticmethod
+    def _ensure_columns(
+        conn: sqlite3.Connection, table: str, columns: Dict[str, str]
+    ) -> None:
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+        for name, ddl in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
 
     def add_record(
         self,
@@ -81,6 +536,7 @@ class HistoryStore:
         created_at: str,
         payload: Dict[str, Any],
     ) -> None:
+        payload_json, payload_blob = self._encode_payload(payload)
         with self._connect() as conn:
             conn.execute(
                 """
@@ -91,8 +547,10 @@ class HistoryStore:
                     latency_ms,
                     cost_estimate,
                     created_at,
-                    payload_json
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    payload_json,
+                    payload_blob,
+                    payload_codec
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     workflow_name,
@@ -101,66 +559,430 @@ class HistoryStore:
                     int(latency_ms),
                     cost_estimate,
                     created_at,
-                    json.dumps(payload, sort_keys=True),
+                    payload_json,
+                    payload_blob,
+                    self.PAYLOAD_CODEC,
                 ),
             )
+            self._rollup_record(conn, workflow_name, version, status, latency_ms, created_at)
             conn.commit()
 
-    def recent(self, workflow_name: str, limit: int = 20) -> List[Dict[str, Any]]:
+    def _rollup_record(
+        self,
+        conn: sqlite3.Connection,
+        workflow_name: str,
+        version: str,
+        status: str,
+        latency_ms: int,
+        created_at: str,
+    ) -> None:
+        bucket_start = self._rollup_bucket(created_at)
+        latency = int(latency_ms)
+        conn.execute(
+            """
+            INSERT INTO workflow_rollups (
+                workflow_name,
+                version,
+                bucket_start,
+                runs,
+                successes,
+                latency_sum_ms,
+                latency_min_ms,
+                latency_max_ms
+            ) VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+            ON CONFLICT(workflow_name, version, bucket_start) DO UPDATE SET
+                runs = runs + 1,
+                successes = successes + excluded.successes,
+                latency_sum_ms = latency_sum_ms + excluded.latency_sum_ms,
+                latency_min_ms = MIN(latency_min_ms, excluded.latency_min_ms),
+                latency_max_ms = MAX(latency_max_ms, excluded.latency_max_ms)
+            """,
+            (
+                workflow_name,
+                version,
+                bucket_start,
+                1 if status == "success" else 0,
+                latency,
+                latency,
+                latency,
+            ),
+        )
+        conn.execute(
+            """
+            INSERT INTO workflow_latency_histogram (
+                workflow_name,
+                version,
+                bucket_start,
+                bin,
+                count
+            ) VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT(workflow_name, version, bucket_start, bin) DO UPDATE SET
+                count = count + 1
+            """,
+            (
+                workflow_name,
+                version,
+                bucket_start,
+                bisect.bisect_left(self.LATENCY_BOUNDS_MS, latency),
+            ),
+        )
+
+    @classmethod
+    def _rollup_bucket(cls, value: Union[str, datetime]) -> str:
+        moment = cls._as_utc(value)
+        epoch = int(moment.timestamp())
+        start = epoch - epoch % cls.ROLLUP_BUCKET_SECONDS
+        return datetime.fromtimestamp(start, tz=timezone.utc).isoformat()
+
+    @staticmethod
+    def _as_utc(value: Union[str, datetime]) -> datetime:
+        if isinstance(value, datetime):
+            moment = value
+        else:
+            try:
+                moment = datetime.fromisoformat(value)
+            except ValueError:
+                LOGGER.warning("Unparseable history timestamp %r; using now.", value)
+                moment = datetime.now(timezone.utc)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.astimezone(timezone.utc)
+
+    def workflow_rollups(
+        self,
+        workflow_name: str,
+        *,
+        version: Optional[str] = None,
+        since: Optional[Union[str, datetime]] = None,
+        until: Optional[Union[str, datetime]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Rollup buckets for one workflow, oldest first.
+        """
+
+        where_sql, params = self._rollup_filter(workflow_name, version, since, until)
         with self._connect() as conn:
             rows = conn.execute(
-                """
-                SELECT workflow_name, version, status, latency_ms, cost_estimate, created_at, payload_json
-                FROM workflow_history
-                WHERE workflow_name = ?
-                ORDER BY id DESC
-                LIMIT ?
+                f"""
+                SELECT
+                    version,
+                    bucket_start,
+                    runs,
+                    successes,
+                    latency_sum_ms,
+                    latency_min_ms,
+                    latency_max_ms
+                FROM workflow_rollups
+                {where_sql}
+                ORDER BY bucket_start, version
+                """,
+                params,
+            ).fetchall()
+        return [
+            {
+                "workflow_name": workflow_name,
+                "version": row[0],
+                "bucket_start": row[1],
+                "runs": row[2],
+                "successes": row[3],
+                "success_ratio": round(row[3] / row[2], 4) if row[2] else None,
+                "avg_latency_ms": round(row[4] / row[2], 1) if row[2] else None,
+                "min_latency_ms": row[5],
+                "max_latency_ms": row[6],
+            }
+            for row in rows
+        ]
+
+    def workflow_latency_percentiles(
+        self,
+        workflow_name: str,
+        *,
+        version: Optional[str] = None,
+        since: Optional[Union[str, datetime]] = None,
+        until: Optional[Union[str, datetime]] = None,
+        percentiles: Sequence[float] = (0.5, 0.95, 0.99),
+    ) -> Dict[str, Any]:
+        """
+        Run count, success ratio, and latency percentiles (ms) from the rollups.
+
+        `since`/`until` select whole time buckets (the bucket containing `since`
+        is included). Percentiles are histogram estimates: the upper bound of
+        the bin holding the requested rank, clamped to the observed min/max.
+        """
+
+        where_sql, params = self._rollup_filter(workflow_name, version, since, until)
+        with self._connect() as conn:
+            totals = conn.execute(
+                f"""
+                SELECT
+                    COALESCE(SUM(runs), 0),
+                    COALESCE(SUM(successes), 0),
+                    COALESCE(SUM(latency_sum_ms), 0),
+                    MIN(latency_min_ms),
+                    MAX(latency_max_ms)
+                FROM workflow_rollups
+                {where_sql}
                 """,
-                (workflow_name, limit),
+                params,
+            ).fetchone()
+            bins = conn.execute(
+                f"""
+                SELECT bin, SUM(count)
+                FROM workflow_latency_histogram
+                {where_sql}
+                GROUP BY bin
+                ORDER BY bin
+                """,
+                params,
             ).fetchall()
 
-        results: List[Dict[str, Any]] = []
-        for row in rows:
-            results.append(
-                {
-                    "workflow_name": row[0],
-                    "version": row[1],
-                    "status": row[2],
-                    "latency_ms": row[3],
-                    "cost_estimate": row[4],
-                    "created_at": row[5],
-                    "payload": json.loads(row[6]),
-                }
+        runs, successes, latency_sum, latency_min, latency_max = totals
+        result: Dict[str, Any] = {
+            "workflow_name": workflow_name,
+            "version": version,
+            "runs": runs,
+            "successes": successes,
+            "success_ratio": round(successes / runs, 4) if runs else None,
+            "avg_latency_ms": round(latency_sum / runs, 1) if runs else None,
+            "min_latency_ms": latency_min,
+            "max_latency_ms": latency_max,
+        }
+        total = sum(int(count) for _, count in bins)
+        for percentile in percentiles:
+            key = f"p{int(round(percentile * 100))}"
+            if not total:
+                result[key] = None
+                continue
+            rank = min(total, max(1, math.ceil(percentile * total)))
+            seen = 0
+            for bin_index, count in bins:
+                seen += int(count)
+                if seen >= rank:
+                    break
+            if bin_index < len(self.LATENCY_BOUNDS_MS):
+                estimate = min(float(self.LATENCY_BOUNDS_MS[bin_index]), float(latency_max))
+            else:
+                estimate = float(latency_max)
+            result[key] = max(estimate, float(latency_min))
+        return result
+
+    def _rollup_filter(
+        self,
+        workflow_name: str,
+        version: Optional[str],
+        since: Optional[Union[str, datetime]],
+        until: Optional[Union[str, datetime]],
+    ) -> Tuple[str, List[Any]]:
+        where_clauses = ["workflow_name = ?"]
+        params: List[Any] = [workflow_name]
+        if version is not None:
+            where_clauses.append("version = ?")
+            params.append(version)
+        if since is not None:
+            where_clauses.append("bucket_start >= ?")
+            params.append(self._rollup_bucket(since))
+        if until is not None:
+            where_clauses.append("bucket_start <= ?")
+            params.append(self._rollup_bucket(until))
+        return "WHERE " + " AND ".join(where_clauses), params
+
+    def prune_history(self, *, older_than: Optional[Union[str, datetime]] = None) -> int:
+        """
+        Delete raw workflow_history rows created before `older_than` (default:
+        now minus `retention_days`). Rollups are kept. Returns rows deleted.
+        """
+
+        if older_than is None:
+            if self.retention_days is None:
+                return 0
+            horizon = datetime.now(timezone.utc) - timedelta(days=float(self.retention_days))
+        else:
+            horizon = self._as_utc(older_than)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM workflow_history WHERE created_at < ?",
+                (horizon.isoformat(),),
             )
-        return results
+            conn.commit()
+        deleted = max(0, cursor.rowcount)
+        if deleted:
+            LOGGER.info("Pruned %d workflow_history rows older than %s.", deleted, horizon.isoformat())
+        return deleted
+
+    def recent(self, workflow_name: str, limit: int = 20) -> List[Dict[str, Any]]:
+        page = self.list_records(
+            workflow_name=workflow_name, limit=limit, include_payload=True
+        )
+        return page["records"]
 
     def failures(self, workflow_name: str, limit: int = 20) -> List[Dict[str, Any]]:
+        page = self.list_records(
+            workflow_name=workflow_name,
+            limit=limit,
+            failures_only=True,
+            include_payload=True,
+        )
+        return page["records"]
+
+    def list_records(
+        self,
+        *,
+        workflow_name: Optional[str] = None,
+        status: Optional[str] = None,
+        failures_only: bool = False,
+        columns: Optional[Sequence[str]] = None,
+        include_payload: bool = False,
+        limit: int = 50,
+        cursor: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        One page of workflow_history rows, newest first.
+
+        Only `columns` (default: all of RECORD_COLUMNS) are selected; the
+        payload is read and decoded only when `include_payload` is set. Pass
+        the returned `next_cursor` back as `cursor` to fetch the next page;
+        it is None once the history is exhausted.
+        """
+
+        selected = list(columns or self.RECORD_COLUMNS)
+        unknown = [name for name in selected if name not in self.RECORD_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown workflow_history columns: {unknown}")
+        if "id" not in selected:
+            selected.insert(0, "id")
+
+        where_clauses: List[str] = []
+        params: List[Any] = []
+        if workflow_name:
+            where_clauses.append("workflow_name = ?")
+            params.append(workflow_name)
+        if status:
+            where_clauses.append("status = ?")
+            params.append(status)
+        if failures_only:
+            where_clauses.append("status != 'success'")
+        if cursor is not None:
+            where_clauses.append("id < ?")
+            params.append(int(cursor))
+
+        where_sql = ""
+        if where_clauses:
+            where_sql = "WHERE " + " AND ".join(where_clauses)
+        payload_sql = ", payload_json, payload_blob, payload_codec" if include_payload else ""
+        page_size = max(1, int(limit))
+
         with self._connect() as conn:
             rows = conn.execute(
-                """
-                SELECT workflow_name, version, status, latency_ms, cost_estimate, created_at, payload_json
+                f"""
+                SELECT {", ".join(selected)}{payload_sql}
                 FROM workflow_history
-                WHERE workflow_name = ? AND status != 'success'
+                {where_sql}
                 ORDER BY id DESC
                 LIMIT ?
                 """,
-                (workflow_name, limit),
+                [*params, page_size + 1],
             ).fetchall()
 
-        results: List[Dict[str, Any]] = []
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        records: List[Dict[str, Any]] = []
         for row in rows:
-            results.append(
-                {
-                    "workflow_name": row[0],
-                    "version": row[1],
-                    "status": row[2],
-                    "latency_ms": row[3],
-                    "cost_estimate": row[4],
-                    "created_at": row[5],
-                    "payload": json.loads(row[6]),
-                }
-            )
-        return results
+            record = dict(zip(selected, row[: len(selected)]))
+            if include_payload:
+                record["payload"] = self._decode_payload(*row[len(selected) :])
+            records.append(record)
+        return {
+            "records": records,
+            "next_cursor": records[-1]["id"] if has_more and records else None,
+        }
+
+    def load_payload(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Decode the full artifact payload of one workflow_history row.
+        """
+
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT payload_json, payload_blob, payload_codec
+                FROM workflow_history
+                WHERE id = ?
+                """,
+                (int(record_id),),
+            ).fetchone()
+        if row is None:
+            return None
+        return self._decode_payload(*row)
+
+    def compress_payloads(self, *, batch_size: int = 200, vacuum: bool = True) -> int:
+        """
+        Move blob fields of rows written before `payload_blob` existed into the
+        compressed column. Returns the number of rewritten rows; the database
+        file is vacuumed afterwards so the freed pages are returned to disk.
+        """
+
+        converted = 0
+        last_id = 0
+        with self._connect() as conn:
+            while True:
+                rows = conn.execute(
+                    """
+                    SELECT id, payload_json
+                    FROM workflow_history
+                    WHERE payload_blob IS NULL AND id > ?
+                    ORDER BY id
+                    LIMIT ?
+                    """,
+                    (last_id, int(batch_size)),
+                ).fetchall()
+                if not rows:
+                    break
+                updates = []
+                for record_id, payload_json in rows:
+                    last_id = record_id
+                    try:
+                        payload = json.loads(payload_json)
+                    except ValueError:
+                        continue
+                    if not isinstance(payload, dict):
+                        continue
+                    inline_json, blob = self._encode_payload(payload)
+                    updates.append((inline_json, blob, self.PAYLOAD_CODEC, record_id))
+                if updates:
+                    conn.executemany(
+                        """
+                        UPDATE workflow_history
+                        SET payload_json = ?, payload_blob = ?, payload_codec = ?
+                        WHERE id = ?
+                        """,
+                        updates,
+                    )
+                    conn.commit()
+                    converted += len(updates)
+            if converted and vacuum:
+                conn.execute("VACUUM")
+        return converted
+
+    @classmethod
+    def _encode_payload(cls, payload: Dict[str, Any]) -> Tuple[str, bytes]:
+        inline = {key: value for key, value in payload.items() if key not in cls.PAYLOAD_BLOB_FIELDS}
+        heavy = {key: value for key, value in payload.items() if key in cls.PAYLOAD_BLOB_FIELDS}
+        blob = zlib.compress(
+            json.dumps(heavy, sort_keys=True, separators=(",", ":")).encode("utf-8"), 6
+        )
+        return json.dumps(inline, sort_keys=True), blob
+
+    @staticmethod
+    def _decode_payload(
+        payload_json: str, payload_blob: Optional[bytes], payload_codec: Optional[str]
+    ) -> Dict[str, Any]:
+        payload = json.loads(payload_json)
+        if payload_blob is None:
+            return payload
+        if payload_codec not in (None, "zlib"):
+            raise ValueError(f"Unsupported workflow_history payload codec: {payload_codec}")
+        payload.update(json.loads(zlib.decompress(payload_blob).decode("utf-8")))
+        return dict(sorted(payload.items()))
 
     def add_tool_attempt(
         self,
@@ -179,42 +1001,40 @@ class HistoryStore:
         code_hash: str,
         created_at: str,
     ) -> None:
-        with self._connect() as conn:
-            conn.execute(
-                """
-                INSERT INTO tool_attempts (
-                    workflow_name,
-                    subtask_id,
-                    subtask_description,
-                    tool_name,
-                    tool_origin,
-                    attempt_index,
-                    success,
-                    error_class,
-                    stderr_snippet,
-                    stdout_snippet,
-                    feedback_used,
-                    code_hash,
-                    created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    workflow_name,
-                    subtask_id,
-                    subtask_description,
-                    tool_name,
-                    tool_origin,
-                    int(attempt_index),
-                    1 if success else 0,
-                    error_class,
-                    stderr_snippet,
-                    stdout_snippet,
-                    feedback_used,
-                    code_hash,
-                    created_at,
-                ),
-            )
-            conn.commit()
+        self._enqueue_write(
+            """
+            INSERT INTO tool_attempts (
+                workflow_name,
+                subtask_id,
+                subtask_description,
+                tool_name,
+                tool_origin,
+                attempt_index,
+                success,
+                error_class,
+                stderr_snippet,
+                stdout_snippet,
+                feedback_used,
+                code_hash,
+                created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                workflow_name,
+                subtask_id,
+                subtask_description,
+                tool_name,
+                tool_origin,
+                int(attempt_index),
+                1 if success else 0,
+                error_class,
+                stderr_snippet,
+                stdout_snippet,
+                feedback_used,
+                code_hash,
+                created_at,
+            ),
+        )
 
     def recent_tool_attempts(
         self,
@@ -236,6 +1056,7 @@ class HistoryStore:
         if where_clauses:
             where_sql = "WHERE " + " AND ".join(where_clauses)
 
+        self.flush()
         with self._connect() as conn:
             rows = conn.execute(
                 f"""
@@ -261,24 +1082,25 @@ class HistoryStore:
                 [*params, int(limit)],
             ).fetchall()
 
-        return [
-            {
-                "workflow_name": row[0],
-                "subtask_id": row[1],
-                "subtask_description": row[2],
-                "tool_name": row[3],
-                "tool_origin": row[4],
-                "attempt_index": row[5],
-                "success": bool(row[6]),
-                "error_class": row[7],
-                "stderr_snippet": row[8],
-                "stdout_snippet": row[9],
-                "feedback_used": row[10],
-                "code_hash": row[11],
-                "created_at": row[12],
-            }
-            for row in rows
-        ]
+        return [self._tool_attempt_from_row(row) for row in rows]
+
+    @staticmethod
+    def _tool_attempt_from_row(row: Sequence[Any]) -> Dict[str, Any]:
+        return {
+            "workflow_name": row[0],
+            "subtask_id": row[1],
+            "subtask_description": row[2],
+            "tool_name": row[3],
+            "tool_origin": row[4],
+            "attempt_index": row[5],
+            "success": bool(row[6]),
+            "error_class": row[7],
+            "stderr_snippet": row[8],
+            "stdout_snippet": row[9],
+            "feedback_used": row[10],
+            "code_hash": row[11],
+            "created_at": row[12],
+        }
 
     def similar_failed_attempts(
         self,
@@ -287,6 +1109,23 @@ class HistoryStore:
         limit: int = 3,
         candidate_pool: int = 200,
     ) -> List[Dict[str, Any]]:
+        """
+        Failed attempts most similar to `subtask_description`.
+
+        With FTS5 this is one BM25-ranked query over the full history;
+        otherwise the `candidate_pool` most recent failures are ranked by
+        token Jaccard similarity. Falls back to the most recent failures
+        when nothing matches.
+        """
+
+        if self.fts_enabled:
+            ranked = self._bm25_failed_attempts(subtask_description, limit=limit)
+            if ranked:
+                return ranked
+            return self.recent_tool_attempts(
+                workflow_name=None, limit=limit, failures_only=True
+            )
+
         candidates = self.recent_tool_attempts(
             workflow_name=None,
             limit=max(limit, candidate_pool),
@@ -319,6 +1158,378 @@ class HistoryStore:
         )
         return scored[:limit]
 
+    def _bm25_failed_attempts(
+        self, subtask_description: str, *, limit: int
+    ) -> List[Dict[str, Any]]:
+        tokens = sorted(self._token_set(subtask_description))
+        if not tokens:
+            return []
+        # Tokens are [a-z0-9_]+ so quoting is safe; OR keeps partial matches ranked.
+        match_expr = " OR ".join(f'"{token}"' for token in tokens)
+        weights = ", ".join(str(weight) for _, weight in self.FTS_COLUMNS)
+        self.flush()
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT
+                    t.workflow_name,
+                    t.subtask_id,
+                    t.subtask_description,
+                    t.tool_name,
+                    t.tool_origin,
+                    t.attempt_index,
+                    t.success,
+                    t.error_class,
+                    t.stderr_snippet,
+                    t.stdout_snippet,
+                    t.feedback_used,
+                    t.code_hash,
+                    t.created_at,
+                    bm25(tool_attempts_fts, {weights}) AS rank
+                FROM tool_attempts_fts
+                JOIN tool_attempts AS t ON t.id = tool_attempts_fts.rowid
+                WHERE tool_attempts_fts MATCH ? AND t.success = 0
+                ORDER BY rank, t.id DESC
+                LIMIT ?
+                """,
+                (match_expr, int(limit)),
+            ).fetchall()
+        results = []
+        for row in rows:
+            enriched = self._tool_attempt_from_row(row)
+            # bm25() is lower-is-better; expose a higher-is-better score.
+            enriched["similarity"] = round(-float(row[13]), 6)
+            results.append(enriched)
+        return results
+
+    def add_llm_call(
+        self,
+        *,
+        agent_name: str,
+        model_id: Optional[str],
+        latency_ms: int,
+        input_tokens: Optional[int],
+        output_tokens: Optional[int],
+        hedged: bool,
+        success: bool,
+        created_at: str,
+        cache_read_tokens: Optional[int] = None,
+        cache_write_tokens: Optional[int] = None,
+    ) -> None:
+        self._enqueue_write(
+            """
+            INSERT INTO llm_calls (
+                agent_name,
+                model_id,
+                latency_ms,
+                input_tokens,
+                output_tokens,
+                hedged,
+                success,
+                created_at,
+                cache_read_tokens,
+                cache_write_tokens
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                agent_name,
+                model_id,
+                int(latency_ms),
+                input_tokens,
+                output_tokens,
+                1 if hedged else 0,
+                1 if success else 0,
+                created_at,
+                cache_read_tokens,
+                cache_write_tokens,
+            ),
+        )
+
+    def add_llm_route(
+        self,
+        *,
+        agent_name: str,
+        task: str,
+        route: str,
+        model_id: Optional[str],
+        complexity: str,
+        input_chars: int,
+        reason: str,
+        created_at: str,
+    ) -> None:
+        self._enqueue_write(
+            """
+            INSERT INTO llm_routes (
+                agent_name,
+                task,
+                route,
+                model_id,
+                complexity,
+                input_chars,
+                reason,
+                created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                agent_name,
+                task,
+                route,
+                model_id,
+                complexity,
+                int(input_chars),
+                reason,
+                created_at,
+            ),
+        )
+
+    def llm_route_counts(self, *, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Route decision counts per (agent, task, route) over the most recent decisions.
+        """
+
+        self.flush()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT agent_name, task, route, model_id, COUNT(*), AVG(input_chars)
+                FROM (
+                    SELECT agent_name, task, route, model_id, input_chars
+                    FROM llm_routes
+                    ORDER BY id DESC
+                    LIMIT ?
+                )
+                GROUP BY agent_name, task, route, model_id
+                ORDER BY agent_name, task, route
+                """,
+                (int(limit),),
+            ).fetchall()
+        return [
+            {
+                "agent_name": row[0],
+                "task": row[1],
+                "route": row[2],
+                "model_id": row[3],
+                "decisions": int(row[4]),
+                "avg_input_chars": round(float(row[5] or 0.0), 1),
+            }
+            for row in rows
+        ]
+
+    def llm_latency_percentiles(
+        self,
+        agent_name: str,
+        *,
+        percentiles: Sequence[float] = (0.5, 0.9, 0.99),
+        window: int = 200,
+        model_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Latency percentiles (ms) over the most recent successful calls of one agent,
+        optionally restricted to one model.
+        """
+
+        query = "SELECT latency_ms FROM llm_calls WHERE agent_name = ? AND success = 1"
+        params: List[Any] = [agent_name]
+        if model_id is not None:
+            query += " AND model_id = ?"
+            params.append(model_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(int(window))
+        self.flush()
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        samples = sorted(int(row[0]) for row in rows)
+        result: Dict[str, Any] = {"samples": len(samples)}
+        for percentile in percentiles:
+            result[f"p{int(round(percentile * 100))}"] = self._percentile(samples, percentile)
+        return result
+
+    def add_step_runs(
+        self,
+        *,
+        workflow_name: str,
+        version: str,
+        trace_id: Optional[str],
+        runs: Sequence[Dict[str, Any]],
+        created_at: str,
+    ) -> int:
+        """
+        Record the per-step metrics a generated runtime emitted for one
+        execution (see `ExecutionReport.step_metrics`). Rows without a step id
+        are skipped; returns the number queued.
+        """
+
+        queued = 0
+        for run in runs:
+            step_id = str(run.get("step_id") or "").strip()
+            if not step_id:
+                continue
+            try:
+                duration_ms = max(0.0, float(run.get("duration_ms") or 0.0))
+                attempt_ms = max(0.0, float(run.get("attempt_ms", duration_ms) or 0.0))
+                attempts = max(1, int(run.get("attempts") or 1))
+                timeouts = max(0, int(run.get("timeouts") or 0))
+                errors = max(0, int(run.get("errors") or 0))
+                sizes = [
+                    None if run.get(field) is None else max(0, int(run[field]))
+                    for field in self.STEP_RUN_SIZE_FIELDS
+                ]
+            except (TypeError, ValueError):
+                continue
+            self._enqueue_write(
+                """
+                INSERT INTO step_runs (
+                    workflow_name,
+                    version,
+                    trace_id,
+                    step_id,
+                    step_type,
+                    status,
+                    duration_ms,
+                    attempt_ms,
+                    attempts,
+                    timeouts,
+                    errors,
+                    created_at,
+                    output_chars,
+                    prompt_chars,
+                    input_chars,
+                    input_tokens,
+                    output_tokens
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    workflow_name,
+                    version,
+                    trace_id,
+                    step_id,
+                    str(run.get("step_type") or "unknown"),
+                    str(run.get("status") or "unknown"),
+                    duration_ms,
+                    attempt_ms,
+                    attempts,
+                    timeouts,
+                    errors,
+                    created_at,
+                    *sizes,
+                ),
+            )
+            queued += 1
+        return queued
+
+    def step_runs_revision(self) -> int:
+        """
+        Id of the newest `step_runs` row (0 when empty). Changes whenever step
+        telemetry is recorded, so it can key caches of derived estimates.
+        """
+
+        self.flush()
+        with self._connect() as conn:
+            row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM step_runs").fetchone()
+        return int(row[0])
+
+    def step_run_stats(self, workflow_name: str, *, window: int = 50) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-step latency and reliability over the most recent `window` runs of
+        each step of one workflow, keyed by step id (see `_summarize_step_runs`).
+        """
+
+        self.flush()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT step_id, step_type, status, duration_ms, attempt_ms,
+                       attempts, timeouts, errors, output_chars, prompt_chars,
+                       input_chars, input_tokens, output_tokens
+                FROM (
+                    SELECT *, ROW_NUMBER() OVER (
+                        PARTITION BY step_id ORDER BY id DESC
+                    ) AS recency
+                    FROM step_runs
+                    WHERE workflow_name = ?
+                )
+                WHERE recency <= ?
+                """,
+                (workflow_name, int(window)),
+            ).fetchall()
+        return self._summarize_step_runs(rows)
+
+    def step_type_stats(self, *, window: int = 500) -> Dict[str, Dict[str, Any]]:
+        """
+        Same summary as `step_run_stats`, across all workflows, keyed by step
+        type over the most recent `window` runs of each type.
+        """
+
+        self.flush()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT step_type, step_type, status, duration_ms, attempt_ms,
+                       attempts, timeouts, errors, output_chars, prompt_chars,
+                       input_chars, input_tokens, output_tokens
+                FROM (
+                    SELECT *, ROW_NUMBER() OVER (
+                        PARTITION BY step_type ORDER BY id DESC
+                    ) AS recency
+                    FROM step_runs
+                )
+                WHERE recency <= ?
+                """,
+                (int(window),),
+            ).fetchall()
+        return self._summarize_step_runs(rows)
+
+    @classmethod
+    def _summarize_step_runs(cls, rows: Sequence[Sequence[Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Group `(key, step_type, status, duration_ms, attempt_ms, attempts,
+        timeouts, errors, *STEP_RUN_SIZE_FIELDS)` rows by key. Duration
+        percentiles cover whole runs (retries and backoff included);
+        `attempt_p99_ms` covers only the final attempt of runs that succeeded.
+        Rates are per attempt, except `failure_rate`, which is the share of
+        runs that ended in an error. Size fields get `<field>_p50` / `_p95`
+        over the runs that reported them (None when none did).
+        """
+
+        grouped: Dict[str, List[Sequence[Any]]] = {}
+        for row in rows:
+            grouped.setdefault(str(row[0]), []).append(row)
+
+        stats: Dict[str, Dict[str, Any]] = {}
+        for key, group in grouped.items():
+            durations = sorted(float(row[3]) for row in group)
+            ok_attempts = sorted(
+                float(row[4]) for row in group if str(row[2]) in ("ok", "success")
+            )
+            attempts = sum(int(row[5]) for row in group)
+            stats[key] = {
+                "step_type": str(group[0][1]),
+                "samples": len(group),
+                "p50_ms": cls._percentile(durations, 0.5),
+                "p95_ms": cls._percentile(durations, 0.95),
+                "p99_ms": cls._percentile(durations, 0.99),
+                "attempt_p99_ms": cls._percentile(ok_attempts, 0.99),
+                "mean_attempts": round(attempts / len(group), 3),
+                "timeout_rate": round(sum(int(row[6]) for row in group) / attempts, 4),
+                "error_rate": round(sum(int(row[7]) for row in group) / attempts, 4),
+                "failure_rate": round(
+                    sum(1 for row in group if str(row[2]) == "error") / len(group), 4
+                ),
+            }
+            for offset, field in enumerate(cls.STEP_RUN_SIZE_FIELDS, start=8):
+                values = sorted(int(row[offset]) for row in group if row[offset] is not None)
+                stats[key][f"{field}_p50"] = cls._percentile(values, 0.5)
+                stats[key][f"{field}_p95"] = cls._percentile(values, 0.95)
+        return stats
+
+    @staticmethod
+    def _percentile(sorted_values: Sequence[float], percentile: float) -> Optional[float]:
+        if not sorted_values:
+            return None
+        rank = min(len(sorted_values) - 1, max(0, math.ceil(percentile * len(sorted_values)) - 1))
+        return float(sorted_values[rank])
+
     @staticmethod
     def _token_set(text: str) -> set:
         return {
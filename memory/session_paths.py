@@ -28,6 +28,7 @@ class SessionPaths:
     telemetry_dir: Path
     sandboxes_dir: Path
     shared_tool_registry_path: Path
+    optimizer_cache_path: Path
 
 
 def resolve_session_paths(
@@ -54,6 +55,7 @@ def resolve_session_paths(
     sandboxes_dir = session_root / "sandboxes"
     shared_tools_dir = root / "shared" / "tools"
     shared_registry_path = shared_tools_dir / "shared_tool_registry.json"
+    optimizer_dir = root / "shared" / "optimizer"
 
     # Ensure parent directories exist before stores/sandboxes initialize.
     root.mkdir(parents=True, exist_ok=True)
@@ -63,6 +65,7 @@ def resolve_session_paths(
     telemetry_dir.mkdir(parents=True, exist_ok=True)
     sandboxes_dir.mkdir(parents=True, exist_ok=True)
     shared_tools_dir.mkdir(parents=True, exist_ok=True)
+    optimizer_dir.mkdir(parents=True, exist_ok=True)
 
     return SessionPaths(
         dwc_root=root,
@@ -75,6 +78,7 @@ def resolve_session_paths(
         telemetry_dir=telemetry_dir,
         sandboxes_dir=sandboxes_dir,
         shared_tool_registry_path=shared_registry_path,
+        optimizer_cache_path=optimizer_dir / "pass_cache.db",
     )
 
 
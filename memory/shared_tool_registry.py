@@ -4,25 +4,328 @@ Shared persistent registry for reusable tool candidates.
 
 from __future__ import annotations
 
-import hashlib
 import json
+import logging
 import re
+import sqlite3
+import threading
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
+
+from dwc.memory.code_fingerprint import (
+    FINGERPRINT_VERSION,
+    code_fingerprint,
+    code_hash as raw_code_hash,
+)
+
+LOGGER = logging.getLogger(__name__)
 
 
 class SharedToolRegistry:
-    def __init__(self, path: str = ".dwc/memory/shared_tool_registry.json") -> None:
+    """
+    Reusable tool candidates keyed by code hash, stored in SQLite.
+
+    `path` keeps its historical `.json` name; entries live in the sibling
+    `.db` file (one row per code hash). A JSON registry found at `path` is
+    imported once on first open and left in place as a read-only snapshot.
+    Each contribution is a single `BEGIN IMMEDIATE` transaction ending in an
+    `INSERT ... ON CONFLICT` upsert, so concurrent compiles sharing the
+    registry serialize on SQLite's lock instead of overwriting each other.
+    Rows also carry an AST-normalized `fingerprint`; a contribution whose
+    code only differs from an existing entry in formatting, comments, or
+    local names is merged into that entry instead of creating a new one.
+
+    `entry_tokens` is an inverted index from description token to code hash,
+    with per-token entry counts in `token_stats` and each entry's token-set
+    size and reliability stored on its row. All of them are updated inside
+    the contribution transaction, so `suggest_tool` only scores entries that
+    share a token with the query.
+    """
+
+    MAX_ENTRIES = 500
+    MAX_DESCRIPTION_SAMPLES = 20
+
+    _ENTRY_COLUMNS = (
+        "code_hash",
+        "tool_name",
+        "origin",
+        "code",
+        "sample_input_json",
+        "description_samples_json",
+        "contributors_json",
+        "success_count",
+        "failure_count",
+        "last_error",
+        "created_at",
+        "updated_at",
+    )
+
+    def __init__(
+        self,
+        path: str = ".dwc/memory/shared_tool_registry.json",
+        *,
+        max_entries: int = MAX_ENTRIES,
+    ) -> None:
         self.path = Path(path)
+        self.max_entries = max(1, int(max_entries))
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.path.with_suffix(".db") if self.path.suffix == ".json" else self.path
+        self._local = threading.local()
         self._ensure_initialized()
 
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
     def _ensure_initialized(self) -> None:
-        if self.path.exists():
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tool_entries (
+                    code_hash TEXT PRIMARY KEY,
+                    tool_name TEXT NOT NULL,
+                    origin TEXT NOT NULL,
+                    code TEXT NOT NULL,
+                    sample_input_json TEXT NOT NULL,
+                    description_samples_json TEXT NOT NULL,
+                    contributors_json TEXT NOT NULL,
+                    success_count INTEGER NOT NULL DEFAULT 0,
+                    failure_count INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT NOT NULL DEFAULT '',
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    token_count INTEGER,
+                    reliability REAL,
+                    fingerprint TEXT
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(tool_entries)")}
+            for name, ddl in (
+                ("token_count", "INTEGER"),
+                ("reliability", "REAL"),
+                ("fingerprint", "TEXT"),
+            ):
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE tool_entries ADD COLUMN {name} {ddl}")
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_tool_entries_fingerprint
+                ON tool_entries(fingerprint)
+                """
+            )
+            index_existed = (
+                conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entry_tokens'"
+                ).fetchone()
+                is not None
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entry_tokens (
+                    token TEXT NOT NULL,
+                    code_hash TEXT NOT NULL,
+                    PRIMARY KEY (token, code_hash)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_entry_tokens_code_hash
+                ON entry_tokens(code_hash)
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS token_stats (
+                    token TEXT PRIMARY KEY,
+                    entry_count INTEGER NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_tool_entries_reliability
+                ON tool_entries(reliability DESC, updated_at DESC)
+                WHERE success_count > 0
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_tool_entries_updated
+                ON tool_entries(updated_at DESC)
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_tool_entries_success
+                ON tool_entries(success_count, failure_count)
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS registry_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+                """
+            )
+            self._migrate_json(conn)
+            self._backfill_fingerprints(conn)
+            if not index_existed:
+                self._rebuild_token_index(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _migrate_json(self, conn: sqlite3.Connection) -> None:
+        if self.db_path == self.path or not self.path.exists():
+            return
+        migrated = conn.execute(
+            "SELECT value FROM registry_meta WHERE key = 'json_migrated_at'"
+        ).fetchone()
+        if migrated is not None:
             return
-        payload = {"version": 1, "entries": []}
-        self.path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            payload = {}
+        entries = payload.get("entries", []) if isinstance(payload, dict) else []
+        if not isinstance(entries, list):
+            entries = []
+
+        now = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for entry in entries:
+            if not isinstance(entry, dict) or not entry.get("code_hash"):
+                continue
+            created_at = str(entry.get("created_at") or now)
+            rows.append(
+                (
+                    str(entry["code_hash"]),
+                    str(entry.get("tool_name", "")),
+                    str(entry.get("origin", "")),
+                    str(entry.get("code", "")),
+                    json.dumps(self._as_dict(entry.get("sample_input")), sort_keys=True),
+                    json.dumps(self._as_list(entry.get("description_samples"))),
+                    json.dumps(self._as_list(entry.get("contributors"))),
+                    int(entry.get("success_count", 0) or 0),
+                    int(entry.get("failure_count", 0) or 0),
+                    str(entry.get("last_error", "") or ""),
+                    created_at,
+                    str(entry.get("updated_at") or created_at),
+                )
+            )
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO tool_entries (
+                code_hash,
+                tool_name,
+                origin,
+                code,
+                sample_input_json,
+                description_samples_json,
+                contributors_json,
+                success_count,
+                failure_count,
+                last_error,
+                created_at,
+                updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO registry_meta(key, value) VALUES ('json_migrated_at', ?)",
+            (now,),
+        )
+        if rows:
+            self._rebuild_token_index(conn)
+            LOGGER.info("Imported %d shared tool entries from %s.", len(rows), self.path)
+
+    @staticmethod
+    def _backfill_fingerprints(conn: sqlite3.Connection) -> None:
+        # Rows fingerprinted by an older FINGERPRINT_VERSION are recomputed.
+        stored = conn.execute(
+            "SELECT value FROM registry_meta WHERE key = 'fingerprint_version'"
+        ).fetchone()
+        if stored is not None and stored[0] == str(FINGERPRINT_VERSION):
+            query = "SELECT code_hash, code FROM tool_entries WHERE fingerprint IS NULL"
+        else:
+            query = "SELECT code_hash, code FROM tool_entries"
+        rows = conn.execute(query).fetchall()
+        conn.executemany(
+            "UPDATE tool_entries SET fingerprint = ? WHERE code_hash = ?",
+            [(code_fingerprint(code), code_hash) for code_hash, code in rows],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO registry_meta(key, value) VALUES ('fingerprint_version', ?)",
+            (str(FINGERPRINT_VERSION),),
+        )
+
+    def _rebuild_token_index(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM entry_tokens")
+        conn.execute("DELETE FROM token_stats")
+        conn.execute(
+            """
+            UPDATE tool_entries
+            SET reliability = CAST(success_count AS REAL) / MAX(1, success_count + failure_count)
+            """
+        )
+        rows = conn.execute(
+            "SELECT code_hash, tool_name, origin, description_samples_json FROM tool_entries"
+        ).fetchall()
+        for code_hash, tool_name, origin, samples_json in rows:
+            entry = {
+                "tool_name": tool_name,
+                "origin": origin,
+                "description_samples": self._as_list(self._loads(samples_json)),
+            }
+            self._index_entry(conn, code_hash, self._entry_tokens(entry))
+
+    @staticmethod
+    def _index_entry(conn: sqlite3.Connection, code_hash: str, tokens: set) -> None:
+        previous = {
+            row[0]
+            for row in conn.execute(
+                "SELECT token FROM entry_tokens WHERE code_hash = ?", (code_hash,)
+            ).fetchall()
+        }
+        removed = sorted(previous - tokens)
+        added = sorted(tokens - previous)
+        conn.executemany(
+            "DELETE FROM entry_tokens WHERE token = ? AND code_hash = ?",
+            [(token, code_hash) for token in removed],
+        )
+        conn.executemany(
+            "UPDATE token_stats SET entry_count = entry_count - 1 WHERE token = ?",
+            [(token,) for token in removed],
+        )
+        conn.executemany(
+            "INSERT INTO entry_tokens(token, code_hash) VALUES (?, ?)",
+            [(token, code_hash) for token in added],
+        )
+        conn.executemany(
+            """
+            INSERT INTO token_stats(token, entry_count) VALUES (?, 1)
+            ON CONFLICT(token) DO UPDATE SET entry_count = entry_count + 1
+            """,
+            [(token,) for token in added],
+        )
+        conn.execute(
+            "UPDATE tool_entries SET token_count = ? WHERE code_hash = ?",
+            (len(tokens), code_hash),
+        )
 
     def record_contribution(
         self,
@@ -37,114 +340,295 @@ class SharedToolRegistry:
         error_text: Optional[str],
         created_at: Optional[str] = None,
     ) -> None:
-        payload = self._load()
-        entries = payload.get("entries", [])
-        if not isinstance(entries, list):
-            entries = []
-
-        code_hash = hashlib.sha256(tool_code.encode("utf-8")).hexdigest()
+        code_hash = raw_code_hash(tool_code)
+        fingerprint = code_fingerprint(tool_code)
         now = created_at or datetime.now(timezone.utc).isoformat()
-        target = self._find_entry(entries, code_hash)
-        if target is None:
-            target = {
-                "code_hash": code_hash,
-                "tool_name": tool_name,
-                "origin": origin,
-                "code": tool_code,
-                "sample_input": sample_input,
-                "description_samples": [],
-                "contributors": [],
-                "success_count": 0,
-                "failure_count": 0,
-                "last_error": "",
-                "created_at": now,
-                "updated_at": now,
-            }
-            entries.append(target)
-
-        target["tool_name"] = tool_name
-        target["origin"] = origin
-        target["code"] = tool_code
-        target["sample_input"] = sample_input if isinstance(sample_input, dict) else {}
-        target["updated_at"] = now
-
-        samples = target.get("description_samples")
-        if not isinstance(samples, list):
-            samples = []
         description = str(subtask_description).strip()
-        if description and description not in samples:
-            samples.append(description)
-        target["description_samples"] = samples[-20:]
-
-        contributors = target.get("contributors")
-        if not isinstance(contributors, list):
-            contributors = []
         contributor_name = str(contributor).strip()
-        if contributor_name and contributor_name not in contributors:
-            contributors.append(contributor_name)
-        target["contributors"] = contributors
-
         can_learn_description = (
             contributor_name != "shared_tool_registry" and str(origin).strip() != "shared_registry"
         )
-        target["success_count"] = int(target.get("success_count", 0))
-        target["failure_count"] = int(target.get("failure_count", 0))
-        if not can_learn_description:
-            # Avoid feedback-loop drift where reused tools self-reinforce unrelated intents.
-            target["description_samples"] = [
-                sample
-                for sample in target.get("description_samples", [])
-                if str(sample).strip() != description
-            ]
-        if success:
-            target["success_count"] += 1
-        else:
-            target["failure_count"] += 1
-            target["last_error"] = (error_text or "").strip()[:500]
 
-        entries.sort(key=lambda row: str(row.get("updated_at", "")), reverse=True)
-        payload["entries"] = entries[:500]
-        self._save(payload)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = conn.execute(
+                """
+                SELECT code_hash, code, sample_input_json, description_samples_json, contributors_json
+                FROM tool_entries
+                WHERE code_hash = ? OR fingerprint = ?
+                ORDER BY code_hash = ? DESC, success_count DESC
+                LIMIT 1
+                """,
+                (code_hash, fingerprint, code_hash),
+            ).fetchone()
+            if existing is not None and existing[0] != code_hash:
+                # Equivalent code already stored: keep that entry's code so its
+                # code_hash still matches, and fold this outcome into it.
+                code_hash, tool_code = existing[0], existing[1]
+                sample_input = self._as_dict(self._loads(existing[2])) or sample_input
+            samples = self._as_list(self._loads(existing[3])) if existing else []
+            contributors = self._as_list(self._loads(existing[4])) if existing else []
+
+            if description and description not in samples:
+                samples.append(description)
+            samples = samples[-self.MAX_DESCRIPTION_SAMPLES :]
+            if contributor_name and contributor_name not in contributors:
+                contributors.append(contributor_name)
+            if not can_learn_description:
+                # Avoid feedback-loop drift where reused tools self-reinforce unrelated intents.
+                samples = [sample for sample in samples if str(sample).strip() != description]
+
+            conn.execute(
+                """
+                INSERT INTO tool_entries (
+                    code_hash,
+                    tool_name,
+                    origin,
+                    code,
+                    sample_input_json,
+                    description_samples_json,
+                    contributors_json,
+                    success_count,
+                    failure_count,
+                    last_error,
+                    created_at,
+                    updated_at,
+                    fingerprint
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(code_hash) DO UPDATE SET
+                    tool_name = excluded.tool_name,
+                    origin = excluded.origin,
+                    code = excluded.code,
+                    sample_input_json = excluded.sample_input_json,
+                    description_samples_json = excluded.description_samples_json,
+                    contributors_json = excluded.contributors_json,
+                    success_count = success_count + excluded.success_count,
+                    failure_count = failure_count + excluded.failure_count,
+                    last_error = CASE
+                        WHEN excluded.failure_count > 0 THEN excluded.last_error
+                        ELSE last_error
+                    END,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    code_hash,
+                    tool_name,
+                    origin,
+                    tool_code,
+                    json.dumps(self._as_dict(sample_input), sort_keys=True),
+                    json.dumps(samples),
+                    json.dumps(contributors),
+                    1 if success else 0,
+                    0 if success else 1,
+                    "" if success else (error_text or "").strip()[:500],
+                    now,
+                    now,
+                    fingerprint,
+                ),
+            )
+            conn.execute(
+                """
+                UPDATE tool_entries
+                SET reliability = CAST(success_count AS REAL) / MAX(1, success_count + failure_count)
+                WHERE code_hash = ?
+                """,
+                (code_hash,),
+            )
+            self._index_entry(
+                conn,
+                code_hash,
+                self._entry_tokens(
+                    {"tool_name": tool_name, "origin": origin, "description_samples": samples}
+                ),
+            )
+            self._evict_overflow(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict_overflow(self, conn: sqlite3.Connection) -> None:
+        count = int(conn.execute("SELECT COUNT(*) FROM tool_entries").fetchone()[0])
+        if count <= self.max_entries:
+            return
+        evicted = [
+            (row[0],)
+            for row in conn.execute(
+                "SELECT code_hash FROM tool_entries ORDER BY updated_at ASC LIMIT ?",
+                (count - self.max_entries,),
+            ).fetchall()
+        ]
+        for (code_hash,) in evicted:
+            self._index_entry(conn, code_hash, set())
+        conn.executemany("DELETE FROM tool_entries WHERE code_hash = ?", evicted)
+        conn.execute("DELETE FROM token_stats WHERE entry_count <= 0")
 
     def suggest_tool(
         self,
         *,
         subtask_description: str,
     ) -> Optional[Dict[str, Any]]:
-        payload = self._load()
-        entries = payload.get("entries", [])
-        if not isinstance(entries, list) or not entries:
-            return None
+        """
+        Best reusable entry by `0.75 * jaccard + 0.25 * reliability`.
+
+        Candidates come from the inverted index, plus the most reliable entry
+        (the best possible zero-similarity score). Posting lists are read
+        rarest token first; once no entry outside the candidate set can reach
+        the best score so far, the remaining lists only complete the overlap
+        counts of existing candidates. The result, including ties going to the
+        most recently updated entry, matches a full scan.
+        """
 
         query_tokens = self._token_set(subtask_description)
-        best: Optional[Dict[str, Any]] = None
+        conn = self._connect()
+        most_reliable = conn.execute(
+            """
+            SELECT code_hash, success_count, failure_count, token_count, updated_at
+            FROM tool_entries
+            WHERE success_count > 0
+            ORDER BY reliability DESC, updated_at DESC
+            LIMIT 1
+            """
+        ).fetchone()
+        if most_reliable is None:
+            return None
+
+        # code_hash -> [success_count, failure_count, token_count, updated_at, shared]
+        candidates: Dict[str, List[Any]] = {most_reliable[0]: [*most_reliable[1:], 0]}
+        max_reliability = self._reliability(most_reliable[1], most_reliable[2])
+        query_size = len(query_tokens)
+        entry_counts = dict.fromkeys(query_tokens, 0)
+        if query_tokens:
+            placeholders = ", ".join("?" for _ in query_tokens)
+            entry_counts.update(
+                conn.execute(
+                    f"SELECT token, entry_count FROM token_stats WHERE token IN ({placeholders})",
+                    sorted(query_tokens),
+                ).fetchall()
+            )
+        ordered_tokens = sorted(query_tokens, key=lambda token: (entry_counts[token], token))
+
         best_score = 0.0
-        for entry in entries:
-            success_count = int(entry.get("success_count", 0))
-            if success_count <= 0:
-                continue
-            failure_count = int(entry.get("failure_count", 0))
-            sample_tokens = self._entry_tokens(entry)
-            similarity = self._jaccard_similarity(query_tokens, sample_tokens)
-            reliability = success_count / max(1, success_count + failure_count)
-            score = (0.75 * similarity) + (0.25 * reliability)
+        admitting = True
+        for position, token in enumerate(ordered_tokens):
+            if admitting and position:
+                # Entries not seen yet lack every token read so far.
+                bound = 0.75 * ((query_size - position) / query_size) + 0.25 * max_reliability
+                admitting = bound >= best_score
+            if admitting:
+                rows = conn.execute(
+                    """
+                    SELECT e.code_hash, e.success_count, e.failure_count, e.token_count, e.updated_at
+                    FROM entry_tokens t
+                    JOIN tool_entries e ON e.code_hash = t.code_hash
+                    WHERE t.token = ? AND e.success_count > 0
+                    """,
+                    (token,),
+                ).fetchall()
+                for code_hash, success_count, failure_count, token_count, updated_at in rows:
+                    candidate = candidates.get(code_hash)
+                    if candidate is None:
+                        candidate = [success_count, failure_count, token_count, updated_at, 0]
+                        candidates[code_hash] = candidate
+                    shared = candidate[4] = candidate[4] + 1
+                    # Lower bound on the entry's final score (overlap so far).
+                    score = 0.75 * shared / (query_size + token_count - shared) + 0.25 * (
+                        success_count / max(1, success_count + failure_count)
+                    )
+                    if score > best_score:
+                        best_score = score
+            else:
+                rows = conn.execute(
+                    """
+                    SELECT code_hash FROM entry_tokens
+                    WHERE token = ? AND code_hash IN (SELECT value FROM json_each(?))
+                    """,
+                    (token, json.dumps(list(candidates))),
+                ).fetchall()
+                for (code_hash,) in rows:
+                    candidates[code_hash][4] += 1
+
+        best_hash: Optional[str] = None
+        best_score = 0.0
+        for code_hash, candidate in sorted(
+            candidates.items(), key=lambda item: str(item[1][3]), reverse=True
+        ):
+            score = self._score(candidate, query_size)
             if score > best_score:
                 best_score = score
-                best = dict(entry)
+                best_hash = code_hash
 
-        if best is None:
+        if best_hash is None:
             return None
         if best_score <= 0:
             return None
+        row = conn.execute(
+            f"SELECT {', '.join(self._ENTRY_COLUMNS)} FROM tool_entries WHERE code_hash = ?",
+            (best_hash,),
+        ).fetchone()
+        best = self._entry_from_row(row)
         best["similarity"] = round(best_score, 6)
         return best
 
     @staticmethod
-    def _find_entry(entries: List[Dict[str, Any]], code_hash: str) -> Optional[Dict[str, Any]]:
-        for entry in entries:
-            if str(entry.get("code_hash")) == code_hash:
-                return entry
-        return None
+    def _reliability(success_count: int, failure_count: int) -> float:
+        success_count = int(success_count)
+        return success_count / max(1, success_count + int(failure_count))
+
+    @classmethod
+    def _score(cls, candidate: Sequence[Any], query_size: int) -> float:
+        success_count, failure_count, token_count, _, shared = candidate
+        similarity = 0.0
+        if shared and token_count:
+            # Same value as _jaccard_similarity on the full token sets.
+            similarity = float(shared / (query_size + int(token_count) - shared))
+        return (0.75 * similarity) + (0.25 * cls._reliability(success_count, failure_count))
+
+    def entries(self, *, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Registry entries, most recently updated first.
+        """
+
+        query = f"SELECT {', '.join(self._ENTRY_COLUMNS)} FROM tool_entries ORDER BY updated_at DESC"
+        params: List[Any] = []
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        rows = self._connect().execute(query, params).fetchall()
+        return [self._entry_from_row(row) for row in rows]
+
+    @classmethod
+    def _entry_from_row(cls, row: Sequence[Any]) -> Dict[str, Any]:
+        return {
+            "code_hash": row[0],
+            "tool_name": row[1],
+            "origin": row[2],
+            "code": row[3],
+            "sample_input": cls._as_dict(cls._loads(row[4])),
+            "description_samples": cls._as_list(cls._loads(row[5])),
+            "contributors": cls._as_list(cls._loads(row[6])),
+            "success_count": int(row[7]),
+            "failure_count": int(row[8]),
+            "last_error": row[9],
+            "created_at": row[10],
+            "updated_at": row[11],
+        }
+
+    @staticmethod
+    def _loads(raw: Optional[str]) -> Any:
+        try:
+            return json.loads(raw or "null")
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _as_dict(value: Any) -> Dict[str, Any]:
+        return value if isinstance(value, dict) else {}
+
+    @staticmethod
+    def _as_list(value: Any) -> List[Any]:
+        return list(value) if isinstance(value, list) else []
 
     @staticmethod
     def _token_set(text: str) -> set:
@@ -172,19 +656,3 @@ class SharedToolRegistry:
         if not union:
             return 0.0
         return float(len(left & right) / len(union))
-
-    def _load(self) -> Dict[str, Any]:
-        self._ensure_initialized()
-        try:
-            raw = self.path.read_text(encoding="utf-8")
-            payload = json.loads(raw)
-        except Exception:
-            payload = {"version": 1, "entries": []}
-        if not isinstance(payload, dict):
-            payload = {"version": 1, "entries": []}
-        payload.setdefault("version", 1)
-        payload.setdefault("entries", [])
-        return payload
-
-    def _save(self, payload: Dict[str, Any]) -> None:
-        self.path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
@@ -6,13 +6,66 @@ from __future__ import annotations
 
 import hashlib
 import json
+import logging
 import math
+import os
 import re
+import struct
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from pydantic import BaseModel, Field
 
+try:  # Optional dependency: enables the memory-mapped index
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+LOGGER = logging.getLogger(__name__)
+
+# Fixed-size `.npy` header so the row count can be rewritten in place on append.
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+_NPY_HEADER_BYTES = 128
+
+
+def _npy_header(rows: int, cols: int, descr: str = "<f4") -> bytes:
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d, %d), }" % (descr, rows, cols)
+    padding = _NPY_HEADER_BYTES - len(_NPY_MAGIC) - 2 - len(header) - 1
+    if padding < 0:
+        raise ValueError("Vector index header overflow.")
+    body = header.encode("latin1") + b" " * padding + b"\n"
+    return _NPY_MAGIC + struct.pack("<H", len(body)) + body
+
+
+def _parse_npy_shape(header: bytes) -> Tuple[int, int]:
+    if not header.startswith(_NPY_MAGIC):
+        raise ValueError("Vector index is not a DWC .npy matrix.")
+    match = re.search(rb"'shape': \((\d+), (\d+)\)", header)
+    if match is None:
+        raise ValueError("Vector index header has no 2-D shape.")
+    return int(match.group(1)), int(match.group(2))
+
+
+def _write_npy_rows(path: Path, start_row: int, values: Any) -> None:
+    # Rows land at their final offset (dropping any torn tail); callers bump
+    # the header row count afterwards so readers never see partial rows.
+    row_bytes = int(values.shape[1]) * int(values.dtype.itemsize)
+    with path.open("r+b") as handle:
+        handle.seek(_NPY_HEADER_BYTES + start_row * row_bytes)
+        handle.truncate()
+        handle.write(np.ascontiguousarray(values).tobytes())
+
+
+def _write_npy_header(path: Path, rows: int, cols: int, descr: str = "<f4") -> None:
+    with path.open("r+b") as handle:
+        handle.write(_npy_header(rows, cols, descr))
+
+
+def _read_npy_shape(path: Path) -> Tuple[int, int]:
+    with path.open("rb") as handle:
+        return _parse_npy_shape(handle.read(_NPY_HEADER_BYTES))
+
 
 class VectorRecord(BaseModel):
     key: str
@@ -21,21 +74,235 @@ class VectorRecord(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
+class AnnConfig(BaseModel):
+    """
+    Random-hyperplane LSH settings for approximate search.
+
+    More tables or a larger probe radius raise recall (more candidates);
+    more bits per table make buckets smaller and queries faster.
+    """
+
+    n_tables: int = Field(default=16, ge=1, le=64)
+    n_bits: int = Field(default=12, ge=1, le=24)  # table id shares the uint32 key
+    probe_radius: int = Field(default=1, ge=0, le=2)
+    min_rows: int = Field(default=20_000, ge=0)
+    seed: int = 0
+
+
+class _LshIndex:
+    """
+    Multi-table LSH over the store matrix, persisted as a `<u4` code matrix
+    (rows x tables) plus a small JSON config next to the data file.
+
+    Buckets are one sorted (table, code) key array probed with `searchsorted`;
+    rows appended since the last rebuild are scanned exactly until then.
+    """
+
+    def __init__(self, config: AnnConfig, *, dim: int, codes_path: Path, config_path: Path):
+        self.config = config
+        self.dim = dim
+        self.codes_path = codes_path
+        self.config_path = config_path
+        rng = np.random.default_rng(config.seed)
+        planes = rng.standard_normal((config.n_tables * config.n_bits, dim))
+        self._planes = planes.astype(np.float32).T
+        self._weights = (np.uint32(1) << np.arange(config.n_bits, dtype=np.uint32)).astype(np.uint32)
+        self._probe_masks = self._build_probe_masks(config.n_bits, config.probe_radius)
+        self._codes = np.zeros((0, config.n_tables), dtype=np.uint32)
+        self._sorted_keys = np.zeros(0, dtype=np.uint32)
+        self._sorted_rows = np.zeros(0, dtype=np.int32)
+        self._indexed_rows = 0
+
+    def hash(self, vectors: Any) -> Any:
+        bits = (np.asarray(vectors, dtype=np.float32) @ self._planes) > 0
+        bits = bits.reshape(-1, self.config.n_tables, self.config.n_bits)
+        return (bits.astype(np.uint32) * self._weights).sum(axis=2, dtype=np.uint32)
+
+    def sync(self, matrix: Any) -> None:
+        """
+        Align persisted codes with the matrix: rebuild on config change,
+        hash any rows missing after a crash, drop rows the matrix lacks.
+        """
+
+        rows = int(matrix.shape[0])
+        if not self._config_matches() or not self.codes_path.exists():
+            with self.codes_path.open("wb") as handle:
+                handle.write(_npy_header(0, self.config.n_tables, "<u4"))
+            self.config_path.write_text(
+                json.dumps(self._config_payload(), sort_keys=True), encoding="utf-8"
+            )
+            stored = 0
+        else:
+            stored = min(_read_npy_shape(self.codes_path)[0], rows)
+        if stored < rows:
+            for start in range(stored, rows, LocalVectorStore.SEARCH_BLOCK_ROWS):
+                block = matrix[start : start + LocalVectorStore.SEARCH_BLOCK_ROWS]
+                _write_npy_rows(self.codes_path, start, self.hash(block).astype("<u4"))
+        _write_npy_header(self.codes_path, rows, self.config.n_tables, "<u4")
+        if rows:
+            self._codes = np.array(
+                np.memmap(
+                    self.codes_path,
+                    dtype="<u4",
+                    mode="r",
+                    offset=_NPY_HEADER_BYTES,
+                    shape=(rows, self.config.n_tables),
+                )
+            )
+        else:
+            self._codes = np.zeros((0, self.config.n_tables), dtype=np.uint32)
+        self._rebuild()
+
+    def append(self, vectors: Any, *, start_row: int) -> None:
+        codes = self.hash(vectors).astype("<u4")
+        _write_npy_rows(self.codes_path, start_row, codes)
+        _write_npy_header(self.codes_path, start_row + codes.shape[0], self.config.n_tables, "<u4")
+        self._codes = np.concatenate([self._codes[:start_row], codes])
+        pending = self._codes.shape[0] - self._indexed_rows
+        if pending > max(4096, self._indexed_rows // 10):
+            self._rebuild()
+
+    def candidates(self, query_vec: Any) -> Any:
+        query_codes = self.hash(query_vec[None, :])[0]
+        # One sorted key array covers every table: key = table << n_bits | code.
+        table_keys = np.arange(self.config.n_tables, dtype=np.uint32) << np.uint32(self.config.n_bits)
+        probes = (
+            (table_keys | query_codes)[:, None] ^ self._probe_masks[None, :]
+        ).ravel()
+        lo = np.searchsorted(self._sorted_keys, probes, side="left")
+        hi = np.searchsorted(self._sorted_keys, probes, side="right")
+        lengths = hi - lo
+        keep = lengths > 0
+        lo, lengths = lo[keep], lengths[keep]
+        total = int(lengths.sum())
+        # Expand the [lo, hi) bucket ranges into flat positions without a Python loop.
+        positions = np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        # Dedupe through a row mask: cheaper than np.unique on many duplicates.
+        mask = np.zeros(int(self._codes.shape[0]), dtype=bool)
+        mask[self._sorted_rows[positions]] = True
+        mask[self._indexed_rows :] = True
+        return np.flatnonzero(mask)
+
+    def _rebuild(self) -> None:
+        n_rows = int(self._codes.shape[0])
+        table_keys = np.arange(self.config.n_tables, dtype=np.uint32) << np.uint32(self.config.n_bits)
+        keys = (self._codes | table_keys[None, :]).ravel()
+        rows = np.repeat(np.arange(n_rows, dtype=np.int32), self.config.n_tables)
+        order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[order]
+        self._sorted_rows = rows[order]
+        self._indexed_rows = n_rows
+
+    def _config_payload(self) -> Dict[str, Any]:
+        return {
+            "dim": self.dim,
+            "n_bits": self.config.n_bits,
+            "n_tables": self.config.n_tables,
+            "seed": self.config.seed,
+        }
+
+    def _config_matches(self) -> bool:
+        if not self.config_path.exists():
+            return False
+        try:
+            stored = json.loads(self.config_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return False
+        return stored == self._config_payload()
+
+    @staticmethod
+    def _build_probe_masks(n_bits: int, radius: int) -> Any:
+        masks = [0]
+        if radius >= 1:
+            masks.extend(1 << bit for bit in range(n_bits))
+        if radius >= 2:
+            masks.extend(
+                (1 << first) | (1 << second)
+                for first in range(n_bits)
+                for second in range(first + 1, n_bits)
+            )
+        return np.asarray(masks, dtype=np.uint32)
+
+
 class LocalVectorStore:
     """
     Deterministic embedding store without external ML dependencies.
+
+    Records are keyed: adding an existing key replaces it (upsert). When NumPy
+    is installed, vectors live in a float32 `.npy` matrix next to `path`
+    (memory-mapped for queries, appended in place) with one JSON line per row
+    in a `.meta.jsonl` sidecar; replaced or deleted rows are tombstoned in a
+    `.tombstones` row log and dropped by compaction, which runs in a
+    background thread once enough rows are dead. A legacy `path` JSONL file
+    is imported once when the index is first created and is left untouched.
+    Without NumPy (or with `use_index=False`) the store keeps the append-only
+    JSONL scan and resolves duplicate keys at read time (last write wins).
+
+    Passing `ann=AnnConfig(...)` adds an LSH index (`.lsh.npy` / `.lsh.json`)
+    used once the store holds `min_rows` rows; candidates are re-scored
+    exactly, and search falls back to the exact scan if too few are found.
     """
 
-    def __init__(self, path: str = ".dwc/memory/vector_store.jsonl", dim: int = 64):
+    SEARCH_BLOCK_ROWS = 65536
+    IMPORT_BATCH_ROWS = 4096
+
+    def __init__(
+        self,
+        path: str = ".dwc/memory/vector_store.jsonl",
+        dim: int = 64,
+        *,
+        use_index: bool = True,
+        ann: Optional[AnnConfig] = None,
+        auto_compact: bool = True,
+        compaction_min_dead: int = 1024,
+        compaction_ratio: float = 0.2,
+    ):
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
         self.dim = dim
+        self.index_enabled = bool(use_index and np is not None)
+        self.matrix_path = self.path.with_suffix(".vectors.npy")
+        self.meta_path = self.path.with_suffix(".meta.jsonl")
+        self.tombstones_path = self.path.with_suffix(".tombstones")
+        self.compaction_marker_path = self.path.with_suffix(".compact.json")
+        self.auto_compact = auto_compact
+        self.compaction_min_dead = compaction_min_dead
+        self.compaction_ratio = compaction_ratio
+        self._lock = threading.RLock()
+        self._matrix: Any = None
+        self._meta_offsets: List[int] = [0]
+        self._dead: Any = None
+        self._dead_count = 0
+        self._index_signature: Optional[Tuple[int, ...]] = None
+        # Lazily built from the sidecar: live key -> row, (field, value) -> rows.
+        self._key_rows: Optional[Dict[str, int]] = None
+        self._postings: Dict[Tuple[str, str], List[int]] = {}
+        self._compaction_lock = threading.Lock()
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._ann: Optional[_LshIndex] = None
+        if self.index_enabled and ann is not None:
+            self._ann = _LshIndex(
+                ann,
+                dim=dim,
+                codes_path=self.path.with_suffix(".lsh.npy"),
+                config_path=self.path.with_suffix(".lsh.json"),
+            )
 
     def add(
         self, text: str, *, key: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None
     ) -> str:
         doc_key = key or hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
         vector = self._embed(text)
+        if self.index_enabled:
+            row = {"key": doc_key, "text": text, "metadata": metadata or {}}
+            with self._lock:
+                self._ensure_catalog()
+                existing = self._key_rows.get(doc_key)
+                if existing is not None and self._read_meta(existing) == row:
+                    return doc_key
+                self._upsert_rows(np.asarray([vector], dtype=np.float32), [row])
+            self._maybe_compact()
+            return doc_key
         record = VectorRecord(
             key=doc_key, text=text, vector=vector, metadata=metadata or {}
         )
@@ -44,28 +311,479 @@ class LocalVectorStore:
             handle.write(json.dumps(payload, sort_keys=True) + "\n")
         return doc_key
 
+    def delete(self, key: str) -> bool:
+        """
+        Tombstone the live row for `key`; returns False when the key is unknown.
+        """
+
+        if not self.index_enabled:
+            raise RuntimeError("Vector store deletes require the numpy index.")
+        with self._lock:
+            self._ensure_catalog()
+            row = self._key_rows.pop(key, None)
+            if row is None:
+                return False
+            self._tombstone([row])
+        self._maybe_compact()
+        return True
+
     def search(
-        self, query: str, *, top_k: int = 5, min_score: float = -1.0
+        self,
+        query: str,
+        *,
+        top_k: int = 5,
+        min_score: float = -1.0,
+        where: Optional[Dict[str, Any]] = None,
     ) -> List[Tuple[float, VectorRecord]]:
+        """
+        Top-k records by cosine similarity; `where` keeps only records whose
+        metadata equals every given field value.
+        """
+
+        if self.index_enabled:
+            return self._search_index(query, top_k=top_k, min_score=min_score, where=where)
         query_vec = self._embed(query)
         scored: List[Tuple[float, VectorRecord]] = []
         for record in self._iter_records():
+            if where and any(record.metadata.get(field) != value for field, value in where.items()):
+                continue
             score = self._cosine_similarity(query_vec, record.vector)
             if score >= min_score:
                 scored.append((score, record))
         scored.sort(key=lambda item: item[0], reverse=True)
         return scored[:top_k]
 
+    def import_jsonl(self, path: Optional[str] = None) -> int:
+        """
+        Upsert every record of a legacy JSONL store into the index; returns rows read.
+        """
+
+        if not self.index_enabled:
+            raise RuntimeError("Vector index requires numpy.")
+        source = Path(path) if path else self.path
+        if not source.exists():
+            return 0
+        imported = 0
+        vectors: List[List[float]] = []
+        rows: List[Dict[str, Any]] = []
+        with source.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                record = VectorRecord(**json.loads(line))
+                vector = record.vector
+                if len(vector) != self.dim:
+                    vector = self._embed(record.text)
+                vectors.append(vector)
+                rows.append({"key": record.key, "text": record.text, "metadata": record.metadata})
+                if len(rows) >= self.IMPORT_BATCH_ROWS:
+                    with self._lock:
+                        self._upsert_rows(np.asarray(vectors, dtype=np.float32), rows)
+                    imported += len(rows)
+                    vectors, rows = [], []
+        if rows:
+            with self._lock:
+                self._upsert_rows(np.asarray(vectors, dtype=np.float32), rows)
+            imported += len(rows)
+        self._maybe_compact()
+        return imported
+
+    def compact(self) -> int:
+        """
+        Rewrite the index without tombstoned rows; returns rows reclaimed.
+
+        Safe to run while other threads add or delete: rows appended or
+        tombstoned after the snapshot are carried over before the swap.
+        """
+
+        if not self.index_enabled:
+            return 0
+        with self._compaction_lock:
+            return self._compact()
+
+    def _compact(self) -> int:
+        with self._lock:
+            self._ensure_index()
+            snapshot_rows = int(self._matrix.shape[0])
+            keep = np.flatnonzero(~self._dead[:snapshot_rows])
+            if keep.shape[0] == snapshot_rows:
+                return 0
+            matrix, offsets = self._matrix, list(self._meta_offsets)
+
+        tmp_matrix = self.matrix_path.with_suffix(".npy.compact")
+        tmp_meta = self.meta_path.with_suffix(".jsonl.compact")
+        tmp_tombstones = self.tombstones_path.with_suffix(".tombstones.compact")
+        with tmp_matrix.open("wb") as handle:
+            handle.write(_npy_header(0, self.dim))
+        self._copy_rows(matrix, offsets, keep, tmp_matrix, tmp_meta, start_row=0, truncate=True)
+
+        with self._lock:
+            self._ensure_index()
+            total_rows = int(self._matrix.shape[0])
+            tail = np.arange(snapshot_rows, total_rows)
+            self._copy_rows(
+                self._matrix,
+                self._meta_offsets,
+                tail,
+                tmp_matrix,
+                tmp_meta,
+                start_row=int(keep.shape[0]),
+                truncate=False,
+            )
+            remap = np.full(total_rows, -1, dtype=np.int64)
+            remap[keep] = np.arange(keep.shape[0])
+            remap[snapshot_rows:] = keep.shape[0] + np.arange(total_rows - snapshot_rows)
+            # Rows tombstoned after the snapshot survive the copy; re-tombstone them.
+            late_dead = remap[np.flatnonzero(self._dead[:total_rows] & (remap >= 0))]
+            late_dead.astype("<u8").tofile(str(tmp_tombstones))
+            _write_npy_header(tmp_matrix, int(keep.shape[0]) + int(tail.shape[0]), self.dim)
+            self.compaction_marker_path.write_text(
+                json.dumps(
+                    {
+                        str(tmp_matrix): str(self.matrix_path),
+                        str(tmp_meta): str(self.meta_path),
+                        str(tmp_tombstones): str(self.tombstones_path),
+                    },
+                    sort_keys=True,
+                ),
+                encoding="utf-8",
+            )
+            self._finish_compaction()
+            self._index_signature = None
+            self._load_index()
+        return snapshot_rows - int(keep.shape[0])
+
+    def __len__(self) -> int:
+        if not self.index_enabled:
+            return len(self._iter_records())
+        with self._lock:
+            self._ensure_index()
+            return int(self._matrix.shape[0]) - self._dead_count
+
+    def _search_index(
+        self,
+        query: str,
+        *,
+        top_k: int,
+        min_score: float,
+        where: Optional[Dict[str, Any]],
+    ) -> List[Tuple[float, VectorRecord]]:
+        with self._lock:
+            self._ensure_index()
+            matrix, dead = self._matrix, self._dead
+            filtered = self._filtered_rows(where) if where else None
+        total = int(matrix.shape[0])
+        if total == 0 or top_k <= 0:
+            return []
+        query_vec = np.asarray(self._embed(query), dtype=np.float32)
+        scores, rows = None, None
+        if filtered is not None:
+            # Filtered search only touches rows from the metadata postings.
+            if filtered.shape[0] == 0:
+                return []
+            scores, rows = self._top_k(matrix[filtered], query_vec, top_k)
+            rows = filtered[rows]
+        elif self._ann is not None and total >= self._ann.config.min_rows:
+            with self._lock:
+                candidates = self._ann.candidates(query_vec)
+            candidates = candidates[~dead[candidates]]
+            if candidates.shape[0] >= top_k:
+                scores, rows = self._top_k(matrix[candidates], query_vec, top_k)
+                rows = candidates[rows]
+        if scores is None:
+            scores, rows = self._top_k(matrix, query_vec, top_k, dead=dead)
+        return [
+            (float(score), self._record_at(int(row), matrix))
+            for score, row in zip(scores, rows)
+            if score >= min_score
+        ]
+
+    def _top_k(
+        self, matrix: Any, query_vec: Any, top_k: int, *, dead: Any = None
+    ) -> Tuple[Any, Any]:
+        # Blocked mat-vec keeps memory bounded on memmaps; each block keeps only
+        # its local top-k (argpartition) before the final merge.
+        candidate_scores = []
+        candidate_rows = []
+        for start in range(0, int(matrix.shape[0]), self.SEARCH_BLOCK_ROWS):
+            scores = matrix[start : start + self.SEARCH_BLOCK_ROWS] @ query_vec
+            if dead is not None:
+                scores[dead[start : start + scores.shape[0]]] = -np.inf
+            if top_k < scores.shape[0]:
+                local = np.argpartition(-scores, top_k - 1)[:top_k]
+            else:
+                local = np.arange(scores.shape[0])
+            candidate_scores.append(scores[local])
+            candidate_rows.append(local + start)
+        scores = np.concatenate(candidate_scores)
+        rows = np.concatenate(candidate_rows)
+        # Highest score first; equal scores are ordered by row.
+        order = np.lexsort((rows, -scores))[:top_k]
+        order = order[np.isfinite(scores[order])]
+        return scores[order], rows[order]
+
+    def _filtered_rows(self, where: Dict[str, Any]) -> Any:
+        self._ensure_catalog()
+        selected: Optional[set] = None
+        for field, value in where.items():
+            rows = self._postings.get((field, self._posting_value(value)), [])
+            selected = set(rows) if selected is None else selected.intersection(rows)
+            if not selected:
+                return np.zeros(0, dtype=np.int64)
+        result = np.fromiter(sorted(selected or ()), dtype=np.int64)
+        return result[~self._dead[result]]
+
+    def _record_at(self, row: int, matrix: Any) -> VectorRecord:
+        payload = self._read_meta(row)
+        return VectorRecord(
+            key=payload["key"],
+            text=payload["text"],
+            vector=[float(value) for value in matrix[row]],
+            metadata=payload.get("metadata") or {},
+        )
+
+    def _read_meta(self, row: int) -> Dict[str, Any]:
+        start, end = self._meta_offsets[row], self._meta_offsets[row + 1]
+        with self.meta_path.open("rb") as handle:
+            handle.seek(start)
+            return json.loads(handle.read(end - start).decode("utf-8"))
+
+    def _ensure_index(self) -> None:
+        if self.compaction_marker_path.exists():
+            self._finish_compaction()
+        if not self.matrix_path.exists():
+            self._create_index()
+        signature = self._file_signature()
+        if signature != self._index_signature:
+            self._load_index()
+
+    def _create_index(self) -> None:
+        with self.matrix_path.open("wb") as handle:
+            handle.write(_npy_header(0, self.dim))
+        self.meta_path.write_bytes(b"")
+        self.tombstones_path.write_bytes(b"")
+        self._load_index()
+        if self.path.exists():
+            self.import_jsonl(str(self.path))
+
+    def _load_index(self) -> None:
+        header_rows, dim = _read_npy_shape(self.matrix_path)
+        if dim != self.dim:
+            raise ValueError(
+                f"Vector index dim {dim} does not match store dim {self.dim}: {self.matrix_path}"
+            )
+        raw_meta = self.meta_path.read_bytes() if self.meta_path.exists() else b""
+        offsets = [0]
+        position = 0
+        while True:
+            newline = raw_meta.find(b"\n", position)
+            if newline < 0:
+                break
+            position = newline + 1
+            offsets.append(position)
+        # A crash between the matrix/meta writes and the header update leaves
+        # trailing bytes; rows past the shorter of the two are ignored.
+        rows = min(header_rows, len(offsets) - 1)
+        self._meta_offsets = offsets[: rows + 1]
+        self._open_matrix(rows)
+        self._dead = np.zeros(rows, dtype=bool)
+        if self.tombstones_path.exists():
+            raw = self.tombstones_path.read_bytes()
+            # Ignore a torn trailing entry from an interrupted append.
+            tombstoned = np.frombuffer(raw[: len(raw) - len(raw) % 8], dtype="<u8")
+            tombstoned = tombstoned.astype(np.int64)
+            self._dead[tombstoned[tombstoned < rows]] = True
+        self._dead_count = int(self._dead.sum())
+        self._key_rows = None
+        self._postings = {}
+        if self._ann is not None:
+            self._ann.sync(self._matrix)
+        self._index_signature = self._file_signature()
+
+    def _open_matrix(self, rows: int) -> None:
+        if rows == 0:
+            self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+            return
+        self._matrix = np.memmap(
+            self.matrix_path,
+            dtype="<f4",
+            mode="r",
+            offset=_NPY_HEADER_BYTES,
+            shape=(rows, self.dim),
+        )
+
+    def _ensure_catalog(self) -> None:
+        self._ensure_index()
+        if self._key_rows is not None:
+            return
+        key_rows: Dict[str, int] = {}
+        superseded: List[int] = []
+        self._postings = {}
+        with self.meta_path.open("rb") as handle:
+            for row in range(len(self._meta_offsets) - 1):
+                payload = json.loads(handle.readline().decode("utf-8"))
+                if self._dead[row]:
+                    continue
+                previous = key_rows.get(payload["key"])
+                if previous is not None:
+                    superseded.append(previous)
+                key_rows[payload["key"]] = row
+                self._index_metadata(row, payload.get("metadata") or {})
+        self._key_rows = key_rows
+        if superseded:
+            # An upsert interrupted between append and tombstone left two live rows.
+            self._tombstone(superseded)
+
+    def _index_metadata(self, row: int, metadata: Dict[str, Any]) -> None:
+        for field, value in metadata.items():
+            self._postings.setdefault((field, self._posting_value(value)), []).append(row)
+
+    @staticmethod
+    def _posting_value(value: Any) -> str:
+        return json.dumps(value, sort_keys=True)
+
+    def _upsert_rows(self, vectors: Any, rows: Sequence[Dict[str, Any]]) -> None:
+        # Caller holds the lock. Later rows win, both within the batch and over the store.
+        self._ensure_catalog()
+        last_index = {row["key"]: idx for idx, row in enumerate(rows)}
+        keep = [idx for idx, row in enumerate(rows) if last_index[row["key"]] == idx]
+        replaced = [
+            self._key_rows[rows[idx]["key"]] for idx in keep if rows[idx]["key"] in self._key_rows
+        ]
+        self._append_rows(vectors[keep], [rows[idx] for idx in keep])
+        if replaced:
+            self._tombstone(replaced)
+
+    def _tombstone(self, rows: Sequence[int]) -> None:
+        fresh = [row for row in rows if not self._dead[row]]
+        if not fresh:
+            return
+        with self.tombstones_path.open("ab") as handle:
+            handle.write(np.asarray(fresh, dtype="<u8").tobytes())
+        self._dead[fresh] = True
+        self._dead_count += len(fresh)
+        self._index_signature = self._file_signature()
+
+    def _append_rows(self, vectors: Any, rows: Sequence[Dict[str, Any]]) -> None:
+        if len(rows) != int(vectors.shape[0]):
+            raise ValueError("Vector/metadata row count mismatch.")
+        if not rows:
+            return
+        with self._lock:
+            self._ensure_index()
+            count = len(self._meta_offsets) - 1
+            encoded = [
+                (json.dumps(row, sort_keys=True, separators=(",", ":")) + "\n").encode("utf-8")
+                for row in rows
+            ]
+            _write_npy_rows(self.matrix_path, count, np.asarray(vectors, dtype="<f4"))
+            with self.meta_path.open("r+b") as handle:
+                handle.seek(self._meta_offsets[-1])
+                handle.truncate()
+                handle.write(b"".join(encoded))
+            # Header last: the new rows only become visible once both files hold them.
+            _write_npy_header(self.matrix_path, count + len(rows), self.dim)
+            position = self._meta_offsets[-1]
+            for line in encoded:
+                position += len(line)
+                self._meta_offsets.append(position)
+            self._open_matrix(count + len(rows))
+            self._dead = np.concatenate([self._dead, np.zeros(len(rows), dtype=bool)])
+            if self._key_rows is not None:
+                for offset, row in enumerate(rows):
+                    self._key_rows[row["key"]] = count + offset
+                    self._index_metadata(count + offset, row.get("metadata") or {})
+            if self._ann is not None:
+                self._ann.append(vectors, start_row=count)
+            self._index_signature = self._file_signature()
+
+    def _maybe_compact(self) -> None:
+        if not self.auto_compact:
+            return
+        with self._lock:
+            total = int(self._matrix.shape[0]) if self._matrix is not None else 0
+            due = self._dead_count >= max(
+                self.compaction_min_dead, int(total * self.compaction_ratio)
+            )
+            running = self._compaction_thread is not None and self._compaction_thread.is_alive()
+            if not due or running:
+                return
+            self._compaction_thread = threading.Thread(
+                target=self._compact_in_background, name="dwc-vector-compact", daemon=True
+            )
+            self._compaction_thread.start()
+
+    def _compact_in_background(self) -> None:
+        try:
+            self.compact()
+        except Exception as exc:  # pragma: no cover - best effort
+            LOGGER.warning("Vector store compaction failed: %s", exc)
+
+    def _copy_rows(
+        self,
+        matrix: Any,
+        offsets: Sequence[int],
+        rows: Any,
+        matrix_path: Path,
+        meta_path: Path,
+        *,
+        start_row: int,
+        truncate: bool,
+    ) -> None:
+        with self.meta_path.open("rb") as source, meta_path.open(
+            "wb" if truncate else "ab"
+        ) as target:
+            for start in range(0, int(rows.shape[0]), self.SEARCH_BLOCK_ROWS):
+                block = rows[start : start + self.SEARCH_BLOCK_ROWS]
+                _write_npy_rows(
+                    matrix_path, start_row + start, np.asarray(matrix[block], dtype="<f4")
+                )
+                for row in block:
+                    source.seek(offsets[row])
+                    target.write(source.read(offsets[row + 1] - offsets[row]))
+
+    def _finish_compaction(self) -> None:
+        # Roll forward an interrupted swap: the marker is written only after
+        # every compacted file is complete, and removed after the last rename.
+        try:
+            moves = json.loads(self.compaction_marker_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            self.compaction_marker_path.unlink(missing_ok=True)
+            return
+        for source, target in sorted(moves.items()):
+            if Path(source).exists():
+                os.replace(source, target)
+        if self._ann is not None:
+            self._ann.codes_path.unlink(missing_ok=True)
+        else:
+            self.path.with_suffix(".lsh.npy").unlink(missing_ok=True)
+        self.compaction_marker_path.unlink(missing_ok=True)
+
+    def _file_signature(self) -> Tuple[int, ...]:
+        signature: List[int] = []
+        for path in (self.matrix_path, self.meta_path, self.tombstones_path):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                signature.extend((0, 0))
+                continue
+            signature.extend((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
     def _iter_records(self) -> List[VectorRecord]:
         if not self.path.exists():
             return []
-        rows: List[VectorRecord] = []
+        latest: Dict[str, VectorRecord] = {}
         for line in self.path.read_text(encoding="utf-8").splitlines():
             line = line.strip()
             if not line:
                 continue
-            rows.append(VectorRecord(**json.loads(line)))
-        return rows
+            record = VectorRecord(**json.loads(line))
+            # Upsert semantics for the JSONL fallback: the last write per key wins.
+            latest.pop(record.key, None)
+            latest[record.key] = record
+        return list(latest.values())
 
     def _embed(self, text: str) -> List[float]:
         vector = [0.0] * self.dim
@@ -4,6 +4,8 @@ Workflow execution orchestration in isolated sandbox.
 
 from __future__ import annotations
 
+import json
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
@@ -12,6 +14,10 @@ from dwc.runtime.sandbox import SandboxConfig, VenvSandbox
 from dwc.runtime.state_store import ExecutionState, InMemoryStateStore
 from dwc.runtime.telemetry import TelemetryCollector
 
+# Written inside the sandbox session directory; see `DWC_STEP_METRICS_PATH` in
+# the generated runtime.
+STEP_METRICS_FILENAME = "step_metrics.jsonl"
+
 
 class ExecutionReport(BaseModel):
     success: bool
@@ -21,6 +27,7 @@ class ExecutionReport(BaseModel):
     resource_usage: Dict[str, Any] = Field(default_factory=dict)
     trace_id: Optional[str] = None
     iteration: int = 0
+    step_metrics: List[Dict[str, Any]] = Field(default_factory=list)
 
 
 class WorkflowExecutorConfig(BaseModel):
@@ -81,12 +88,17 @@ class WorkflowExecutor:
                 self.sandbox.install_requirements(session, deduped)
                 self.telemetry.log(trace_id, "dependency_install_completed", deps=deduped)
 
+            metrics_path = (session.root_dir / STEP_METRICS_FILENAME).resolve()
             result = self.sandbox.run_script(
                 session=session,
                 script_path=script_path,
                 script_args=script_args,
                 input_payload=input_payload,
+                extra_env={"DWC_STEP_METRICS_PATH": str(metrics_path)},
             )
+            step_metrics = self._read_step_metrics(metrics_path)
+            if step_metrics:
+                self.telemetry.log(trace_id, "step_metrics", steps=step_metrics)
             success = result.exit_code == 0
             report = ExecutionReport(
                 success=success,
@@ -96,6 +108,7 @@ class WorkflowExecutor:
                 resource_usage={"memory_kb": result.memory_kb},
                 trace_id=trace_id,
                 iteration=iteration,
+                step_metrics=step_metrics,
             )
             self.state_store.update(
                 trace_id,
@@ -131,3 +144,22 @@ class WorkflowExecutor:
             return report
         finally:
             self.sandbox.cleanup(session)
+
+    @staticmethod
+    def _read_step_metrics(path: Path) -> List[Dict[str, Any]]:
+        """
+        Per-step JSON lines written by the generated runtime; unreadable lines
+        (e.g. a write cut short by a timeout kill) are dropped.
+        """
+
+        if not path.exists():
+            return []
+        rows: List[Dict[str, Any]] = []
+        for line in path.read_text(encoding="utf-8", errors="replace").splitlines():
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(row, dict) and row.get("step_id"):
+                rows.append(row)
+        return rows
@@ -126,6 +126,7 @@ class VenvSandbox:
         script_args: Optional[List[str]] = None,
         input_payload: Optional[Dict[str, Any]] = None,
         timeout_seconds: Optional[int] = None,
+        extra_env: Optional[Dict[str, str]] = None,
     ) -> SandboxExecutionResult:
         self._ensure_session_ready(session)
         command = [str(session.python_bin), script_path]
@@ -141,6 +142,8 @@ class VenvSandbox:
             for key in self.config.env_allowlist:
                 if key in os.environ:
                     env[key] = os.environ[key]
+        if extra_env:
+            env.update(extra_env)
 
         rss_before = self._memory_kb()
         start = time.time()
@@ -5,11 +5,14 @@ Planning-stage service for requirement interpretation and plan mode.
 from __future__ import annotations
 
 import sys
-from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, TypeVar
 
 from dwc.agents.planner_agent import PlanResult, PlannerAgent
 from dwc.memory.agent_todo_board import AgentTodoBoard
 
+TOverlap = TypeVar("TOverlap")
+
 
 class PlanningService:
     def __init__(
@@ -56,9 +59,7 @@ class PlanningService:
                     "interactive_plan",
                     f"Iteration {iteration}: proposing plan draft.",
                 )
-            plan = self.planner.propose_plan(requirements_text, feedback)
-            print("\nProposed Plan\n")
-            print(plan)
+            plan = self._render_plan_draft(requirements_text, feedback)
             decision = input("\nApprove plan? [y]es / [r]efine / [q]uit\n> ").strip().lower()
 
             if decision in ("y", "yes"):
@@ -115,38 +116,88 @@ class PlanningService:
         approved_plan: Optional[str] = None,
         intent_summary: Optional[str] = None,
     ) -> Tuple[str, str]:
+        resolved_plan, resolved_intent, _ = self.resolve_plan_overlapped(
+            requirements_text=requirements_text,
+            approved_plan=approved_plan,
+            intent_summary=intent_summary,
+            overlap=None,
+        )
+        return resolved_plan, resolved_intent
+
+    def resolve_plan_overlapped(
+        self,
+        *,
+        requirements_text: str,
+        approved_plan: Optional[str] = None,
+        intent_summary: Optional[str] = None,
+        overlap: Optional[Callable[[str], TOverlap]] = None,
+    ) -> Tuple[str, str, Optional[TOverlap]]:
+        """
+        Resolve plan and intent, running `overlap(plan)` as soon as the plan exists.
+
+        Without a caller-provided plan, plan and intent come from one fused
+        structured call. If intent still has to be captured separately, it runs
+        on a worker thread while `overlap` runs on the calling thread. Todo-board
+        updates stay on the calling thread.
+        """
+
         if self.todo_board is not None:
             self.todo_board.start("planner_agent", "resolve_plan", "Resolving approved plan.")
+        fused_intent: Optional[str] = None
         if approved_plan:
             resolved_plan = approved_plan
             if self.todo_board is not None:
                 self.todo_board.complete(
                     "planner_agent", "resolve_plan", "Using caller-provided approved plan."
                 )
-        else:
+        elif intent_summary:
             resolved_plan = self.planner.propose_plan(requirements_text)
             if self.todo_board is not None:
                 self.todo_board.complete(
                     "planner_agent", "resolve_plan", "Generated approved plan."
                 )
+        else:
+            resolved_plan, fused_intent = self.planner.propose_plan_with_intent(
+                requirements_text
+            )
+            if self.todo_board is not None:
+                self.todo_board.complete(
+                    "planner_agent",
+                    "resolve_plan",
+                    (
+                        "Generated approved plan and intent in one call."
+                        if fused_intent
+                        else "Generated approved plan."
+                    ),
+                )
 
         if self.todo_board is not None:
             self.todo_board.start("planner_agent", "capture_intent", "Resolving intent summary.")
+        overlap_result: Optional[TOverlap] = None
         if intent_summary:
             resolved_intent = intent_summary
-            if self.todo_board is not None:
-                self.todo_board.complete(
-                    "planner_agent",
-                    "capture_intent",
-                    "Using caller-provided intent summary.",
-                )
-        else:
+            intent_note = "Using caller-provided intent summary."
+        elif fused_intent:
+            resolved_intent = fused_intent
+            intent_note = "Intent summary returned with plan."
+        elif overlap is None:
             resolved_intent = self.planner.capture_intent(requirements_text, resolved_plan)
-            if self.todo_board is not None:
-                self.todo_board.complete(
-                    "planner_agent", "capture_intent", "Generated intent summary."
+            intent_note = "Generated intent summary."
+        else:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="dwc-intent") as pool:
+                intent_future = pool.submit(
+                    self.planner.capture_intent, requirements_text, resolved_plan
                 )
-        return resolved_plan, resolved_intent
+                overlap_result = overlap(resolved_plan)
+                resolved_intent = intent_future.result()
+            overlap = None
+            intent_note = "Generated intent summary (overlapped with downstream work)."
+        if self.todo_board is not None:
+            self.todo_board.complete("planner_agent", "capture_intent", intent_note)
+
+        if overlap is not None:
+            overlap_result = overlap(resolved_plan)
+        return resolved_plan, resolved_intent, overlap_result
 
     @staticmethod
     def compose_current_task_description(
@@ -163,3 +214,25 @@ class PlanningService:
             "Intent Summary:\n"
             f"{intent_summary.strip()}\n"
         )
+
+    def _render_plan_draft(self, requirements_text: str, feedback: str) -> str:
+        streamed: List[str] = []
+
+        def _on_token(token: str) -> None:
+            if not streamed:
+                print("\nProposed Plan\n")
+            streamed.append(token)
+            sys.stdout.write(token)
+            sys.stdout.flush()
+
+        plan = self.planner.propose_plan(requirements_text, feedback, on_token=_on_token)
+        if not streamed:
+            print("\nProposed Plan\n")
+            print(plan)
+        elif "".join(streamed).strip() != plan:
+            # Stream broke off and the planner fell back; show what was returned.
+            print("\n\nPlan draft was interrupted; using fallback plan:\n")
+            print(plan)
+        else:
+            print()
+        return plan
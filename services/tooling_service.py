@@ -4,7 +4,6 @@ Tooling-stage service for subtask decomposition and verified tool construction.
 
 from __future__ import annotations
 
-import hashlib
 import re
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
@@ -15,6 +14,7 @@ from dwc.agents.subtask_agent import SubtaskAgent, SubtaskSpec
 from dwc.agents.tool_builder_agent import ToolBuilderAgent, ToolCandidate
 from dwc.agents.tool_verifier_agent import ToolVerificationResult, ToolVerifierAgent
 from dwc.memory.agent_todo_board import AgentTodoBoard
+from dwc.memory.code_fingerprint import code_fingerprint, code_hash
 from dwc.memory.history_store import HistoryStore
 from dwc.memory.markdown_memory import MarkdownMemoryStore
 from dwc.memory.shared_tool_registry import SharedToolRegistry
@@ -36,6 +36,7 @@ class ToolingStageResult(BaseModel):
     subtask_rows: List[Dict[str, str]] = Field(default_factory=list)
     tool_functions: Dict[str, Dict[str, str]] = Field(default_factory=dict)
     tool_records: List[ToolBuildRecord] = Field(default_factory=list)
+    dedupe_stats: Dict[str, int] = Field(default_factory=dict)
 
 
 class ToolingService:
@@ -58,16 +59,13 @@ class ToolingService:
         self.shared_tool_registry = shared_tool_registry or SharedToolRegistry()
         self.todo_board = todo_board
 
-    def build_verified_tools(
+    def split_subtasks(
         self,
         *,
-        workflow_name: str,
         requirements_text: str,
         approved_plan: str,
-        current_task_description: str,
         max_subtasks: int = 8,
-        max_tool_iterations: int = 4,
-    ) -> ToolingStageResult:
+    ) -> List[SubtaskSpec]:
         if self.todo_board is not None:
             self.todo_board.start(
                 "subtask_agent",
@@ -85,6 +83,33 @@ class ToolingService:
                 "split_subtasks",
                 f"Created {len(subtasks)} subtask(s).",
             )
+        self.memory_store.append_agent_working_memory(
+            "subtask_agent",
+            "Created subtasks:\n"
+            + "\n".join(
+                f"- {subtask.id}: {subtask.description}" for subtask in subtasks
+            ),
+        )
+        return subtasks
+
+    def build_verified_tools(
+        self,
+        *,
+        workflow_name: str,
+        requirements_text: str,
+        approved_plan: str,
+        current_task_description: str,
+        max_subtasks: int = 8,
+        max_tool_iterations: int = 4,
+        subtasks: Optional[List[SubtaskSpec]] = None,
+    ) -> ToolingStageResult:
+        if subtasks is None:
+            subtasks = self.split_subtasks(
+                requirements_text=requirements_text,
+                approved_plan=approved_plan,
+                max_subtasks=max_subtasks,
+            )
+        if self.todo_board is not None:
             self.todo_board.start(
                 "tool_builder_agent",
                 "build_tools",
@@ -95,17 +120,13 @@ class ToolingService:
                 "verify_tools",
                 "Verifying tool contract and semantics.",
             )
-        self.memory_store.append_agent_working_memory(
-            "subtask_agent",
-            "Created subtasks:\n"
-            + "\n".join(
-                f"- {subtask.id}: {subtask.description}" for subtask in subtasks
-            ),
-        )
 
         tool_records: List[ToolBuildRecord] = []
         tool_functions: Dict[str, Dict[str, str]] = {}
         subtask_rows: List[Dict[str, str]] = []
+        cache_hits_before = getattr(self.tool_verifier, "cache_hits", 0)
+        raw_repeats = 0
+        fingerprint_repeats = 0
 
         for subtask in subtasks:
             if self.todo_board is not None:
@@ -131,6 +152,7 @@ class ToolingService:
             chosen_verification = ToolVerificationResult(success=False, errors="Not run")
             attempts = 0
             seen_code_hashes: set[str] = set()
+            seen_fingerprints: set[str] = set()
 
             registry_candidate = self._candidate_from_shared_suggestion(
                 subtask=subtask,
@@ -138,10 +160,8 @@ class ToolingService:
             )
             if registry_candidate is not None:
                 attempts += 1
-                candidate_hash = hashlib.sha256(
-                    registry_candidate.code.encode("utf-8")
-                ).hexdigest()
-                seen_code_hashes.add(candidate_hash)
+                seen_code_hashes.add(code_hash(registry_candidate.code))
+                seen_fingerprints.add(code_fingerprint(registry_candidate.code))
                 if self.todo_board is not None:
                     self.todo_board.add_check(
                         "tool_builder_agent",
@@ -195,7 +215,8 @@ class ToolingService:
                     shared_task_description=current_task_description,
                     feedback=feedback,
                 )
-                candidate_hash = hashlib.sha256(candidate.code.encode("utf-8")).hexdigest()
+                candidate_hash = code_hash(candidate.code)
+                candidate_fingerprint = code_fingerprint(candidate.code)
                 if self.todo_board is not None:
                     self.todo_board.add_check(
                         "tool_builder_agent",
@@ -205,9 +226,18 @@ class ToolingService:
                             f"candidate `{candidate.name}` origin={candidate.origin}."
                         ),
                     )
-                if candidate_hash in seen_code_hashes:
+                if (
+                    candidate_hash in seen_code_hashes
+                    or candidate_fingerprint in seen_fingerprints
+                ):
+                    if candidate_hash in seen_code_hashes:
+                        raw_repeats += 1
+                        repeat_kind = "identical"
+                    else:
+                        fingerprint_repeats += 1
+                        repeat_kind = "equivalent (same normalized AST)"
                     repeat_error = (
-                        "Repeated identical tool candidate code. "
+                        f"Repeated {repeat_kind} tool candidate code. "
                         "Stopping retry loop early to avoid redundant failures."
                     )
                     verification = ToolVerificationResult(success=False, errors=repeat_error)
@@ -230,12 +260,13 @@ class ToolingService:
                         self.todo_board.add_check(
                             "tool_verifier_agent",
                             "verify_tools",
-                            f"{candidate.name} skipped verifier: repeated code hash.",
+                            f"{candidate.name} skipped verifier: repeated {repeat_kind} code.",
                         )
                     chosen_candidate = candidate
                     chosen_verification = verification
                     break
                 seen_code_hashes.add(candidate_hash)
+                seen_fingerprints.add(candidate_fingerprint)
                 self.memory_store.append_agent_working_memory(
                     "tool_builder_agent",
                     (
@@ -418,11 +449,20 @@ class ToolingService:
                     f"Verifier shortfall: {verified_count}/{len(tool_records)} passed.",
                 )
 
+        verifier_cache_hits = getattr(self.tool_verifier, "cache_hits", 0) - cache_hits_before
         return ToolingStageResult(
             subtasks=subtasks,
             subtask_rows=subtask_rows,
             tool_functions=tool_functions,
             tool_records=tool_records,
+            dedupe_stats={
+                "raw_hash_repeats": raw_repeats,
+                "fingerprint_repeats": fingerprint_repeats,
+                "verifier_cache_hits": verifier_cache_hits,
+                # Runs skipped only because of fingerprint matching; exact
+                # repeats were already skipped by the raw hash.
+                "sandbox_runs_saved": fingerprint_repeats + verifier_cache_hits,
+            },
         )
 
     def _build_prior_failure_guidance(self, subtask_description: str) -> str:
@@ -580,7 +620,6 @@ class ToolingService:
         stderr_snippet = (verification.errors or "").strip()[:500]
         stdout_snippet = (verification.output_preview or "").strip()[:500]
         error_class = self._classify_error(stderr_snippet)
-        code_hash = hashlib.sha256(candidate_code.encode("utf-8")).hexdigest()
         created_at = datetime.now(timezone.utc).isoformat()
         self.history_store.add_tool_attempt(
             workflow_name=workflow_name,
@@ -594,7 +633,7 @@ class ToolingService:
             stderr_snippet=stderr_snippet or None,
             stdout_snippet=stdout_snippet or None,
             feedback_used=(feedback_used or "")[:500],
-            code_hash=code_hash,
+            code_hash=code_hash(candidate_code),
             created_at=created_at,
         )
         self.shared_tool_registry.record_contribution(